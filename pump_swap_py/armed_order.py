@@ -0,0 +1,272 @@
+import asyncio
+import time
+from typing import Optional
+
+from solana.rpc.types import TxOpts
+
+from solders.message import MessageV0  # type: ignore
+from solders.signature import Signature  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+from config import ARMED_ORDER_REFRESH_INTERVAL
+from chain_state import chain_state
+from confirmation import confirmation_watcher
+from fee_engine import fee_engine
+from lookup_tables import lookup_tables
+from pool_utils import *
+from pump_swap import create_wsol_account_instructions
+from swap_template import get_swap_template
+from telemetry import telemetry
+from token_accounts import close_account, create_idempotent_associated_token_account, get_associated_token_address
+from trader import Trader
+
+class ArmedOrder:
+    # A buy or sell for one pool and size that is prepared before the
+    # decision to trade. arm() resolves the pool keys, accounts and lookup
+    # tables and reserves the SOL (or tokens) from the trader. A background
+    # task then re-signs the transaction whenever the blockhash or the pool
+    # reserves change. The amount out tracks the reserves, which come from
+    # the reserve tracker when one is set (see use_reserve_tracker). fire()
+    # only sends the bytes that are already signed. An armed order always
+    # uses its own WSOL account, so a persistent one's balance can't change
+    # under it.
+    def __init__(
+        self,
+        trader: Trader,
+        pair_address: str,
+        side: str,
+        amount: float,
+        slippage: int = 5,
+        refresh_interval: float = ARMED_ORDER_REFRESH_INTERVAL,
+        skip_preflight: bool = True,
+    ):
+        # amount is SOL in for a buy and the percentage of the token balance for a sell.
+        if side not in ("buy", "sell"):
+            raise ValueError(f"side must be 'buy' or 'sell', not {side!r}")
+        self.trader = trader
+        self.pair_address = pair_address
+        self.side = side
+        self.amount = amount
+        self.slippage = slippage
+        self.refresh_interval = refresh_interval
+        self.skip_preflight = skip_preflight
+        self.armed = False
+        self.fired = False
+        self.rebuilds = 0
+        self.signature: Optional[Signature] = None
+        # Seconds from the fire() call until the RPC accepted the transaction.
+        self.latency: Optional[float] = None
+        self.last_valid_block_height: Optional[int] = None
+        self._wire: Optional[bytes] = None
+        self._state: Optional[tuple] = None
+        self._reserved = 0
+        self._reserved_tokens = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def __repr__(self) -> str:
+        return f"ArmedOrder({self.side} {self.amount} {self.pair_address}, armed={self.armed})"
+
+    async def arm(self) -> bool:
+        trader = self.trader
+        try:
+            self.pool_keys = await fetch_pool_keys_async(self.pair_address)
+            if self.pool_keys is None:
+                print(f"{self}: no pool keys found for {self.pair_address}.")
+                return False
+            self.mint = mint = self.pool_keys.base_mint
+            (
+                (self.creator_vault_authority, self.creator_vault_ata),
+                mint_info,
+                token_account,
+                token_balance,
+                self.rent,
+                self.tables,
+            ) = await asyncio.gather(
+                get_creator_vault_info_async(self.pool_keys.creator),
+                get_mint_info_async(mint),
+                trader._token_account(mint),
+                trader._token_balance(mint) if self.side == "sell" else asyncio.sleep(0),
+                chain_state.get_rent_exempt_minimum_async(),
+                lookup_tables.tables_for_async(self.pool_keys),
+            )
+            if self.creator_vault_authority is None or self.creator_vault_ata is None or mint_info is None:
+                print(f"{self}: missing pool data for {self.pair_address}.")
+                return False
+            self.base_token_program = base_token_program = mint_info.token_program
+            self.create_token_account = token_account is None
+            self.token_account = token_account or get_associated_token_address(trader.pubkey, mint, base_token_program)
+            self.template = get_swap_template(
+                self.pool_keys, trader.pubkey, self.token_account, base_token_program,
+                self.creator_vault_authority, self.creator_vault_ata, trader.user_volume_accumulator,
+            )
+
+            if self.side == "buy":
+                self.max_quote_amount_in = int((self.amount * (1 + self.slippage / 100)) * 1e9)
+                wsol_lamports = self.rent + self.max_quote_amount_in
+                self.spent = self.max_quote_amount_in + trader.fee_lamports + (self.rent if self.create_token_account else 0)
+            else:
+                pending = trader.reserved_tokens.get(mint, 0)
+                self.base_amount_in = int(max((token_balance or 0) - pending, 0) * (self.amount / 100))
+                if self.base_amount_in == 0:
+                    print(f"{self}: token balance is zero. Nothing to sell.")
+                    return False
+                self.close_token_account = self.amount == 100 and pending == 0
+                # Promised before the next await, like Trader.sell.
+                self._reserved_tokens = self.base_amount_in
+                trader.reserved_tokens[mint] = pending + self.base_amount_in
+                wsol_lamports = self.rent
+                self.spent = trader.fee_lamports
+            # The WSOL account's seed is picked once, so every re-signed
+            # transaction creates the same account.
+            self.wsol_token_account, self.wsol_instructions, self.close_wsol_instruction = create_wsol_account_instructions(
+                wsol_lamports, trader.pubkey
+            )
+
+            reserved = self.spent + self.rent
+            if not await trader._reserve(reserved):
+                self._release()
+                print(f"{self}: insufficient SOL ({trader.available()} lamports available).")
+                return False
+            self._reserved = reserved
+
+            if not await self.refresh():
+                self._release()
+                return False
+            self.armed = True
+            self._task = asyncio.create_task(self._run())
+            return True
+        except Exception as e:
+            print(f"{self}: error occurred while arming:", e)
+            self._release()
+            return False
+
+    def _instructions(self, base_reserve: int, quote_reserve: int) -> tuple[list, int]:
+        # Returns the instructions and the base amount out (buy) or the min
+        # quote amount out (sell) they were built with.
+        if self.side == "buy":
+            base_amount_out = sol_for_tokens(int(self.amount * 1e9), base_reserve, quote_reserve)
+            instructions = [*self.wsol_instructions]
+            if self.create_token_account:
+                instructions.append(create_idempotent_associated_token_account(
+                    self.trader.pubkey, self.trader.pubkey, self.mint, self.base_token_program
+                ))
+            instructions.append(self.template.buy(base_amount_out, self.max_quote_amount_in, self.wsol_token_account))
+            instructions.append(self.close_wsol_instruction)
+            return instructions, base_amount_out
+        min_quote_amount_out = int(tokens_for_sol(self.base_amount_in, base_reserve, quote_reserve) * (1 - self.slippage / 100))
+        instructions = [
+            *self.wsol_instructions,
+            self.template.sell(self.base_amount_in, min_quote_amount_out, self.wsol_token_account),
+            self.close_wsol_instruction,
+        ]
+        if self.close_token_account:
+            instructions.append(close_account(self.base_token_program, self.token_account, self.trader.pubkey, self.trader.pubkey))
+        return instructions, min_quote_amount_out
+
+    async def refresh(self) -> bool:
+        # Re-signs the transaction if the blockhash or reserves changed since
+        # the last time; returns False if the pool reserves are unavailable.
+        blockhash_info, (base_reserve, quote_reserve) = await asyncio.gather(
+            chain_state.get_blockhash_async(),
+            get_pool_reserves_async(self.pool_keys),
+        )
+        if base_reserve is None or quote_reserve is None:
+            print(f"{self}: pool reserves unavailable.")
+            return False
+        state = (blockhash_info.blockhash, base_reserve, quote_reserve)
+        if state == self._state:
+            return True
+        instructions, amount_out = self._instructions(base_reserve, quote_reserve)
+        payer = self.trader.pubkey
+        budget_instructions = await fee_engine.budget_instructions_async(payer, instructions, self.tables, blockhash_info.blockhash)
+        message = MessageV0.try_compile(payer, budget_instructions + instructions, self.tables, blockhash_info.blockhash)
+        txn = VersionedTransaction(message, [self.trader.keypair])
+        if self.fired:
+            return True
+        self._wire = bytes(txn)
+        if self.side == "buy":
+            self.base_amount_out = amount_out
+        else:
+            self.min_quote_amount_out = amount_out
+        self.signature = txn.signatures[0]
+        self.last_valid_block_height = blockhash_info.last_valid_block_height
+        self._state = state
+        self.rebuilds += 1
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"{self}: error refreshing:", e)
+
+    def _stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _release(self) -> None:
+        self.trader.reserved -= self._reserved
+        self._reserved = 0
+        if self._reserved_tokens:
+            self.trader._release_tokens(self.mint, self._reserved_tokens)
+            self._reserved_tokens = 0
+
+    def disarm(self) -> None:
+        if not self.armed:
+            return
+        self._stop()
+        self.armed = False
+        self._release()
+
+    async def fire(self, confirm: bool = True) -> bool:
+        decided = time.perf_counter()
+        if not self.armed or self.fired:
+            print(f"{self}: not armed.")
+            return False
+        self.fired = True
+        self._stop()
+        wire, signature, last_valid_block_height = self._wire, self.signature, self.last_valid_block_height
+        trader = self.trader
+        reserved = self._reserved
+        confirmed = False
+        try:
+            await trader.async_client.send_raw_transaction(wire, opts=TxOpts(skip_preflight=self.skip_preflight))
+            self.latency = time.perf_counter() - decided
+            telemetry.observe("armed_order_fire_seconds", self.latency, side=self.side)
+            if not confirm:
+                return True
+            confirmed = await confirmation_watcher.wait(signature, last_valid_block_height)
+            return confirmed
+        except Exception as e:
+            print(f"{self}: error occurred while firing:", e)
+            confirm = True
+            return False
+        finally:
+            self.armed = False
+            self._reserved = 0
+            self._settle(reserved, confirm, confirmed)
+
+    def _settle(self, reserved: int, waited: bool, confirmed: bool) -> None:
+        trader = self.trader
+        self._release()
+        if not waited:
+            # The outcome is unknown, so the balance is refetched before the next trade.
+            trader.reserved -= reserved
+            trader.balance = None
+            return
+        if self.side == "buy":
+            delta = -self.spent
+            if confirmed:
+                trader.token_accounts[self.mint] = self.token_account
+            if trader.portfolio is not None:
+                trader.portfolio.record_trade(self.mint, self.token_account, confirmed, self.base_amount_out, signature=self.signature)
+        else:
+            delta = self.min_quote_amount_out - self.spent + (self.rent if self.close_token_account else 0)
+            if confirmed and self.close_token_account:
+                trader.token_accounts.pop(self.mint, None)
+            if trader.portfolio is not None:
+                trader.portfolio.record_trade(self.mint, self.token_account, confirmed, -self.base_amount_in, self.close_token_account, self.signature)
+        trader._settle(reserved, confirmed, delta)
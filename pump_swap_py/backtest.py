@@ -0,0 +1,362 @@
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+import numpy as np
+
+from config import UNIT_BUDGET, UNIT_PRICE
+from constants import LP_FEE_BPS, PROTOCOL_FEE_BPS, FEE_DENOMINATOR, SIGNATURE_FEE
+from pool_utils import sol_for_tokens, tokens_for_sol
+
+# A reserve stream is one row per update of a pool's reserves, in slot
+# order: the vault balances after a swap (or a periodic snapshot of them).
+# Pools are numbered by the recorder; the mapping to pool addresses is kept
+# next to the stream by whoever records it.
+EVENT_COLUMNS = {
+    "slot": np.uint64,
+    "pool": np.uint32,
+    "base_reserve": np.uint64,
+    "quote_reserve": np.uint64,
+}
+CHUNK_EVENTS = 1 << 20
+MAX_AGE_SLOTS = 150  # a blockhash is valid for 150 slots, so an order that hasn't landed by then is dropped
+
+BUY = 0
+SELL = 1
+
+@dataclass
+class EventChunk:
+    slot: np.ndarray
+    pool: np.ndarray
+    base_reserve: np.ndarray
+    quote_reserve: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.slot)
+
+class EventWriter:
+    # Appends events to a directory of parts (part-00000, ...), each holding
+    # one .npy file per column, so a recording never has to fit in memory.
+    def __init__(self, path: str, part_events: int = CHUNK_EVENTS):
+        self.path = path
+        self.part_events = part_events
+        self.parts = 0
+        self._buffer: list[tuple[np.ndarray, ...]] = []
+        self._buffered = 0
+        os.makedirs(path, exist_ok=True)
+
+    def __enter__(self) -> "EventWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def append(self, slot, pool, base_reserve, quote_reserve) -> None:
+        columns = tuple(np.atleast_1d(np.asarray(v, dtype=dtype)) for v, dtype in zip((slot, pool, base_reserve, quote_reserve), EVENT_COLUMNS.values()))
+        self._buffer.append(columns)
+        self._buffered += len(columns[0])
+        if self._buffered >= self.part_events:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffered:
+            return
+        part = os.path.join(self.path, f"part-{self.parts:05d}")
+        os.makedirs(part, exist_ok=True)
+        for name, column in zip(EVENT_COLUMNS, zip(*self._buffer)):
+            np.save(os.path.join(part, f"{name}.npy"), np.concatenate(column))
+        self.parts += 1
+        self._buffer = []
+        self._buffered = 0
+
+    def close(self) -> None:
+        self.flush()
+
+def write_events(path: str, slot, pool, base_reserve, quote_reserve, part_events: int = CHUNK_EVENTS) -> None:
+    with EventWriter(path, part_events) as writer:
+        for i in range(0, len(slot), part_events):
+            writer.append(slot[i:i + part_events], pool[i:i + part_events], base_reserve[i:i + part_events], quote_reserve[i:i + part_events])
+
+def _read_npy(path: str, chunk_events: int) -> Iterator[EventChunk]:
+    if os.path.exists(os.path.join(path, "slot.npy")):
+        parts = [path]
+    else:
+        parts = sorted(os.path.join(path, name) for name in os.listdir(path) if name.startswith("part-"))
+    for part in parts:
+        # Memory-mapped, so only the pages a chunk touches are read.
+        columns = [np.load(os.path.join(part, f"{name}.npy"), mmap_mode="r") for name in EVENT_COLUMNS]
+        for i in range(0, len(columns[0]), chunk_events):
+            yield EventChunk(*(column[i:i + chunk_events] for column in columns))
+
+def _read_parquet(path: str, chunk_events: int) -> Iterator[EventChunk]:
+    # pyarrow is only needed for Parquet recordings.
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_events, columns=list(EVENT_COLUMNS)):
+        yield EventChunk(*(batch.column(name).to_numpy().astype(dtype, copy=False) for name, dtype in EVENT_COLUMNS.items()))
+
+def read_events(path: str, chunk_events: int = CHUNK_EVENTS) -> Iterator[EventChunk]:
+    if path.endswith(".parquet"):
+        return _read_parquet(path, chunk_events)
+    return _read_npy(path, chunk_events)
+
+# Fills are priced the way the program rounds: against the trader on both
+# sides, so the curve amount and the fees are rounded up on buys, and the
+# curve amount down and the fees up on sells.
+
+def buy_cost(base_amount_out: int, base_reserve: int, quote_reserve: int) -> Optional[int]:
+    # What the program takes for base_amount_out, fees included, or None
+    # if the pool can't provide it.
+    if base_amount_out >= base_reserve:
+        return None
+    quote_in = -(-quote_reserve * base_amount_out // (base_reserve - base_amount_out))
+    return quote_in - (-quote_in * LP_FEE_BPS // FEE_DENOMINATOR) - (-quote_in * PROTOCOL_FEE_BPS // FEE_DENOMINATOR)
+
+def sell_proceeds(base_amount_in: int, base_reserve: int, quote_reserve: int) -> int:
+    # What the program pays for base_amount_in, fees deducted.
+    quote_out = quote_reserve * base_amount_in // (base_reserve + base_amount_in)
+    return quote_out + (-quote_out * LP_FEE_BPS // FEE_DENOMINATOR) + (-quote_out * PROTOCOL_FEE_BPS // FEE_DENOMINATOR)
+
+@dataclass
+class Orders:
+    index: np.ndarray  # row of the chunk each order is decided at; the pool is that row's pool
+    side: np.ndarray  # BUY or SELL
+    amount: np.ndarray  # SOL in for buys, percentage of the position for sells, as in buy() and sell()
+    slippage: Union[int, np.ndarray] = 5
+
+@dataclass
+class Fill:
+    pool: int
+    side: str
+    decided_slot: int
+    slot: int
+    base_amount: int
+    quote_amount: int  # lamports paid (fees included) for buys, received for sells
+    expected_quote: int  # what the quote at decision time assumed
+
+@dataclass
+class BacktestResult:
+    events: int = 0
+    seconds: float = 0.0
+    orders: int = 0
+    filled: int = 0
+    skipped: int = 0  # sells with nothing to sell
+    rejected_slippage: int = 0
+    rejected_funds: int = 0
+    expired: int = 0
+    pending: int = 0  # still waiting for their pool to trade when the stream ended
+    fees: int = 0
+    sol: int = 0  # lamports received minus lamports spent, fees included
+    value: int = 0  # what the positions would sell for at the last reserves, fees deducted
+    positions: dict[int, int] = field(default_factory=dict)
+    fills: list[Fill] = field(default_factory=list)
+
+    @property
+    def pnl(self) -> int:
+        return self.sol + self.value
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.seconds if self.seconds else 0.0
+
+class _Order:
+    __slots__ = ("pool", "side", "amount", "slippage", "decided_slot", "base_amount", "limit", "expected_quote", "live")
+
+    def __init__(self, pool: int, side: int, amount: float, slippage: float, decided_slot: int):
+        self.pool = pool
+        self.side = side
+        self.amount = amount
+        self.slippage = slippage
+        self.decided_slot = decided_slot
+        self.base_amount = 0
+        self.limit = 0
+        self.expected_quote = 0
+        self.live = True
+
+Strategy = Callable[[EventChunk, "Backtest"], Optional[Orders]]
+
+class Backtest:
+    # Replays a reserve stream through the quoting in pool_utils. Orders are
+    # sized at the reserves of the row they're decided at, with the same
+    # slippage limits as buy() and sell(), and land on the first later row of
+    # their pool at least latency_slots after the decision, where they're
+    # checked the way the program checks them. Our own fills don't move the
+    # recorded reserves, so size the orders small next to the pools.
+    #
+    # The rows are scanned with numpy a chunk at a time; only the orders
+    # themselves are handled one by one, so memory is bounded by the chunk
+    # size and throughput by how often the strategy trades.
+    def __init__(
+        self,
+        strategy: Strategy,
+        latency_slots: int = 1,
+        max_age_slots: int = MAX_AGE_SLOTS,
+        fee_lamports: Optional[int] = None,
+        record_fills: bool = True,
+    ):
+        self.strategy = strategy
+        self.latency_slots = latency_slots
+        self.max_age_slots = max_age_slots
+        self.fee_lamports = SIGNATURE_FEE + UNIT_BUDGET * UNIT_PRICE // 1_000_000 if fee_lamports is None else fee_lamports
+        self.record_fills = record_fills
+        self.positions: dict[int, int] = {}
+        self.result = BacktestResult()
+        self._pending: list[_Order] = []
+        self._marks: dict[int, tuple[int, int]] = {}
+
+    def run(self, source: Union[str, Iterable[EventChunk]], chunk_events: int = CHUNK_EVENTS) -> BacktestResult:
+        chunks = read_events(source, chunk_events) if isinstance(source, str) else source
+        start = time.perf_counter()
+        for chunk in chunks:
+            if len(chunk):
+                self._run_chunk(chunk)
+        result = self.result
+        result.seconds += time.perf_counter() - start
+        result.pending = len(self._pending)
+        result.positions = dict(self.positions)
+        result.value = sum(sell_proceeds(amount, *self._marks[pool]) for pool, amount in self.positions.items())
+        return result
+
+    def _run_chunk(self, chunk: EventChunk) -> None:
+        result = self.result
+        slot = np.asarray(chunk.slot, dtype=np.int64)
+        pool = np.asarray(chunk.pool)
+        n = len(slot)
+        result.events += n
+
+        new = self.strategy(chunk, self)
+        orders = self._pending
+        decisions: list[tuple[int, _Order]] = []
+        if new is not None and len(new.index):
+            index = np.asarray(new.index, dtype=np.int64)
+            side = np.broadcast_to(np.asarray(new.side), index.shape).tolist()
+            amount = np.broadcast_to(np.asarray(new.amount), index.shape).tolist()
+            slippage = np.broadcast_to(np.asarray(new.slippage), index.shape).tolist()
+            rows = index.tolist()
+            decisions = [
+                (row, _Order(int(pool[row]), s, a, p, int(slot[row])))
+                for row, s, a, p in zip(rows, side, amount, slippage)
+            ]
+            result.orders += len(decisions)
+            orders = orders + [order for _, order in decisions]
+            first_row = np.concatenate((np.zeros(len(self._pending), dtype=np.int64), index + 1))
+        else:
+            first_row = np.zeros(len(orders), dtype=np.int64)
+
+        executions: list[tuple[int, _Order]] = []
+        expired: list[_Order] = []
+        keys = None
+        self._pending = []
+        if orders:
+            # The first row of the order's pool at or after both the row
+            # after the decision and its landing slot, found in the pool
+            # major (pool, row) keys.
+            order_pool = np.fromiter((order.pool for order in orders), dtype=np.int64, count=len(orders))
+            decided = np.fromiter((order.decided_slot for order in orders), dtype=np.int64, count=len(orders))
+            deadline = decided + self.max_age_slots
+            first_row = np.maximum(first_row, np.searchsorted(slot, decided + self.latency_slots))
+            keys = self._keys(pool)
+            k = np.searchsorted(keys, (order_pool.astype(np.uint64) << np.uint64(32)) | first_row.astype(np.uint64))
+            found = k < n
+            k[~found] = 0
+            found &= (keys[k] >> np.uint64(32)).astype(np.int64) == order_pool
+            row = (keys[k] & np.uint64(0xFFFFFFFF)).astype(np.int64)
+            lands = found & (slot[row] <= deadline)
+            # Unfound orders wait for the next chunk, unless it can only
+            # start after their deadline.
+            waits = ~found & (slot[-1] <= deadline)
+            expired = [orders[i] for i in np.flatnonzero(~lands & ~waits).tolist()]
+            for i in np.flatnonzero(lands).tolist():
+                executions.append((int(row[i]), orders[i]))
+            for i in np.flatnonzero(waits).tolist():
+                self._pending.append(orders[i])
+
+        # Landings before decisions on the same row: a decision sees the
+        # position after them.
+        events = sorted(
+            [(row, 0, order) for row, order in executions] + [(row, 1, order) for row, order in decisions],
+            key=lambda event: (event[0], event[1]),
+        )
+        base_reserve, quote_reserve = chunk.base_reserve, chunk.quote_reserve
+        for row, kind, order in events:
+            if not order.live:
+                continue
+            if kind:
+                self._decide(order, int(base_reserve[row]), int(quote_reserve[row]))
+            else:
+                self._land(order, int(slot[row]), int(base_reserve[row]), int(quote_reserve[row]))
+
+        # Counted after the decisions, which may have dropped some of them.
+        result.expired += sum(order.live for order in expired)
+        self._pending = [order for order in self._pending if order.live]
+        if self.positions:
+            self._mark(self._keys(pool) if keys is None else keys, chunk)
+
+    def _decide(self, order: _Order, base_reserve: int, quote_reserve: int) -> None:
+        # Same sizing as buy() and sell().
+        if order.side == BUY:
+            raw_sol_in = int(order.amount * 1e9)
+            order.base_amount = sol_for_tokens(raw_sol_in, base_reserve, quote_reserve)
+            order.limit = int((order.amount * (1 + (order.slippage / 100))) * 1e9)
+            order.expected_quote = raw_sol_in
+        else:
+            balance = self.positions.get(order.pool, 0)
+            if balance == 0:
+                order.live = False
+                self.result.skipped += 1
+                return
+            order.base_amount = int(balance * (order.amount / 100))
+            sol_out = tokens_for_sol(order.base_amount, base_reserve, quote_reserve)
+            order.limit = int((sol_out * (1 - (order.slippage / 100))))
+            order.expected_quote = sol_out
+
+    def _land(self, order: _Order, slot: int, base_reserve: int, quote_reserve: int) -> None:
+        # The transaction lands, so the fee is paid whether the swap succeeds or not.
+        result = self.result
+        order.live = False
+        result.fees += self.fee_lamports
+        result.sol -= self.fee_lamports
+        position = self.positions.get(order.pool, 0)
+        if order.side == BUY:
+            quote_amount = buy_cost(order.base_amount, base_reserve, quote_reserve)
+            if quote_amount is None:
+                result.rejected_funds += 1
+                return
+            if quote_amount > order.limit:
+                result.rejected_slippage += 1
+                return
+            result.sol -= quote_amount
+            position += order.base_amount
+            self._marks[order.pool] = (base_reserve, quote_reserve)
+        else:
+            if order.base_amount > position:
+                result.rejected_funds += 1
+                return
+            quote_amount = sell_proceeds(order.base_amount, base_reserve, quote_reserve)
+            if quote_amount < order.limit:
+                result.rejected_slippage += 1
+                return
+            result.sol += quote_amount
+            position -= order.base_amount
+        if position:
+            self.positions[order.pool] = position
+        else:
+            self.positions.pop(order.pool, None)
+        result.filled += 1
+        if self.record_fills:
+            result.fills.append(Fill(order.pool, "buy" if order.side == BUY else "sell", order.decided_slot, slot,
+                                     order.base_amount, quote_amount, order.expected_quote))
+
+    def _keys(self, pool: np.ndarray) -> np.ndarray:
+        # (pool, row) packed into one sorted array: every pool's rows, in order.
+        return np.sort((pool.astype(np.uint64) << np.uint64(32)) | np.arange(len(pool), dtype=np.uint64))
+
+    def _mark(self, keys: np.ndarray, chunk: EventChunk) -> None:
+        # Keeps the last reserves of every pool with a position, to value it.
+        held = np.fromiter(self.positions, dtype=np.uint64, count=len(self.positions))
+        k = np.searchsorted(keys, (held + np.uint64(1)) << np.uint64(32)) - 1
+        traded = (k >= 0) & ((keys[np.maximum(k, 0)] >> np.uint64(32)) == held)
+        rows = (keys[k[traded]] & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        for p, row in zip(held[traded].tolist(), rows.tolist()):
+            self._marks[p] = (int(chunk.base_reserve[row]), int(chunk.quote_reserve[row]))
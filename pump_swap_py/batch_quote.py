@@ -0,0 +1,81 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from constants import LP_FEE_BPS, PROTOCOL_FEE_BPS, FEE_DENOMINATOR
+
+# Below this bound the products fit the float64 estimate + int64 correction
+# in _floor_mul_div; anything larger falls back to exact Python ints.
+FAST_PATH_LIMIT = 1 << 52
+
+@dataclass
+class BatchQuote:
+    amount_in: np.ndarray
+    amount_out: np.ndarray
+    fees: np.ndarray
+    price_impact: np.ndarray
+
+def _as_amounts(*values):
+    arrays = np.broadcast_arrays(*(np.asarray(v) for v in values))
+    for a in arrays:
+        if a.dtype.kind not in "iuO":
+            raise TypeError(f"amounts must be integers, got {a.dtype}")
+    if any(a.dtype == object or (a.size and (a.min() < 0 or a.max() >= FAST_PATH_LIMIT)) for a in arrays):
+        return [a.astype(object) for a in arrays], False
+    return [a.astype(np.int64) for a in arrays], True
+
+def _check_denominator(d: np.ndarray) -> None:
+    # The scalar functions raise on an empty pool; without this the fast
+    # path would return INT64_MIN for those entries instead.
+    if d.size and not np.all(d):
+        raise ZeroDivisionError("integer division or modulo by zero")
+
+def _floor_mul_div(a: np.ndarray, b: np.ndarray, d: np.ndarray) -> np.ndarray:
+    # floor(a * b / d) for d >= b, i.e. a result that is never larger than a.
+    # a * b needs up to 104 bits, so the quotient is estimated in float64 and
+    # then corrected with the exact remainder, computed modulo 2**64.
+    q = np.floor(a.astype(np.float64) * b.astype(np.float64) / d.astype(np.float64)).astype(np.int64)
+    with np.errstate(over="ignore"):
+        r = (a.astype(np.uint64) * b.astype(np.uint64) - q.astype(np.uint64) * d.astype(np.uint64)).view(np.int64)
+    return q + r // d
+
+def _price_impact(amount_in, amount_out, reserve_in, reserve_out) -> np.ndarray:
+    # 1 - execution price / spot price
+    amount_in, amount_out, reserve_in, reserve_out = (np.asarray(v, dtype=np.float64) for v in (amount_in, amount_out, reserve_in, reserve_out))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        impact = 1 - (amount_out * reserve_in) / (amount_in * reserve_out)
+    return np.where(amount_in > 0, impact, 0.0)
+
+def sol_for_tokens_batch(quote_amount_in, pool_base_token_reserves, pool_quote_token_reserves) -> BatchQuote:
+    (quote_in, base, quote), fast = _as_amounts(quote_amount_in, pool_base_token_reserves, pool_quote_token_reserves)
+    _check_denominator(quote + quote_in)
+    if fast and (quote + quote_in).max(initial=0) < FAST_PATH_LIMIT:
+        base_out = base - _floor_mul_div(base, quote, quote + quote_in)
+    else:
+        quote_in, base, quote = quote_in.astype(object), base.astype(object), quote.astype(object)
+        base_out = base - (base * quote) // (quote + quote_in)
+    fees = np.zeros_like(base_out)
+    return BatchQuote(quote_in, base_out, fees, _price_impact(quote_in, base_out, quote, base))
+
+def tokens_for_sol_batch(base_amount_in, pool_base_token_reserves, pool_quote_token_reserves) -> BatchQuote:
+    (base_in, base, quote), fast = _as_amounts(base_amount_in, pool_base_token_reserves, pool_quote_token_reserves)
+    _check_denominator(base + base_in)
+    if fast and (base + base_in).max(initial=0) < FAST_PATH_LIMIT:
+        quote_out = quote - _floor_mul_div(quote, base, base + base_in)
+    else:
+        base_in, base, quote = base_in.astype(object), base.astype(object), quote.astype(object)
+        quote_out = quote - (base * quote) // (base + base_in)
+    fees = quote_out * LP_FEE_BPS // FEE_DENOMINATOR + quote_out * PROTOCOL_FEE_BPS // FEE_DENOMINATOR
+    quote_out = quote_out - fees
+    return BatchQuote(base_in, quote_out, fees, _price_impact(base_in, quote_out, base, quote))
+
+def quote_grid(amounts, pool_base_token_reserves, pool_quote_token_reserves, side: str = "buy") -> BatchQuote:
+    # Every amount against every pool: results have shape (pools, amounts).
+    amounts = np.asarray(amounts)[np.newaxis, :]
+    base = np.asarray(pool_base_token_reserves)[:, np.newaxis]
+    quote = np.asarray(pool_quote_token_reserves)[:, np.newaxis]
+    if side == "buy":
+        return sol_for_tokens_batch(amounts, base, quote)
+    if side == "sell":
+        return tokens_for_sol_batch(amounts, base, quote)
+    raise ValueError(f"side must be 'buy' or 'sell', got {side!r}")
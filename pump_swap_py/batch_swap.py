@@ -0,0 +1,247 @@
+from dataclasses import dataclass, field
+from typing import Optional
+
+from solana.rpc.types import TxOpts
+
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
+from solders.hash import Hash  # type: ignore
+from solders.instruction import Instruction  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+import config
+from config import UNIT_BUDGET, UNIT_PRICE
+from constants import *
+import common_utils
+from common_utils import get_token_account, get_token_balance
+from pool_utils import *
+from chain_state import chain_state
+from lookup_tables import lookup_tables
+from pump_swap import create_wsol_account_instructions
+from swap_template import SwapTemplate, get_swap_template
+from token_accounts import close_account, create_idempotent_associated_token_account, get_associated_token_address
+
+PACKET_DATA_SIZE = 1232
+MAX_COMPUTE_UNITS = 1_400_000
+
+@dataclass
+class SwapIntent:
+    pair_address: str
+    side: str  # "buy" or "sell"
+    amount: float  # SOL in for buys, percentage of the balance for sells
+    slippage: int = 5
+    base_amount: Optional[int] = None  # exact tokens in for sells, instead of a percentage
+    quote_amount: Optional[int] = None  # exact lamports in for buys, instead of amount SOL
+
+@dataclass
+class PreparedSwap:
+    intent: SwapIntent
+    pool_keys: PoolKeys
+    template: SwapTemplate
+    amounts: tuple[int, int]  # (base out, max quote in) for buys, (base in, min quote out) for sells
+    payer: Pubkey
+    pre_instructions: list[Instruction] = field(default_factory=list)
+    post_instructions: list[Instruction] = field(default_factory=list)
+    quote_lamports: int = 0  # WSOL the swap may spend (max quote in for buys)
+    created_token_account: Optional[Pubkey] = None
+
+    def instruction(self, wsol_token_account: Pubkey) -> Instruction:
+        if self.intent.side == "buy":
+            return self.template.buy(*self.amounts, wsol_token_account)
+        return self.template.sell(*self.amounts, wsol_token_account)
+
+def transaction_size(message: MessageV0, signers: int = 1) -> int:
+    # signature count + signatures + version prefix + message
+    return 1 + 64 * signers + 1 + len(bytes(message))
+
+def prepare_swap(intent: SwapIntent, payer: Pubkey = None) -> Optional[PreparedSwap]:
+    payer = payer or config.payer_keypair.pubkey()
+    pool_keys = fetch_pool_keys(intent.pair_address)
+    if pool_keys is None:
+        print(f"No pool keys found for {intent.pair_address}, skipping swap.")
+        return None
+    creator_vault_authority, creator_vault_ata = get_creator_vault_info(pool_keys.creator)
+    if creator_vault_authority is None or creator_vault_ata is None:
+        print(f"No creator vault info found for {intent.pair_address}, skipping swap.")
+        return None
+    mint_info = get_mint_info(pool_keys.base_mint)
+    if mint_info is None:
+        print(f"No mint info found for {intent.pair_address}, skipping swap.")
+        return None
+    base_reserve, quote_reserve = get_pool_reserves(pool_keys)
+    if base_reserve is None or quote_reserve is None:
+        print(f"No reserves found for {intent.pair_address}, skipping swap.")
+        return None
+
+    mint = pool_keys.base_mint
+    user_volume_accumulator = get_user_volume_accumulator(payer)
+
+    if intent.side == "buy":
+        if intent.quote_amount is not None:
+            max_quote_amount_in = int(intent.quote_amount * (1 + intent.slippage / 100))
+            base_amount_out = sol_for_tokens(intent.quote_amount, base_reserve, quote_reserve)
+        else:
+            max_quote_amount_in = int((intent.amount * (1 + intent.slippage / 100)) * 1e9)
+            base_amount_out = sol_for_tokens(int(intent.amount * 1e9), base_reserve, quote_reserve)
+
+        pre_instructions = []
+        created_token_account = None
+        token_account = get_token_account(mint, payer)
+        if token_account is None:
+            token_account = get_associated_token_address(payer, mint, mint_info.token_program)
+            # Idempotent, as buys of the same mint may be packed into several transactions.
+            pre_instructions.append(create_idempotent_associated_token_account(payer, payer, mint, mint_info.token_program))
+            created_token_account = token_account
+
+        template = get_swap_template(pool_keys, payer, token_account, mint_info.token_program,
+                                     creator_vault_authority, creator_vault_ata, user_volume_accumulator)
+        return PreparedSwap(
+            intent=intent,
+            pool_keys=pool_keys,
+            template=template,
+            amounts=(base_amount_out, max_quote_amount_in),
+            payer=payer,
+            pre_instructions=pre_instructions,
+            quote_lamports=max_quote_amount_in,
+            created_token_account=created_token_account,
+        )
+
+    if intent.side == "sell":
+        if intent.base_amount is not None:
+            base_amount_in = intent.base_amount
+        else:
+            if not (1 <= intent.amount <= 100):
+                print("Percentage must be between 1 and 100.")
+                return None
+            token_balance = get_token_balance(mint, payer)
+            if not token_balance:
+                print(f"Token balance is zero for {intent.pair_address}, skipping swap.")
+                return None
+            base_amount_in = int(token_balance * (intent.amount / 100))
+        sol_out = tokens_for_sol(base_amount_in, base_reserve, quote_reserve)
+        min_quote_amount_out = int(sol_out * (1 - intent.slippage / 100))
+
+        token_account = get_associated_token_address(payer, mint, mint_info.token_program)
+        template = get_swap_template(pool_keys, payer, token_account, mint_info.token_program,
+                                     creator_vault_authority, creator_vault_ata, user_volume_accumulator)
+        post_instructions = []
+        if intent.base_amount is None and intent.amount == 100:
+            post_instructions.append(close_account(mint_info.token_program, token_account, payer, payer))
+        return PreparedSwap(
+            intent=intent,
+            pool_keys=pool_keys,
+            template=template,
+            amounts=(base_amount_in, min_quote_amount_out),
+            payer=payer,
+            post_instructions=post_instructions,
+        )
+
+    raise ValueError(f"side must be 'buy' or 'sell', got {intent.side!r}")
+
+def _compile(swaps: list[PreparedSwap], blockhash: Hash, units_per_swap: int, unit_price: int, rent: int) -> MessageV0:
+    # Sells run first so their proceeds land in the shared WSOL account;
+    # buys are still funded up front since sell proceeds aren't guaranteed.
+    swaps = sorted(swaps, key=lambda swap: swap.intent.side != "sell")
+    payer = swaps[0].payer
+    if any(swap.payer != payer for swap in swaps):
+        raise ValueError("Swaps packed into one transaction must share a payer.")
+    lamports = rent + sum(swap.quote_lamports for swap in swaps)
+    wsol_token_account, wsol_instructions, close_wsol_account_instruction = create_wsol_account_instructions(lamports, payer)
+
+    instructions = [
+        set_compute_unit_limit(min(units_per_swap * len(swaps), MAX_COMPUTE_UNITS)),
+        set_compute_unit_price(unit_price),
+        *wsol_instructions,
+    ]
+    created = set()
+    for swap in swaps:
+        # Two buys of the same mint would otherwise both try to create its ATA.
+        if swap.created_token_account not in created:
+            instructions.extend(swap.pre_instructions)
+            if swap.created_token_account is not None:
+                created.add(swap.created_token_account)
+        instructions.append(swap.instruction(wsol_token_account))
+    instructions.append(close_wsol_account_instruction)
+    for swap in swaps:
+        instructions.extend(swap.post_instructions)
+
+    tables = lookup_tables.tables_for(*(swap.pool_keys for swap in swaps))
+    return MessageV0.try_compile(payer, instructions, tables, blockhash)
+
+def pack_swaps(
+    swaps: list[PreparedSwap],
+    blockhash: Hash,
+    units_per_swap: int = UNIT_BUDGET,
+    unit_price: int = UNIT_PRICE,
+    rent: Optional[int] = None,
+) -> list[MessageV0]:
+    # Greedily fills each message with as many swaps as fit under the packet
+    # size and compute limits, sharing one WSOL account and one set of
+    # compute-budget instructions. Swaps of different payers go in separate
+    # messages. rent is the shared WSOL account's rent-exempt minimum.
+    #
+    # Every swap added recompiles the whole candidate message, as shared
+    # accounts and lookup tables make the size non-additive. That is O(k^2)
+    # compiles' worth of work for a message of k swaps, but k is capped by
+    # the packet size at a handful, so packing n swaps stays O(n * k).
+    if rent is None:
+        rent = chain_state.get_rent_exempt_minimum()
+    messages: list[MessageV0] = []
+    current: list[PreparedSwap] = []
+    current_message: Optional[MessageV0] = None
+    max_swaps = max(MAX_COMPUTE_UNITS // units_per_swap, 1)
+
+    for swap in swaps:
+        candidate = current + [swap]
+        message = None
+        if len(candidate) <= max_swaps:
+            try:
+                message = _compile(candidate, blockhash, units_per_swap, unit_price, rent)
+                if transaction_size(message) > PACKET_DATA_SIZE:
+                    message = None
+            except Exception:
+                message = None
+
+        if message is not None:
+            current, current_message = candidate, message
+            continue
+        if not current:
+            print(f"Swap for {swap.intent.pair_address} does not fit in a transaction, skipping.")
+            continue
+        messages.append(current_message)
+        current = [swap]
+        current_message = _compile(current, blockhash, units_per_swap, unit_price, rent)
+        if transaction_size(current_message) > PACKET_DATA_SIZE:
+            print(f"Swap for {swap.intent.pair_address} does not fit in a transaction, skipping.")
+            current, current_message = [], None
+
+    if current_message is not None:
+        messages.append(current_message)
+    return messages
+
+def build_swap_transactions(intents: list[SwapIntent], payer: Keypair = None) -> list[VersionedTransaction]:
+    payer = payer or config.payer_keypair
+    prepared = [swap for swap in (prepare_swap(intent, payer.pubkey()) for intent in intents) if swap is not None]
+    if not prepared:
+        return []
+    # Batched swaps aren't confirmed here, so the portfolio queries their
+    # mints again on next use.
+    cached = common_utils.portfolio_for(payer.pubkey())
+    if cached is not None:
+        for swap in prepared:
+            cached.invalidate(swap.pool_keys.base_mint)
+    messages = pack_swaps(prepared, chain_state.get_blockhash().blockhash)
+    return [VersionedTransaction(message, [payer]) for message in messages]
+
+def send_swap_transactions(transactions: list[VersionedTransaction]) -> list[Optional[Signature]]:
+    signatures = []
+    for txn in transactions:
+        try:
+            signatures.append(config.client.send_transaction(txn=txn, opts=TxOpts(skip_preflight=False)).value)
+        except Exception as e:
+            print("Error occurred sending batched transaction:", e)
+            signatures.append(None)
+    return signatures
@@ -0,0 +1,599 @@
+import os
+import struct
+import sys
+import timeit
+
+from solders.pubkey import Pubkey  # type: ignore
+
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+
+from constants import *
+import pda
+import pool_utils
+import swap_template
+
+def report(name: str, seconds: float, runs: int) -> None:
+    print(f"{name:<48} {seconds / runs * 1e6:>10.2f} us/op {runs / seconds:>14,.0f} ops/s")
+
+def bench_pda(runs: int = 20_000) -> None:
+    creator = Pubkey.new_unique()
+    user = Pubkey.new_unique()
+
+    def uncached() -> None:
+        Pubkey.find_program_address([b"creator_vault", bytes(creator)], PF_AMM)
+        Pubkey.find_program_address([b"user_volume_accumulator", bytes(user)], PF_AMM)
+
+    def cached() -> None:
+        pda.get_creator_vault_authority(creator)
+        pda.get_user_volume_accumulator(user)
+
+    report("pda: per-trade derivation (uncached)", timeit.timeit(uncached, number=runs), runs)
+    report("pda: per-trade derivation (cached)", timeit.timeit(cached, number=runs), runs)
+
+    creators = [Pubkey.new_unique() for _ in range(runs)]
+    pda.clear_pda_cache()
+    report("pda: batch creator vault derivation", timeit.timeit(lambda: pda.derive_creator_vault_authorities(creators), number=1), runs)
+
+def bench_pool_decode(runs: int = 20_000) -> None:
+    # Real pool accounts carry extra trailing fields after coin_creator.
+    account_size = 301
+    accounts = [os.urandom(account_size) for _ in range(runs)]
+    report("pool decode: struct, one by one", timeit.timeit(lambda: [pool_utils.decode_pool(a) for a in accounts], number=1), runs)
+    report("pool decode: struct, bulk list", timeit.timeit(lambda: pool_utils.decode_pools(accounts), number=1), runs)
+    buffer = b"".join(accounts)
+    report("pool decode: struct, bulk buffer", timeit.timeit(lambda: pool_utils.decode_pools(buffer, account_size), number=1), runs)
+
+    try:
+        from construct import Padding, Struct, Int8ul, Int16ul, Int64ul, Bytes
+    except ImportError:
+        print("pool decode: construct not installed, skipping baseline")
+        return
+    layout = Struct(
+        Padding(8),
+        "pool_bump" / Int8ul,
+        "index" / Int16ul,
+        "creator" / Bytes(32),
+        "base_mint" / Bytes(32),
+        "quote_mint" / Bytes(32),
+        "lp_mint" / Bytes(32),
+        "pool_base_token_account" / Bytes(32),
+        "pool_quote_token_account" / Bytes(32),
+        "lp_supply" / Int64ul,
+        "coin_creator" / Bytes(32),
+    )
+    report("pool decode: construct (previous POOL_LAYOUT)", timeit.timeit(lambda: [layout.parse(a) for a in accounts], number=1), runs)
+
+def bench_quotes(pools: int = 100, sizes: int = 1_000) -> None:
+    import numpy as np
+    import batch_quote
+
+    rng = np.random.default_rng(0)
+    base = rng.integers(10**14, 10**15, pools)
+    quote = rng.integers(10**10, 10**11, pools)
+    amounts = np.arange(1, sizes + 1) * 10**6
+    runs = pools * sizes
+
+    def scalar() -> None:
+        for b, q in zip(base.tolist(), quote.tolist()):
+            for a in amounts.tolist():
+                pool_utils.sol_for_tokens(a, b, q)
+
+    report("quotes: scalar sol_for_tokens loop", timeit.timeit(scalar, number=1), runs)
+    report("quotes: quote_grid buy", timeit.timeit(lambda: batch_quote.quote_grid(amounts, base, quote, "buy"), number=1), runs)
+    report("quotes: quote_grid sell", timeit.timeit(lambda: batch_quote.quote_grid(amounts, base, quote, "sell"), number=1), runs)
+
+def bench_instructions(runs: int = 20_000) -> None:
+    k = [Pubkey.new_unique() for _ in range(11)]
+    pool_keys = pool_utils.PoolKeys(*k[:6])
+    payer, token_account, wsol_token_account, base_token_program, user_volume_accumulator = k[6:]
+    creator_vault_authority, creator_vault_ata = Pubkey.new_unique(), Pubkey.new_unique()
+
+    # The per-call construction buy() used before templates.
+    def rebuild() -> Instruction:
+        keys = [
+            AccountMeta(pubkey=pool_keys.amm, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+            AccountMeta(pubkey=GLOBAL_CONFIG, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=pool_keys.base_mint, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=pool_keys.quote_mint, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=token_account, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=wsol_token_account, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=pool_keys.pool_base_token_account, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=pool_keys.pool_quote_token_account, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT_TOKEN_ACCOUNT, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=base_token_program, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=ASSOCIATED_TOKEN_PROGRAM, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=EVENT_AUTH, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=PF_AMM, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=creator_vault_ata, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=creator_vault_authority, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=GLOBAL_VOLUME_ACCUMULATOR, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=user_volume_accumulator, is_signer=False, is_writable=True),
+        ]
+        data = bytearray()
+        data.extend(bytes.fromhex("66063d1201daebea"))
+        data.extend(struct.pack('<Q', 1_000_000))
+        data.extend(struct.pack('<Q', 2_000_000))
+        return Instruction(PF_AMM, bytes(data), keys)
+
+    def templated() -> Instruction:
+        template = swap_template.get_swap_template(
+            pool_keys, payer, token_account, base_token_program,
+            creator_vault_authority, creator_vault_ata, user_volume_accumulator,
+        )
+        return template.buy(1_000_000, 2_000_000, wsol_token_account)
+
+    report("instructions: rebuild account metas", timeit.timeit(rebuild, number=runs), runs)
+    report("instructions: cached swap template", timeit.timeit(templated, number=runs), runs)
+
+def bench_wsol() -> None:
+    # Message size and instruction count of a buy with a per-trade WSOL
+    # account vs the persistent WSOL ATA (already funded, and topped up).
+    from solders.hash import Hash  # type: ignore
+    from solders.message import MessageV0  # type: ignore
+    from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
+    from pump_swap import create_wsol_account_instructions
+    from wsol import WsolAccount
+
+    k = [Pubkey.new_unique() for _ in range(12)]
+    template = swap_template.SwapTemplate(pool_utils.PoolKeys(*k[:6]), *k[6:])
+    payer = k[6]
+    budget = [set_compute_unit_limit(150_000), set_compute_unit_price(1_000_000)]
+
+    def size(wsol_token_account, pre, post) -> tuple[int, int]:
+        instructions = [*budget, *pre, template.buy(1_000_000, 2_000_000, wsol_token_account), *post]
+        message = MessageV0.try_compile(payer, instructions, [], Hash.default())
+        return len(instructions), 1 + 64 + 1 + len(bytes(message))
+
+    wsol_token_account, create, close = create_wsol_account_instructions(2_039_280 + 2_000_000)
+    account = WsolAccount(owner=payer, client=None, async_client=None)
+    account.exists, account.balance = True, 10_000_000
+    funded = size(account.address, account.top_up_instructions(2_000_000), [])
+    account.balance = 0
+    topped_up = size(account.address, account.top_up_instructions(2_000_000), [])
+    for name, (count, nbytes) in (
+        ("per-trade create/init/close", size(wsol_token_account, create, [close])),
+        ("persistent ATA, funded", funded),
+        ("persistent ATA, transfer + sync_native", topped_up),
+    ):
+        print(f"wsol: {name:<42} {count:>3} instructions {nbytes:>6} bytes")
+
+def bench_decode(runs: int = 20_000) -> None:
+    # Client side cost and payload size of reading two vault balances from a
+    # getMultipleAccounts response: jsonParsed vs raw base64 vs a sliced amount.
+    import base64
+    import json
+    from solders.rpc.responses import GetMultipleAccountsJsonParsedResp, GetMultipleAccountsResp  # type: ignore
+    import token_accounts
+
+    mint, owner = Pubkey.new_unique(), Pubkey.new_unique()
+    amounts = [812_345_678_901_234, 84_123_456_789]
+    data = [bytes(mint) + bytes(owner) + struct.pack("<Q", amount) + bytes(36) + b"\x01" + bytes(56) for amount in amounts]
+
+    def account(value) -> dict:
+        return {"data": value, "executable": False, "lamports": 2039280, "owner": str(TOKEN_PROGRAM_ID), "rentEpoch": 18446744073709551615, "space": 165}
+
+    def response(values) -> str:
+        return json.dumps({"jsonrpc": "2.0", "id": 1, "result": {"context": {"slot": 300_000_000}, "value": values}})
+
+    parsed = response([account({
+        "program": "spl-token",
+        "parsed": {
+            "info": {
+                "isNative": False,
+                "mint": str(mint),
+                "owner": str(owner),
+                "state": "initialized",
+                "tokenAmount": {"amount": str(amount), "decimals": 6, "uiAmount": amount / 1e6, "uiAmountString": str(amount / 1e6)},
+            },
+            "type": "account",
+        },
+        "space": 165,
+    }) for amount in amounts])
+    raw = response([account([base64.b64encode(d).decode(), "base64"]) for d in data])
+    sliced = response([account([base64.b64encode(struct.pack("<Q", amount)).decode(), "base64"]) for amount in amounts])
+
+    def decode_parsed() -> list[int]:
+        resp = GetMultipleAccountsJsonParsedResp.from_json(parsed)
+        return [int(a.data.parsed["info"]["tokenAmount"]["amount"]) for a in resp.value]
+
+    def decode_raw(payload: str):
+        return lambda: [token_accounts.decode_token_amount(a.data) for a in GetMultipleAccountsResp.from_json(payload).value]
+
+    assert decode_parsed() == decode_raw(raw)() == decode_raw(sliced)() == amounts
+    for name, payload, fn in (
+        ("jsonParsed", parsed, decode_parsed),
+        ("base64", raw, decode_raw(raw)),
+        ("base64, amount slice", sliced, decode_raw(sliced)),
+    ):
+        report(f"decode: {name} ({len(payload)} bytes)", timeit.timeit(fn, number=runs), runs)
+
+def bench_e2e(trades: int = 3, latency: float = 0.05, slot_time: float = 0.4) -> None:
+    # buy/sell against fake_rpc.FakeRpc with latency seconds per request:
+    # time until the transaction lands, time until it is confirmed, and the
+    # RPC requests each trade makes. Cold trades start with empty pool and
+    # blockhash caches. Sync confirms by polling, async over websocket.
+    import asyncio
+    import contextlib
+    import io
+    import time
+    from collections import Counter
+    import config
+    import pump_swap
+    import pump_swap_async
+    from chain_state import chain_state
+    from confirmation import confirmation_watcher
+    from fake_rpc import FakeRpc
+
+    def cold() -> None:
+        pool_utils.clear_pool_cache()
+        chain_state.invalidate()
+
+    def summary(name: str, results: list, calls: Counter) -> None:
+        landed = sum(t for t, _ in results) / len(results)
+        confirmed = sum(t for _, t in results) / len(results)
+        requests = sum(calls.values()) / len(results)
+        print(f"e2e: {name:<24} {landed * 1e3:>8.1f} ms to land {confirmed * 1e3:>8.1f} ms to confirm {requests:>5.1f} requests")
+        print(f"     {', '.join(f'{method} {count / len(results):g}' for method, count in sorted(calls.items()))}")
+
+    with FakeRpc(latency=latency, slot_time=slot_time, websocket=True) as fake:
+        fake.install(config.client, config.async_client)
+        confirmation_watcher.ws_url = fake.ws_url
+        pool_keys = fake.add_pool()
+        pair = str(pool_keys.amm)
+
+        async def run(label: str, buy, sell) -> None:
+            scenarios = (
+                ("buy, cold", cold, lambda: buy(pair, 0.01)),
+                ("buy, warm", None, lambda: buy(pair, 0.01)),
+                ("sell 100%, warm", lambda: buy(pair, 0.01), lambda: sell(pair, 100)),
+            )
+            for name, setup, trade in scenarios:
+                results, calls = [], Counter()
+                for _ in range(trades):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        if setup is not None:
+                            setup_result = setup()
+                            if asyncio.iscoroutine(setup_result):
+                                await setup_result
+                        fake.reset_calls()
+                        start = time.monotonic()
+                        result = trade()
+                        ok = await result if asyncio.iscoroutine(result) else result
+                    assert ok, f"{label} {name} failed"
+                    results.append((fake.landed[-1][1] - start, time.monotonic() - start))
+                    calls += fake.calls
+                summary(f"{label} {name}", results, calls)
+
+        async def run_all() -> None:
+            await run("sync", pump_swap.buy, pump_swap.sell)
+            await run("async", pump_swap_async.buy, pump_swap_async.sell)
+            await confirmation_watcher.stop()
+
+        asyncio.run(run_all())
+
+def bench_telemetry(runs: int = 200_000, trades: int = 5, latency: float = 0.05) -> None:
+    # Cost of a span while telemetry is disabled and enabled, then the
+    # per-stage breakdown of warm buys against fake_rpc.FakeRpc.
+    import contextlib
+    import io
+    import config
+    import pump_swap
+    from fake_rpc import FakeRpc
+    from telemetry import Telemetry, telemetry
+
+    def bare() -> None:
+        pass
+
+    disabled = Telemetry(enabled=False)
+    enabled = Telemetry(enabled=True)
+
+    def span(t: Telemetry):
+        def run() -> None:
+            with t.span("stage"):
+                pass
+        return run
+
+    report("telemetry: no span", timeit.timeit(bare, number=runs), runs)
+    report("telemetry: span, disabled", timeit.timeit(span(disabled), number=runs), runs)
+    report("telemetry: span, enabled", timeit.timeit(span(enabled), number=runs), runs)
+
+    with FakeRpc(latency=latency, slot_time=0.05) as fake:
+        fake.install(config.client, config.async_client)
+        pair = str(fake.add_pool().amm)
+        telemetry.enabled = True
+        telemetry.reset()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(trades + 1):
+                    assert pump_swap.buy(pair, 0.01)
+        finally:
+            telemetry.enabled = config.TELEMETRY
+        for stage, stats in sorted(telemetry.stage_summary().items(), key=lambda item: -item[1]["mean"]):
+            print(f"telemetry: buy stage {stage:<24} {stats['mean'] * 1e3:>10.2f} ms mean {stats['count']:>4} spans")
+
+def bench_trader(rounds: int = 3, latency: float = 0.05, slot_time: float = 0.4, wallet_counts: tuple[int, ...] = (1, 4, 16, 64)) -> None:
+    # Trades per second of a TradeExecutor against fake_rpc.FakeRpc as the
+    # number of wallets grows; each round every wallet buys once.
+    import asyncio
+    import time
+    import config
+    from solders.keypair import Keypair  # type: ignore
+    from batch_swap import SwapIntent
+    from chain_state import chain_state
+    from confirmation import confirmation_watcher
+    from fake_rpc import FakeRpc
+    from trader import Trader, TradeExecutor
+
+    with FakeRpc(latency=latency, slot_time=slot_time, websocket=True) as fake:
+        fake.install(config.client, config.async_client)
+        chain_state.invalidate()
+        confirmation_watcher.ws_url = fake.ws_url
+        pairs = [str(fake.add_pool().amm) for _ in range(4)]
+
+        async def run() -> None:
+            for wallets in wallet_counts:
+                traders = [Trader(Keypair()) for _ in range(wallets)]
+                for trader in traders:
+                    fake.airdrop(trader.pubkey, 10 * 10**9)
+                executor = TradeExecutor(traders)
+                orders = [(trader, SwapIntent(pairs[i % len(pairs)], "buy", 0.01)) for i, trader in enumerate(traders)]
+                await executor.run(orders)  # warm the caches and balances
+                start = time.perf_counter()
+                results = []
+                for _ in range(rounds):
+                    results += await executor.run(orders)
+                elapsed = time.perf_counter() - start
+                assert all(results), executor.stats()
+                print(f"trader: {wallets:>3} wallets {len(results) / elapsed:>10.1f} trades/s {elapsed / rounds * 1e3:>8.1f} ms/round")
+            await confirmation_watcher.stop()
+
+        asyncio.run(run())
+
+def bench_armed(trades: int = 5, latency: float = 0.05, slot_time: float = 0.4) -> None:
+    # Decision-to-land time of a buy on a pool the wallet hasn't traded
+    # yet: Trader.buy does its lookups after the decision, ArmedOrder.fire()
+    # only sends a transaction signed in advance. Runs on fake_rpc.FakeRpc
+    # with latency seconds per request. Each armed order is re-signed after
+    # another wallet's buy moves the streamed reserves.
+    import asyncio
+    import time
+    import config
+    from solders.keypair import Keypair  # type: ignore
+    from armed_order import ArmedOrder
+    from chain_state import chain_state
+    from confirmation import confirmation_watcher
+    from fake_rpc import FakeRpc
+    from reserve_tracker import ReserveTracker
+    from trader import Trader
+
+    with FakeRpc(latency=latency, slot_time=slot_time, websocket=True) as fake:
+        fake.install(config.client, config.async_client)
+        chain_state.invalidate()
+        confirmation_watcher.ws_url = fake.ws_url
+
+        async def run() -> None:
+            tracker = ReserveTracker(fake.ws_url)
+            tracker.start()
+            await tracker.connected.wait()
+            pool_utils.use_reserve_tracker(tracker)
+            try:
+                trader, other = Trader(Keypair()), Trader(Keypair())
+                fake.airdrop(trader.pubkey, 100 * 10**9)
+                fake.airdrop(other.pubkey, 100 * 10**9)
+                direct, armed, sends, rebuilds = [], [], [], 0
+                for _ in range(trades):
+                    fake.reset_calls()
+                    start = time.monotonic()
+                    assert await trader.buy(str(fake.add_pool().amm), 0.01)
+                    direct.append(fake.landed[-1][1] - start)
+
+                    pool_keys = fake.add_pool()
+                    tracker.track([pool_keys])
+                    order = ArmedOrder(trader, str(pool_keys.amm), "buy", 0.01)
+                    assert await order.arm()
+                    assert await other.buy(str(pool_keys.amm), 0.01)
+                    await asyncio.sleep(order.refresh_interval * 3)
+                    rebuilds += order.rebuilds > 1
+                    fake.reset_calls()
+                    start = time.monotonic()
+                    assert await order.fire()
+                    armed.append(fake.landed[-1][1] - start)
+                    sends.append(order.latency)
+                print(f"armed: Trader.buy, new pool      {sum(direct) / trades * 1e3:>8.1f} ms decision to land")
+                print(f"armed: ArmedOrder.fire()         {sum(armed) / trades * 1e3:>8.1f} ms decision to land {sum(sends) / trades * 1e3:>8.1f} ms until the RPC accepted it")
+                print(f"armed: re-signed after a reserve change {rebuilds} of {trades} times")
+            finally:
+                pool_utils.use_reserve_tracker(None)
+                await tracker.stop()
+                await confirmation_watcher.stop()
+
+        asyncio.run(run())
+
+def bench_router(runs: int = 2_000, pool_counts: tuple[int, ...] = (2, 10, 50)) -> None:
+    # Time to split an order across pools of one mint, and how much more
+    # the split gets than the best single pool, for a 50 SOL buy and a sell
+    # of about the same size.
+    import random
+    import router
+
+    rng = random.Random(0)
+    for pools in pool_counts:
+        # Pools of different depth whose prices are within 1% of each other.
+        bases = [rng.randint(10**13, 10**15) for _ in range(pools)]
+        reserves = [(base, int(base // 10**4 * rng.uniform(0.99, 1.01))) for base in bases]
+        candidates = [(pool_utils.PoolKeys(*(Pubkey.new_unique() for _ in range(6))), base, quote) for base, quote in reserves]
+        for side, amount in (("buy", 50 * 10**9), ("sell", 5 * 10**14)):
+            report(f"router: split_order {side}, {pools} pools", timeit.timeit(lambda: router.split_order(amount, reserves, side), number=runs), runs)
+            route = router.plan_route(candidates, amount, side)
+            seconds = timeit.timeit(lambda: router.plan_route(candidates, amount, side), number=runs)
+            report(f"router: plan_route {side}, {pools} pools", seconds, runs)
+            print(f"router: {side}, {pools} pools: {len(route.legs)} legs, {route.improvement:+.2%} output vs the best single pool")
+
+def bench_portfolio(trades: int = 5, latency: float = 0.05, slot_time: float = 0.4) -> None:
+    # Warm async buy and sell against fake_rpc.FakeRpc, with and without
+    # a loaded Portfolio: time until the transaction lands and the
+    # getTokenAccountsByOwner requests each trade makes. The sells are of
+    # half the balance, so the token account stays open.
+    import asyncio
+    import contextlib
+    import io
+    import time
+    import config
+    import common_utils
+    import pump_swap_async
+    from chain_state import chain_state
+    from confirmation import confirmation_watcher
+    from fake_rpc import FakeRpc
+    from portfolio import Portfolio
+
+    with FakeRpc(latency=latency, slot_time=slot_time, websocket=True) as fake:
+        fake.install(config.client, config.async_client)
+        chain_state.invalidate()
+        confirmation_watcher.ws_url = fake.ws_url
+        pool_keys = fake.add_pool()
+        pair = str(pool_keys.amm)
+        fake.airdrop(config.payer_keypair.pubkey(), 100 * 10**9)
+
+        async def run(label: str) -> None:
+            for side, trade in (("buy", lambda: pump_swap_async.buy(pair, 0.01)), ("sell 50%", lambda: pump_swap_async.sell(pair, 50))):
+                landed, lookups = 0.0, 0
+                for _ in range(trades):
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        fake.reset_calls()
+                        start = time.monotonic()
+                        ok = await trade()
+                    assert ok, f"{label} {side} failed"
+                    landed += fake.landed[-1][1] - start
+                    lookups += fake.calls.get("getTokenAccountsByOwner", 0)
+                print(f"portfolio: {label:<8} {side:<9} {landed / trades * 1e3:>8.1f} ms to land {lookups / trades:>5.1f} token account lookups")
+
+        async def run_all() -> None:
+            with contextlib.redirect_stdout(io.StringIO()):
+                await pump_swap_async.buy(pair, 0.01)  # warm the pool caches
+            await run("without")
+            cached = Portfolio()
+            assert await cached.load_async()
+            common_utils.use_portfolio(cached)
+            try:
+                await run("with")
+                balance = await cached.get_token_balance_async(pool_keys.base_mint)
+                assert balance == fake.token_balance(cached.accounts[pool_keys.base_mint])
+            finally:
+                common_utils.use_portfolio(None)
+                await confirmation_watcher.stop()
+
+        asyncio.run(run_all())
+
+def bench_import(runs: int = 5, modules: tuple[str, ...] = ("constants", "config", "pump_swap", "pump_swap_async")) -> None:
+    # Cold import time of each module in a fresh interpreter, from
+    # -X importtime (median of runs), then what pump_swap's own imports
+    # cost and what config.init() adds when the clients and keypair are
+    # built at startup.
+    import statistics
+    import subprocess
+
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def python(*args: str) -> subprocess.CompletedProcess:
+        return subprocess.run([sys.executable, *args], capture_output=True, text=True, cwd=here, check=True)
+
+    def importtime(module: str) -> list[tuple[int, str, int]]:
+        # (depth, module, cumulative us) in the order -X importtime prints them.
+        entries = []
+        for line in python("-X", "importtime", "-c", f"import {module}").stderr.splitlines():
+            fields = line.removeprefix("import time:").split("|")
+            if len(fields) != 3 or not fields[1].strip().isdigit():
+                continue
+            name = fields[2].rstrip()
+            entries.append(((len(name) - len(name.lstrip())) // 2, name.strip(), int(fields[1])))
+        return entries
+
+    for module in modules:
+        seconds = [next(us for depth, name, us in importtime(module) if depth == 0 and name == module) / 1e6 for _ in range(runs)]
+        print(f"import: {module:<24} {statistics.median(seconds) * 1e3:>8.1f} ms")
+
+    # The modules imported directly by pump_swap, heaviest first.
+    entries = importtime("pump_swap")
+    end = next(i for i, (depth, name, _) in enumerate(entries) if depth == 0 and name == "pump_swap")
+    start = max((i + 1 for i, (depth, _, _) in enumerate(entries[:end]) if depth == 0), default=0)
+    children = sorted(((us, name) for depth, name, us in entries[start:end] if depth == 1), reverse=True)
+    for us, name in children[:8]:
+        print(f"import:   pump_swap -> {name:<24} {us / 1e3:>8.1f} ms")
+
+    init = python("-c", (
+        "import time, config\n"
+        "from solders.keypair import Keypair\n"
+        "key = str(Keypair())\n"
+        "start = time.perf_counter()\n"
+        "config.init(key)\n"
+        "print(time.perf_counter() - start)"
+    ))
+    print(f"import: {'config.init()':<24} {float(init.stdout) * 1e3:>8.1f} ms")
+
+def bench_backtest(events: int = 4_000_000, pools: int = 1_000, stride: int = 1_000) -> None:
+    import tempfile
+    import time
+    import numpy as np
+    import backtest
+
+    # A synthetic recording: each pool's price random-walks around its own
+    # level, with about 40 updates per slot.
+    rng = np.random.default_rng(0)
+    base0 = rng.integers(10**14, 10**15, pools)
+    quote0 = rng.integers(10**10, 10**11, pools)
+    with tempfile.TemporaryDirectory() as path:
+        with backtest.EventWriter(path) as writer:
+            for start in range(0, events, backtest.CHUNK_EVENTS):
+                n = min(backtest.CHUNK_EVENTS, events - start)
+                pool = rng.integers(0, pools, n)
+                drift = np.exp(rng.normal(0, 0.01, n))
+                base = (base0[pool] * drift).astype(np.uint64)
+                writer.append((start + np.arange(n)) // 40, pool, base, (base0[pool] * quote0[pool] // base).astype(np.uint64))
+
+        def strategy(chunk, bt):
+            # Buy 0.05 SOL every stride rows; sell all of a held pool on
+            # every stride-th of its rows.
+            buys = np.arange(0, len(chunk), stride)
+            held = np.fromiter(bt.positions, dtype=np.int64, count=len(bt.positions))
+            sells = np.flatnonzero(np.isin(chunk.pool, held))[::stride]
+            index = np.concatenate((buys, sells))
+            side = np.concatenate((np.full(len(buys), backtest.BUY), np.full(len(sells), backtest.SELL)))
+            amount = np.concatenate((np.full(len(buys), 0.05), np.full(len(sells), 100.0)))
+            return backtest.Orders(index, side, amount, slippage=1)
+
+        start = time.perf_counter()
+        for chunk in backtest.read_events(path):
+            chunk.quote_reserve.max()
+        read = time.perf_counter() - start
+        result = backtest.Backtest(strategy).run(path)
+
+    report("backtest: read (memory-mapped .npy)", read, events)
+    report("backtest: replay", result.seconds, events)
+    print(f"backtest: {result.orders:,} orders, {result.filled:,} filled, {result.rejected_slippage:,} over slippage, "
+          f"{result.expired:,} expired, {result.skipped:,} skipped, P&L {result.pnl / 1e9:+.4f} SOL")
+
+BENCHMARKS = {
+    "pda": bench_pda,
+    "pool_decode": bench_pool_decode,
+    "quotes": bench_quotes,
+    "instructions": bench_instructions,
+    "wsol": bench_wsol,
+    "decode": bench_decode,
+    "e2e": bench_e2e,
+    "telemetry": bench_telemetry,
+    "trader": bench_trader,
+    "armed": bench_armed,
+    "router": bench_router,
+    "portfolio": bench_portfolio,
+    "import": bench_import,
+    "backtest": bench_backtest,
+}
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
@@ -0,0 +1,134 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from solders.hash import Hash  # type: ignore
+
+import config
+from config import BLOCKHASH_REFRESH_INTERVAL, BLOCKHASH_MAX_AGE
+from constants import ACCOUNT_SPACE
+
+@dataclass
+class BlockhashInfo:
+    blockhash: Hash
+    last_valid_block_height: int
+    fetched_at: float
+
+class ChainState:
+    # Keeps the latest blockhash and the rent-exempt minimum for a token
+    # account in memory so trades don't fetch them on the critical path.
+    # start() refreshes the blockhash from a background thread; without it,
+    # a stale blockhash is refetched on first use. Without clients passed
+    # in, the ones in config are used.
+    def __init__(
+        self,
+        client=None,
+        async_client=None,
+        refresh_interval: float = BLOCKHASH_REFRESH_INTERVAL,
+        max_age: float = BLOCKHASH_MAX_AGE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._client = client
+        self._async_client = async_client
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self.clock = clock
+        self._blockhash: Optional[BlockhashInfo] = None
+        self._rent_exempt_minimum: Optional[int] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def client(self):
+        return config.client if self._client is None else self._client
+
+    @property
+    def async_client(self):
+        return config.async_client if self._async_client is None else self._async_client
+
+    def _is_fresh(self, info: Optional[BlockhashInfo]) -> bool:
+        return info is not None and self.clock() - info.fetched_at < self.max_age
+
+    def _store_blockhash(self, resp) -> BlockhashInfo:
+        info = BlockhashInfo(resp.value.blockhash, resp.value.last_valid_block_height, self.clock())
+        with self._lock:
+            self._blockhash = info
+        return info
+
+    def refresh_blockhash(self) -> BlockhashInfo:
+        return self._store_blockhash(self.client.get_latest_blockhash())
+
+    async def refresh_blockhash_async(self) -> BlockhashInfo:
+        return self._store_blockhash(await self.async_client.get_latest_blockhash())
+
+    def get_blockhash(self) -> BlockhashInfo:
+        info = self._blockhash
+        if self._is_fresh(info):
+            return info
+        return self.refresh_blockhash()
+
+    async def get_blockhash_async(self) -> BlockhashInfo:
+        info = self._blockhash
+        if self._is_fresh(info):
+            return info
+        return await self.refresh_blockhash_async()
+
+    def get_rent_exempt_minimum(self) -> int:
+        if self._rent_exempt_minimum is None:
+            self._rent_exempt_minimum = self.client.get_minimum_balance_for_rent_exemption(ACCOUNT_SPACE).value
+        return self._rent_exempt_minimum
+
+    async def get_rent_exempt_minimum_async(self) -> int:
+        if self._rent_exempt_minimum is None:
+            self._rent_exempt_minimum = (await self.async_client.get_minimum_balance_for_rent_exemption(ACCOUNT_SPACE)).value
+        return self._rent_exempt_minimum
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._blockhash = None
+            self._rent_exempt_minimum = None
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="chain-state-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh_blockhash()
+                self.get_rent_exempt_minimum()
+            except Exception as e:
+                print(f"Error refreshing blockhash: {e}")
+            self._stop.wait(self.refresh_interval)
+
+    def start_async(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run_async())
+        return self._task
+
+    async def _run_async(self) -> None:
+        while True:
+            try:
+                await self.refresh_blockhash_async()
+                await self.get_rent_exempt_minimum_async()
+            except Exception as e:
+                print(f"Error refreshing blockhash: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+chain_state = ChainState()
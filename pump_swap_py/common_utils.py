@@ -1,51 +1,139 @@
-import json
-import time
-from solana.rpc.commitment import Confirmed, Processed
-from solana.rpc.types import TokenAccountOpts
-from solders.signature import Signature #type: ignore
-from solders.pubkey import Pubkey  # type: ignore
-from config import client, payer_keypair
-
-def get_token_balance(mint: Pubkey) -> float | None:
-    response = client.get_token_accounts_by_owner_json_parsed(
-        payer_keypair.pubkey(),
-        TokenAccountOpts(mint=mint),
-        commitment=Processed
-    )
-
-    if response.value:
-        accounts = response.value
-        if accounts:
-            token_amount = accounts[0].account.data.parsed['info']['tokenAmount']['amount']
-            if token_amount:
-                return int(token_amount)
-    return None
-
-def confirm_txn(txn_sig: Signature, max_retries: int = 20, retry_interval: int = 3) -> bool:
-    retries = 1
-    
-    while retries < max_retries:
-        try:
-            txn_res = client.get_transaction(
-                txn_sig, 
-                encoding="json", 
-                commitment=Confirmed, 
-                max_supported_transaction_version=0)
-            
-            txn_json = json.loads(txn_res.value.transaction.meta.to_json())
-            
-            if txn_json['err'] is None:
-                print("Transaction confirmed... try count:", retries)
-                return True
-            
-            print("Error: Transaction not confirmed. Retrying...")
-            if txn_json['err']:
-                print("Transaction failed.")
-                return False
-        except Exception as e:
-            print("Awaiting confirmation... try count:", retries)
-            retries += 1
-            time.sleep(retry_interval)
-    
-    print("Max retries reached. Transaction confirmation failed.")
-    return None
+import time
+from solana.rpc.commitment import Confirmed, Processed
+from solana.rpc.types import TokenAccountOpts
+from solders.signature import Signature #type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.transaction_status import TransactionConfirmationStatus  # type: ignore
+import config
+from confirmation import confirmation_watcher
+from token_accounts import TOKEN_AMOUNT_SLICE, decode_token_amount
+
+CONFIRM_TIMEOUT = 90  # seconds; a blockhash expires after 150 slots, about a minute
+MAX_CONFIRM_ERRORS = 5  # failed status polls in a row before giving up
+
+# When set (see use_portfolio), token accounts and balances of its owner
+# are served from the portfolio instead of owner queries.
+portfolio = None
+
+def use_portfolio(p) -> None:
+    global portfolio
+    portfolio = p
+
+def portfolio_for(owner: Pubkey = None):
+    if portfolio is not None and (owner is None or owner == portfolio.owner):
+        return portfolio
+    return None
+
+def get_token_balance(mint: Pubkey, owner: Pubkey = None) -> float | None:
+    cached = portfolio_for(owner)
+    if cached is not None:
+        return cached.get_token_balance(mint) or None
+
+    response = config.client.get_token_accounts_by_owner(
+        owner or config.payer_keypair.pubkey(),
+        TokenAccountOpts(mint=mint, data_slice=TOKEN_AMOUNT_SLICE),
+        commitment=Processed
+    )
+
+    if response.value:
+        token_amount = decode_token_amount(response.value[0].account.data)
+        if token_amount:
+            return token_amount
+    return None
+
+async def get_token_balance_async(mint: Pubkey, owner: Pubkey = None) -> float | None:
+    cached = portfolio_for(owner)
+    if cached is not None:
+        return await cached.get_token_balance_async(mint) or None
+
+    response = await config.async_client.get_token_accounts_by_owner(
+        owner or config.payer_keypair.pubkey(),
+        TokenAccountOpts(mint=mint, data_slice=TOKEN_AMOUNT_SLICE),
+        commitment=Processed
+    )
+
+    if response.value:
+        token_amount = decode_token_amount(response.value[0].account.data)
+        if token_amount:
+            return token_amount
+    return None
+
+def get_token_account(mint: Pubkey, owner: Pubkey = None) -> Pubkey | None:
+    cached = portfolio_for(owner)
+    if cached is not None:
+        return cached.get_token_account(mint)
+    response = config.client.get_token_accounts_by_owner(owner or config.payer_keypair.pubkey(), TokenAccountOpts(mint), Processed)
+    return response.value[0].pubkey if response.value else None
+
+async def get_token_account_async(mint: Pubkey, owner: Pubkey = None) -> Pubkey | None:
+    cached = portfolio_for(owner)
+    if cached is not None:
+        return await cached.get_token_account_async(mint)
+    response = await config.async_client.get_token_accounts_by_owner(owner or config.payer_keypair.pubkey(), TokenAccountOpts(mint), Processed)
+    return response.value[0].pubkey if response.value else None
+
+def record_trade(mint: Pubkey, token_account: Pubkey, confirmed: bool, delta: int = 0, closed: bool = False, signature: Signature = None, owner: Pubkey = None) -> None:
+    cached = portfolio_for(owner)
+    if cached is not None:
+        cached.record_trade(mint, token_account, confirmed, delta, closed, signature)
+
+def confirm_txn(
+    txn_sig: Signature,
+    max_retries: int = 20,
+    retry_interval: int = 3,
+    last_valid_block_height: int | None = None,
+    timeout: float = CONFIRM_TIMEOUT,
+    max_errors: int = MAX_CONFIRM_ERRORS,
+) -> bool:
+    # Polls the signature status, starting fast and backing off to
+    # retry_interval. With last_valid_block_height the signature is given up
+    # once its blockhash expires instead of after max_retries. Either way it
+    # is given up after timeout seconds, or once max_errors polls in a row
+    # failed, so an unreachable RPC can't block the caller forever.
+    deadline = time.monotonic() + timeout
+    retries = 1
+    errors = 0
+    interval = min(0.4, retry_interval)
+
+    while last_valid_block_height is not None or retries < max_retries:
+        failed = False
+        try:
+            status = config.client.get_signature_statuses([txn_sig]).value[0]
+            if status is not None:
+                if status.err is not None:
+                    print("Transaction failed.")
+                    return False
+                if status.confirmation_status in (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized):
+                    print("Transaction confirmed... try count:", retries)
+                    return True
+        except Exception as e:
+            print(f"Error checking transaction status: {e}")
+            failed = True
+        if last_valid_block_height is not None:
+            try:
+                if config.client.get_block_height(Confirmed).value > last_valid_block_height:
+                    print("Blockhash expired. Transaction confirmation failed.")
+                    return False
+            except Exception as e:
+                print(f"Error checking block height: {e}")
+                failed = True
+        errors = errors + 1 if failed else 0
+        if errors >= max_errors:
+            print("RPC unreachable. Transaction confirmation failed.")
+            return False
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            print("Timed out. Transaction confirmation failed.")
+            return False
+        print("Awaiting confirmation... try count:", retries)
+        retries += 1
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 1.5, retry_interval)
+
+    print("Max retries reached. Transaction confirmation failed.")
+    return False
+
+async def confirm_txn_async(txn_sig: Signature, last_valid_block_height: int, timeout: float = CONFIRM_TIMEOUT) -> bool:
+    confirmed = await confirmation_watcher.wait(txn_sig, last_valid_block_height, timeout)
+    print("Transaction confirmed." if confirmed else "Transaction confirmation failed.")
+    return confirmed
@@ -1,9 +1,55 @@
-from solana.rpc.api import Client
-from solders.keypair import Keypair #type: ignore
-
-PRIV_KEY = "base58_priv_str_here"
-RPC = "rpc_url_here"
-UNIT_BUDGET =  150_000
-UNIT_PRICE =  1_000_000
-client = Client(RPC)
-payer_keypair = Keypair.from_base58_string(PRIV_KEY)
+from telemetry import telemetry
+
+PRIV_KEY = "base58_priv_str_here"
+RPC = "rpc_url_here"
+WS_RPC = "ws_url_here"
+RPC_ENDPOINTS = [RPC] # add more endpoints to hedge slow reads and send transactions through all of them
+UNIT_BUDGET =  150_000
+UNIT_PRICE =  1_000_000
+AUTO_FEES = False # size the CU limit by simulation and the CU price from recent prioritization fees, see fee_engine.py
+CU_MARGIN = 0.1 # headroom added to the simulated compute units
+FEE_PERCENTILE = 75 # percentile of recent prioritization fees to pay
+FEE_CACHE_TTL = 2 # seconds recent prioritization fees are reused
+MAX_UNIT_PRICE = 10_000_000 # cap on the auto-tuned CU price (micro-lamports)
+POOL_CACHE_SIZE = 1024
+POOL_CACHE_TTL = None # seconds, None keeps entries until evicted
+POOL_CACHE_PATH = None # e.g. "pool_cache.json" to persist the cache between runs
+BLOCKHASH_REFRESH_INTERVAL = 2 # seconds between background blockhash refreshes
+BLOCKHASH_MAX_AGE = 30 # seconds before a cached blockhash is refetched on use
+PERSISTENT_WSOL = False # keep a WSOL ATA open between trades instead of creating/closing one per trade
+LOOKUP_TABLE_ADDRESS = None # address lookup table holding the static swap accounts, see lookup_tables.py
+ARMED_ORDER_REFRESH_INTERVAL = 0.1 # seconds between armed order checks for a new blockhash or new pool reserves
+TELEMETRY = False # record per-stage timings of buy/sell and RPC request metrics, see telemetry.py
+telemetry.enabled = TELEMETRY
+
+# client, async_client and payer_keypair are built on first use, so
+# importing the library stays cheap. Call init() at startup to build them
+# before the first trade (and to pass the key and endpoints in from
+# elsewhere, e.g. the environment); it also derives the payer's PDAs.
+LAZY_ATTRIBUTES = ("client", "async_client", "payer_keypair")
+
+def _build(name: str):
+    if name == "payer_keypair":
+        from solders.keypair import Keypair #type: ignore
+        return Keypair.from_base58_string(PRIV_KEY)
+    from rpc_pool import pooled_client, pooled_async_client
+    return pooled_client(RPC_ENDPOINTS) if name == "client" else pooled_async_client(RPC_ENDPOINTS)
+
+def init(priv_key: str = None, rpc_endpoints: list[str] = None, ws_rpc: str = None) -> None:
+    global PRIV_KEY, RPC, RPC_ENDPOINTS, WS_RPC
+    if priv_key is not None:
+        PRIV_KEY = priv_key
+    if rpc_endpoints is not None:
+        RPC, RPC_ENDPOINTS = rpc_endpoints[0], list(rpc_endpoints)
+    if ws_rpc is not None:
+        WS_RPC = ws_rpc
+    for name in LAZY_ATTRIBUTES:
+        globals()[name] = _build(name)
+    import pda
+    pda.precompute_payer_pdas(payer_keypair.pubkey())
+
+def __getattr__(name: str):
+    if name in LAZY_ATTRIBUTES:
+        value = globals()[name] = _build(name)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
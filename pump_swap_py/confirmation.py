@@ -0,0 +1,232 @@
+import asyncio
+from typing import TYPE_CHECKING, Callable, Optional
+
+from solana.rpc.commitment import Commitment, Confirmed, Finalized, Processed
+from solders.rpc.responses import SignatureNotification, SubscriptionResult  # type: ignore
+from solders.signature import Signature  # type: ignore
+from solders.transaction_status import TransactionConfirmationStatus  # type: ignore
+
+import config
+
+if TYPE_CHECKING:
+    from solana.rpc.websocket_api import SolanaWsClientProtocol
+
+SIGNATURE_STATUSES_LIMIT = 256
+
+# TransactionConfirmationStatus isn't hashable, so these are tuples.
+_ACCEPTED_STATUSES = {
+    Processed: (TransactionConfirmationStatus.Processed, TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized),
+    Confirmed: (TransactionConfirmationStatus.Confirmed, TransactionConfirmationStatus.Finalized),
+    Finalized: (TransactionConfirmationStatus.Finalized,),
+}
+
+class ConfirmationWatcher:
+    # Confirms many signatures at once. Each signature gets a
+    # signatureSubscribe over websocket; in parallel, pending signatures are
+    # polled in batches with getSignatureStatuses, backing off while nothing
+    # changes. A signature whose blockhash has expired (block height past its
+    # last_valid_block_height) without landing resolves to False. The
+    # websocket endpoint defaults to config.WS_RPC, read when the watcher
+    # starts; websocket=False polls only.
+    def __init__(
+        self,
+        client=None,
+        ws_url: Optional[str] = None,
+        websocket: bool = True,
+        commitment: Commitment = Confirmed,
+        min_poll_interval: float = 0.4,
+        max_poll_interval: float = 3.0,
+        reconnect_delay: float = 1.0,
+    ):
+        self._client = client
+        self._ws_url = ws_url
+        self.websocket = websocket
+        self.commitment = commitment
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.reconnect_delay = reconnect_delay
+        self._pending: dict[Signature, tuple[asyncio.Future, int]] = {}
+        self._subscriptions: dict[int, Signature] = {}
+        self._wake = asyncio.Event()
+        self._ws: Optional["SolanaWsClientProtocol"] = None
+        self._tasks: list[asyncio.Task] = []
+        self._subscribing: set[asyncio.Task] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def client(self):
+        return config.async_client if self._client is None else self._client
+
+    @property
+    def ws_url(self) -> str:
+        return config.WS_RPC if self._ws_url is None else self._ws_url
+
+    @ws_url.setter
+    def ws_url(self, ws_url: Optional[str]) -> None:
+        self._ws_url = ws_url
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def watch(
+        self,
+        signature: Signature,
+        last_valid_block_height: int,
+        callback: Optional[Callable[[Signature, bool], None]] = None,
+    ) -> asyncio.Future:
+        self.start()
+        entry = self._pending.get(signature)
+        if entry is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[signature] = (future, last_valid_block_height)
+            if self._ws is not None:
+                # The loop only keeps a weak reference to its tasks.
+                task = asyncio.ensure_future(self._subscribe(self._ws, signature))
+                self._subscribing.add(task)
+                task.add_done_callback(self._subscribing.discard)
+            self._wake.set()
+        else:
+            future = entry[0]
+        if callback is not None:
+            future.add_done_callback(lambda f: callback(signature, f.result()) if not f.cancelled() else None)
+        return future
+
+    async def wait(self, signature: Signature, last_valid_block_height: int, timeout: Optional[float] = None) -> bool:
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.watch(signature, last_valid_block_height)), timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    def resolve(self, signature: Signature, confirmed: bool) -> None:
+        entry = self._pending.pop(signature, None)
+        if entry is not None and not entry[0].done():
+            entry[0].set_result(confirmed)
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Tasks and futures from a previous event loop can't be reused.
+            self._loop = loop
+            self._pending.clear()
+            self._subscriptions.clear()
+            self._wake = asyncio.Event()
+            self._tasks = []
+            self._subscribing = set()
+        if self._tasks and not all(task.done() for task in self._tasks):
+            return
+        ws_url = self.ws_url if self.websocket else None
+        if self.websocket and not (ws_url or "").startswith(("ws://", "wss://")):
+            # Otherwise every signature would wait on polling alone while
+            # the websocket loop retries an endpoint that can't exist.
+            raise ValueError(f"No websocket endpoint configured ({ws_url!r}), set config.WS_RPC or pass websocket=False")
+        self._tasks = [asyncio.create_task(self._poll_loop())]
+        if ws_url:
+            self._tasks.append(asyncio.create_task(self._ws_loop(ws_url)))
+
+    async def stop(self) -> None:
+        for task in list(self._subscribing):
+            task.cancel()
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        for signature in list(self._pending):
+            future, _ = self._pending.pop(signature)
+            future.cancel()
+
+    async def poll_once(self) -> bool:
+        # Returns True if any signature was resolved.
+        signatures = list(self._pending)
+        if not signatures:
+            return False
+        resolved = False
+        accepted = _ACCEPTED_STATUSES[self.commitment]
+        for i in range(0, len(signatures), SIGNATURE_STATUSES_LIMIT):
+            chunk = signatures[i:i + SIGNATURE_STATUSES_LIMIT]
+            resp = await self.client.get_signature_statuses(chunk)
+            for signature, status in zip(chunk, resp.value):
+                if status is None:
+                    continue
+                if status.err is not None:
+                    self.resolve(signature, False)
+                    resolved = True
+                elif status.confirmation_status in accepted:
+                    self.resolve(signature, True)
+                    resolved = True
+
+        if self._pending:
+            block_height = (await self.client.get_block_height(self.commitment)).value
+            for signature, (_, last_valid_block_height) in list(self._pending.items()):
+                if block_height > last_valid_block_height:
+                    self.resolve(signature, False)
+                    resolved = True
+        return resolved
+
+    async def _poll_loop(self) -> None:
+        interval = self.min_poll_interval
+        while True:
+            if not self._pending:
+                self._wake.clear()
+                await self._wake.wait()
+                interval = self.min_poll_interval
+            self._wake.clear()
+            try:
+                if await self.poll_once():
+                    interval = self.min_poll_interval
+                else:
+                    interval = min(interval * 1.5, self.max_poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error polling signature statuses: {e}")
+                interval = self.max_poll_interval
+            try:
+                await asyncio.wait_for(self._wake.wait(), interval)
+                interval = self.min_poll_interval
+            except asyncio.TimeoutError:
+                pass
+
+    async def _subscribe(self, ws: "SolanaWsClientProtocol", signature: Signature) -> None:
+        try:
+            await ws.signature_subscribe(signature, commitment=self.commitment)
+        except Exception as e:
+            print(f"Error subscribing to {signature}: {e}")
+
+    def _handle(self, ws: "SolanaWsClientProtocol", message) -> None:
+        if isinstance(message, SubscriptionResult):
+            body = ws.subscriptions.get(message.result)
+            if body is not None and hasattr(body, "signature"):
+                self._subscriptions[message.result] = body.signature
+        elif isinstance(message, SignatureNotification):
+            # signatureSubscribe is single-shot: the server drops it after notifying.
+            signature = self._subscriptions.pop(message.subscription, None)
+            if signature is not None:
+                self.resolve(signature, message.result.value.err is None)
+
+    async def _ws_loop(self, ws_url: str) -> None:
+        # websockets is only imported once something is watched.
+        from solana.rpc.websocket_api import connect
+
+        while True:
+            try:
+                async with connect(ws_url) as ws:
+                    self._ws = ws
+                    self._subscriptions.clear()
+                    for signature in list(self._pending):
+                        await self._subscribe(ws, signature)
+                    async for messages in ws:
+                        for message in messages:
+                            self._handle(ws, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Confirmation websocket lost: {e}")
+            finally:
+                self._ws = None
+            await asyncio.sleep(self.reconnect_delay)
+
+confirmation_watcher = ConfirmationWatcher()
@@ -1,15 +1,31 @@
-from solders.pubkey import Pubkey #type: ignore
-
-GLOBAL_CONFIG = Pubkey.from_string("ADyA8hdefvWN2dbGGWFotbzWxrAvLW83WG6QCVXvJKqw")
-SYSTEM_PROGRAM = Pubkey.from_string("11111111111111111111111111111111")
-ASSOCIATED_TOKEN_PROGRAM = Pubkey.from_string("ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL")
-PROTOCOL_FEE_RECIPIENT = Pubkey.from_string("62qc2CNXwrYqQScmEdiZFFAnJR262PxWEuNQtxfafNgV")
-PROTOCOL_FEE_RECIPIENT_TOKEN_ACCOUNT = Pubkey.from_string("94qWNrtmfn42h3ZjUZwWvK1MEo9uVmmrBPd2hpNjYDjb")
-EVENT_AUTH = Pubkey.from_string("GS4CU59F31iL7aR2Q8zVS8DRrcRnXX1yjQ66TqNVQnaR")
-PF_AMM = Pubkey.from_string("pAMMBay6oceH9fJKBRHGP5D4bD4sWpmSwMn52FMfXEA")
-GLOBAL_VOLUME_ACCUMULATOR = Pubkey.from_string("C2aFPdENg4A2HQsmrd5rTw5TaYBX5Ku887cWjbFKtZpw")
-
-TOKEN_PROGRAM_ID = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
-ACCOUNT_SPACE = 165
-
-WSOL = Pubkey.from_string("So11111111111111111111111111111111111111112")
\ No newline at end of file
+from solders.pubkey import Pubkey #type: ignore
+
+# Addresses are kept as hex (base58 in the comment): decoding base58 costs
+# several times more than from_bytes at import.
+
+GLOBAL_CONFIG = Pubkey.from_bytes(bytes.fromhex("890ba644fe1f55aa19f11cd2d2ec14d3233b6e0a4beaeef72b69858e21e170d6"))  # ADyA8hdefvWN2dbGGWFotbzWxrAvLW83WG6QCVXvJKqw
+SYSTEM_PROGRAM = Pubkey.from_bytes(bytes.fromhex("0000000000000000000000000000000000000000000000000000000000000000"))  # 11111111111111111111111111111111
+ASSOCIATED_TOKEN_PROGRAM = Pubkey.from_bytes(bytes.fromhex("8c97258f4e2489f1bb3d1029148e0d830b5a1399daff1084048e7bd8dbe9f859"))  # ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL
+PROTOCOL_FEE_RECIPIENT = Pubkey.from_bytes(bytes.fromhex("4ac2f8d0dd5cbc97e3289c197cb5062a54f3d956b9ce6e5115f96567aa5cb3e6"))  # 62qc2CNXwrYqQScmEdiZFFAnJR262PxWEuNQtxfafNgV
+PROTOCOL_FEE_RECIPIENT_TOKEN_ACCOUNT = Pubkey.from_bytes(bytes.fromhex("77d915955f8880731ceb4a75a0cc96c174fa4095c4e1d9967acfc42845ae67ae"))  # 94qWNrtmfn42h3ZjUZwWvK1MEo9uVmmrBPd2hpNjYDjb
+EVENT_AUTH = Pubkey.from_bytes(bytes.fromhex("e54a709528839f61c0b9b86079891c139216e47a71b62fb73bec72169458745e"))  # GS4CU59F31iL7aR2Q8zVS8DRrcRnXX1yjQ66TqNVQnaR
+PF_AMM = Pubkey.from_bytes(bytes.fromhex("0c14defc825ec67694250818bb654065f4298d3156d571b4d4f8090c18e9a863"))  # pAMMBay6oceH9fJKBRHGP5D4bD4sWpmSwMn52FMfXEA
+GLOBAL_VOLUME_ACCUMULATOR = Pubkey.from_bytes(bytes.fromhex("a3d7bb127e58adc12ca68f83437ec2e1c3f9820de93e58f9178a2918ddaaf7b4"))  # C2aFPdENg4A2HQsmrd5rTw5TaYBX5Ku887cWjbFKtZpw
+
+TOKEN_PROGRAM_ID = Pubkey.from_bytes(bytes.fromhex("06ddf6e1d765a193d9cbe146ceeb79ac1cb485ed5f5b37913a8cf5857eff00a9"))  # TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA
+TOKEN_2022_PROGRAM_ID = Pubkey.from_bytes(bytes.fromhex("06ddf6e1ee758fde18425dbce46ccddab61afc4d83b90d27febdf928d8a18bfc"))  # TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb
+ACCOUNT_SPACE = 165
+
+SYSVAR_RENT = Pubkey.from_bytes(bytes.fromhex("06a7d517192c5c51218cc94c3d4af17f58daee089ba1fd44e3dbd98a00000000"))  # SysvarRent111111111111111111111111111111111
+
+WSOL = Pubkey.from_bytes(bytes.fromhex("069b8857feab8184fb687f634618c035dac439dc1aeb3b5598a0f00000000001"))  # So11111111111111111111111111111111111111112
+
+BUY_DISCRIMINATOR = bytes.fromhex("66063d1201daebea")
+SELL_DISCRIMINATOR = bytes.fromhex("33e685a4017f83ad")
+POOL_DISCRIMINATOR = bytes.fromhex("f19a6d0411b16dbc")
+
+LP_FEE_BPS = 20
+PROTOCOL_FEE_BPS = 5
+FEE_DENOMINATOR = 10_000
+
+SIGNATURE_FEE = 5_000  # lamports per signature
@@ -0,0 +1,716 @@
+import asyncio
+import base64
+import hashlib
+import json
+import random
+import struct
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Union
+
+import websockets
+from solders.address_lookup_table_account import ID as ADDRESS_LOOKUP_TABLE_PROGRAM, AddressLookupTable  # type: ignore
+from solders.hash import Hash  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+from constants import *
+import pda
+from pool_utils import POOL_STRUCT, PoolKeys
+from rpc_pool import PooledAsyncHTTPProvider, PooledHTTPProvider
+from swap_template import SWAP_DATA
+from token_accounts import (
+    MINT_SIZE,
+    MINT_STRUCT,
+    TOKEN_ACCOUNT_AMOUNT,
+    TOKEN_ACCOUNT_AMOUNT_OFFSET,
+    TOKEN_ACCOUNT_SIZE,
+    TOKEN_ACCOUNT_STRUCT,
+    decode_token_account,
+    decode_token_amount,
+    get_associated_token_address,
+)
+
+POOL_ACCOUNT_SIZE = 301
+# u32 type, u64 deactivation slot, u64 last extended slot, u8 start index,
+# Option<Pubkey> authority, u16 padding.
+LOOKUP_TABLE_META = struct.Struct("<IQQBB32sH")
+RENT_EXEMPT_LAMPORTS_PER_BYTE = 6960
+RENT_ACCOUNT_OVERHEAD = 128
+MAX_PROCESSING_AGE = 150
+FINALIZED_DEPTH = 32
+FIRST_SLOT = 300_000_000
+# Block height trails the slot by the number of skipped slots.
+SKIPPED_SLOTS = 20_000_000
+TOKEN_CLOSE_ACCOUNT = 9
+# Custom program errors returned by the AMM for a failed slippage check and
+# an insufficient balance.
+EXCEEDED_SLIPPAGE = 6004
+INSUFFICIENT_FUNDS = 6023
+
+BASE58_ALPHABET = "123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
+
+def _b58decode(value: str) -> bytes:
+    number = 0
+    for char in value:
+        number = number * 58 + BASE58_ALPHABET.index(char)
+    body = number.to_bytes((number.bit_length() + 7) // 8, "big")
+    return b"\x00" * (len(value) - len(value.lstrip("1"))) + body
+
+class FakeAccount:
+    __slots__ = ("lamports", "owner", "data")
+
+    def __init__(self, lamports: int, owner: Pubkey, data: bytes):
+        self.lamports = lamports
+        self.owner = owner
+        self.data = bytes(data)
+
+    def encode(self, data_slice: Optional[dict] = None) -> dict:
+        data = self.data
+        if data_slice:
+            data = data[data_slice["offset"]:data_slice["offset"] + data_slice["length"]]
+        return {
+            "data": [base64.b64encode(data).decode(), "base64"],
+            "executable": False,
+            "lamports": self.lamports,
+            "owner": str(self.owner),
+            "rentEpoch": 18446744073709551615,
+            "space": len(self.data),
+        }
+
+class TransactionError(Exception):
+    def __init__(self, err):
+        super().__init__(err)
+        self.err = err
+
+def _instruction_error(index: int, code: int) -> TransactionError:
+    return TransactionError({"InstructionError": [index, {"Custom": code}]})
+
+def _error_message(err) -> str:
+    if isinstance(err, dict) and "InstructionError" in err:
+        index, error = err["InstructionError"]
+        if isinstance(error, dict) and "Custom" in error:
+            error = f"custom program error: {error['Custom']:#x}"
+        return f"Transaction simulation failed: Error processing Instruction {index}: {error}"
+    return f"Transaction simulation failed: {err}"
+
+def token_account_data(mint: Pubkey, owner: Pubkey, amount: int) -> bytes:
+    data = TOKEN_ACCOUNT_STRUCT.pack(bytes(mint), bytes(owner), amount, 1, b"\x00" * 4, 0, 0)
+    return data + bytes(TOKEN_ACCOUNT_SIZE - len(data))
+
+def mint_data(decimals: int, supply: int = 0) -> bytes:
+    data = bytes(36) + MINT_STRUCT.pack(supply, decimals, 1)[36:]
+    return data + bytes(MINT_SIZE - len(data))
+
+def pool_data(pool_keys: PoolKeys, lp_mint: Pubkey, index: int = 0) -> bytes:
+    data = POOL_STRUCT.pack(
+        255, index, bytes(pool_keys.creator), bytes(pool_keys.base_mint), bytes(pool_keys.quote_mint), bytes(lp_mint),
+        bytes(pool_keys.pool_base_token_account), bytes(pool_keys.pool_quote_token_account), 0, bytes(pool_keys.creator),
+    )
+    data = POOL_DISCRIMINATOR + data[len(POOL_DISCRIMINATOR):]
+    return data + bytes(POOL_ACCOUNT_SIZE - len(data))
+
+def lookup_table_data(addresses: list[Pubkey], authority: Optional[Pubkey] = None) -> bytes:
+    meta = LOOKUP_TABLE_META.pack(1, 2**64 - 1, 0, 0, authority is not None, bytes(authority) if authority else bytes(32), 0)
+    return meta + b"".join(bytes(address) for address in addresses)
+
+class FakeRpc:
+    # An in-process Solana RPC for benchmarks and offline runs. Serves
+    # synthetic PF_AMM pools, their vaults and mints, blockhashes and
+    # signature statuses over HTTP JSON-RPC (and, with websocket=True,
+    # account/program/signature subscriptions). Sent transactions run their
+    # PF_AMM buy/sell instructions as constant-product swaps against the
+    # vaults, all or nothing, and confirm confirm_slots slots later. Every
+    # request sleeps for latency seconds (or latency[method]) plus up to
+    # jitter, and is counted in calls.
+    def __init__(
+        self,
+        latency: Union[float, dict[str, float]] = 0.0,
+        jitter: float = 0.0,
+        slot_time: float = 0.4,
+        confirm_slots: int = 1,
+        units_per_instruction: int = 40_000,
+        prioritization_fees: Optional[list[int]] = None,
+        websocket: bool = False,
+        host: str = "127.0.0.1",
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.slot_time = slot_time
+        self.confirm_slots = confirm_slots
+        self.units_per_instruction = units_per_instruction
+        self.prioritization_fees = prioritization_fees or [0, 1_000, 5_000, 10_000, 50_000, 100_000]
+        self.websocket = websocket
+        self.host = host
+        self.calls: Counter[str] = Counter()
+        self.accounts: dict[Pubkey, FakeAccount] = {}
+        self.pools: dict[Pubkey, PoolKeys] = {}
+        self._signatures: dict[str, tuple[int, Optional[dict], float]] = {}
+        self._token_balances: dict[str, list[dict]] = {}
+        # (signature, time.monotonic()) of every transaction that landed.
+        self.landed: list[tuple[str, float]] = []
+        self._blockhashes: dict[str, int] = {}
+        self._lock = threading.RLock()
+        self._genesis = time.monotonic()
+        self._http: Optional[ThreadingHTTPServer] = None
+        self._ws_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ws_server = None
+        self._ws_subscriptions: dict[int, tuple[str, object, object, str]] = {}
+        self._ws_connections: set = set()
+        self._next_subscription = 1
+        self._threads: list[threading.Thread] = []
+        self._deferred: Optional[list[tuple[Pubkey, Optional[FakeAccount]]]] = None
+        self.url: Optional[str] = None
+        self.ws_url: Optional[str] = None
+
+    def __enter__(self) -> "FakeRpc":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # -- chain state --
+
+    @property
+    def slot(self) -> int:
+        return FIRST_SLOT + int((time.monotonic() - self._genesis) / self.slot_time)
+
+    @property
+    def block_height(self) -> int:
+        return self.slot - SKIPPED_SLOTS
+
+    def blockhash(self) -> tuple[str, int]:
+        slot = self.slot
+        blockhash = str(Hash(hashlib.sha256(struct.pack("<Q", slot)).digest()))
+        with self._lock:
+            self._blockhashes.setdefault(blockhash, slot - SKIPPED_SLOTS)
+        return blockhash, slot - SKIPPED_SLOTS + MAX_PROCESSING_AGE
+
+    def rent_exempt_minimum(self, space: int) -> int:
+        return (RENT_ACCOUNT_OVERHEAD + space) * RENT_EXEMPT_LAMPORTS_PER_BYTE
+
+    def reset_calls(self) -> None:
+        with self._lock:
+            self.calls.clear()
+            self.landed.clear()
+
+    # -- accounts --
+
+    def set_account(self, address: Pubkey, owner: Pubkey, data: bytes, lamports: Optional[int] = None) -> None:
+        account = FakeAccount(self.rent_exempt_minimum(len(data)) if lamports is None else lamports, owner, data)
+        with self._lock:
+            self.accounts[address] = account
+        self._notify_account(address, account)
+
+    def airdrop(self, address: Pubkey, lamports: int) -> None:
+        account = self.accounts.get(address)
+        if account is None:
+            self.set_account(address, SYSTEM_PROGRAM, b"", lamports)
+        else:
+            self.set_account(address, account.owner, account.data, account.lamports + lamports)
+
+    def set_token_balance(self, owner: Pubkey, mint: Pubkey, amount: int, token_program: Pubkey = TOKEN_PROGRAM_ID) -> Pubkey:
+        address = get_associated_token_address(owner, mint, token_program)
+        self.set_account(address, token_program, token_account_data(mint, owner, amount))
+        return address
+
+    def token_balance(self, address: Pubkey) -> Optional[int]:
+        account = self.accounts.get(address)
+        return decode_token_amount(account.data) if account is not None else None
+
+    def add_pool(
+        self,
+        base_reserve: int = 1_000_000_000 * 10**6,
+        quote_reserve: int = 100 * 10**9,
+        decimals: int = 6,
+        base_mint: Optional[Pubkey] = None,
+        creator: Optional[Pubkey] = None,
+        token_program: Pubkey = TOKEN_PROGRAM_ID,
+    ) -> PoolKeys:
+        amm = Pubkey.new_unique()
+        base_mint = base_mint or Pubkey.new_unique()
+        creator = creator or Pubkey.new_unique()
+        pool_keys = PoolKeys(
+            amm=amm,
+            base_mint=base_mint,
+            quote_mint=WSOL,
+            pool_base_token_account=get_associated_token_address(amm, base_mint, token_program),
+            pool_quote_token_account=get_associated_token_address(amm, WSOL),
+            creator=creator,
+        )
+        if base_mint not in self.accounts:
+            self.set_account(base_mint, token_program, mint_data(decimals))
+        if WSOL not in self.accounts:
+            self.set_account(WSOL, TOKEN_PROGRAM_ID, mint_data(9))
+        self.set_account(pool_keys.pool_base_token_account, token_program, token_account_data(base_mint, amm, base_reserve))
+        self.set_account(pool_keys.pool_quote_token_account, TOKEN_PROGRAM_ID, token_account_data(WSOL, amm, quote_reserve))
+        creator_vault_authority = pda.get_creator_vault_authority(creator)
+        creator_vault_ata = get_associated_token_address(creator_vault_authority, WSOL)
+        if creator_vault_ata not in self.accounts:
+            self.set_account(creator_vault_ata, TOKEN_PROGRAM_ID, token_account_data(WSOL, creator_vault_authority, 0))
+        with self._lock:
+            self.pools[amm] = pool_keys
+        self.set_account(amm, PF_AMM, pool_data(pool_keys, Pubkey.new_unique()))
+        return pool_keys
+
+    def reserves(self, pool_keys: PoolKeys) -> tuple[int, int]:
+        return self.token_balance(pool_keys.pool_base_token_account), self.token_balance(pool_keys.pool_quote_token_account)
+
+    def set_reserves(self, pool_keys: PoolKeys, base_reserve: int, quote_reserve: int) -> None:
+        self._set_amount(pool_keys.pool_base_token_account, base_reserve)
+        self._set_amount(pool_keys.pool_quote_token_account, quote_reserve)
+
+    def add_lookup_table(self, addresses: list[Pubkey], authority: Optional[Pubkey] = None) -> Pubkey:
+        address = Pubkey.new_unique()
+        self.set_account(address, ADDRESS_LOOKUP_TABLE_PROGRAM, lookup_table_data(addresses, authority))
+        return address
+
+    def _set_amount(self, address: Pubkey, amount: int) -> None:
+        account = self.accounts[address]
+        data = bytearray(account.data)
+        TOKEN_ACCOUNT_AMOUNT.pack_into(data, TOKEN_ACCOUNT_AMOUNT_OFFSET, amount)
+        self.set_account(address, account.owner, data, account.lamports)
+
+    # -- transactions --
+
+    def _account_keys(self, message) -> list[Pubkey]:
+        keys = list(message.account_keys)
+        lookups = getattr(message, "address_table_lookups", None) or []
+        writable, readonly = [], []
+        for lookup in lookups:
+            table = self.accounts.get(lookup.account_key)
+            if table is None:
+                raise TransactionError("AddressLookupTableNotFound")
+            addresses = AddressLookupTable.deserialize(table.data).addresses
+            writable += [addresses[i] for i in lookup.writable_indexes]
+            readonly += [addresses[i] for i in lookup.readonly_indexes]
+        return keys + writable + readonly
+
+    def _swap(self, index: int, accounts: list[Pubkey], data: bytes) -> None:
+        discriminator, amount, limit = SWAP_DATA.unpack_from(data)
+        pool_keys = self.pools.get(accounts[0])
+        if pool_keys is None:
+            raise TransactionError({"InstructionError": [index, "InvalidAccountData"]})
+        user, base_mint, user_base, base_vault, quote_vault = accounts[1], accounts[3], accounts[5], accounts[7], accounts[8]
+        base_reserve, quote_reserve = self.token_balance(base_vault), self.token_balance(quote_vault)
+        balance = self.token_balance(user_base) or 0
+        if discriminator == BUY_DISCRIMINATOR:
+            if amount >= base_reserve:
+                raise _instruction_error(index, INSUFFICIENT_FUNDS)
+            quote_in = -(-quote_reserve * amount // (base_reserve - amount))
+            lp_fee = -(-quote_in * LP_FEE_BPS // FEE_DENOMINATOR)
+            protocol_fee = -(-quote_in * PROTOCOL_FEE_BPS // FEE_DENOMINATOR)
+            if quote_in + lp_fee + protocol_fee > limit:
+                raise _instruction_error(index, EXCEEDED_SLIPPAGE)
+            base_reserve, quote_reserve, balance = base_reserve - amount, quote_reserve + quote_in + lp_fee, balance + amount
+        elif discriminator == SELL_DISCRIMINATOR:
+            if amount > balance:
+                raise _instruction_error(index, INSUFFICIENT_FUNDS)
+            quote_out = quote_reserve * amount // (base_reserve + amount)
+            lp_fee = quote_out * LP_FEE_BPS // FEE_DENOMINATOR
+            protocol_fee = quote_out * PROTOCOL_FEE_BPS // FEE_DENOMINATOR
+            if quote_out - lp_fee - protocol_fee < limit:
+                raise _instruction_error(index, EXCEEDED_SLIPPAGE)
+            base_reserve, quote_reserve, balance = base_reserve + amount, quote_reserve - quote_out + lp_fee, balance - amount
+        else:
+            raise TransactionError({"InstructionError": [index, "InvalidInstructionData"]})
+        self._set_amount(base_vault, base_reserve)
+        self._set_amount(quote_vault, quote_reserve)
+        if user_base in self.accounts:
+            self._set_amount(user_base, balance)
+        else:
+            self.set_account(user_base, self.accounts[base_mint].owner, token_account_data(base_mint, user, balance))
+
+    def _execute(self, txn: VersionedTransaction) -> int:
+        # Returns the compute units used; raises TransactionError, leaving
+        # every account as it was.
+        message = txn.message
+        blockhash = str(message.recent_blockhash)
+        issued_at = self._blockhashes.get(blockhash)
+        if issued_at is None or self.block_height > issued_at + MAX_PROCESSING_AGE:
+            raise TransactionError("BlockhashNotFound")
+        keys = self._account_keys(message)
+        snapshot = dict(self.accounts)
+        units = 0
+        # Account notifications are held back until the transaction succeeds.
+        self._deferred = []
+        try:
+            for index, ix in enumerate(message.instructions):
+                program = keys[ix.program_id_index]
+                accounts = [keys[i] for i in bytes(ix.accounts)]
+                data = bytes(ix.data)
+                if program == PF_AMM:
+                    self._swap(index, accounts, data)
+                    units += self.units_per_instruction
+                elif program in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID) and data[:1] == bytes([TOKEN_CLOSE_ACCOUNT]):
+                    if self.accounts.pop(accounts[0], None) is not None:
+                        self._notify_account(accounts[0], None)
+                    units += 3_000
+                else:
+                    units += 3_000
+        except Exception:
+            self.accounts = snapshot
+            raise
+        finally:
+            deferred, self._deferred = self._deferred, None
+        for address, account in deferred:
+            self._notify_account(address, account)
+        return units
+
+    def send_transaction(self, txn: VersionedTransaction, preflight: bool = True) -> str:
+        signature = str(txn.signatures[0])
+        with self._lock:
+            if signature in self._signatures:
+                return signature
+            err = None
+            try:
+                self._execute(txn)
+            except TransactionError as e:
+                if preflight:
+                    raise
+                err = e.err
+            landed_at = time.monotonic()
+            self._signatures[signature] = (self.slot, err, landed_at)
+            self._token_balances[signature] = [] if err else self._post_token_balances(txn.message)
+            self.landed.append((signature, landed_at))
+        self._notify_signature(signature)
+        return signature
+
+    def simulate_transaction(self, txn: VersionedTransaction) -> dict:
+        with self._lock:
+            snapshot = dict(self.accounts)
+            err, units = None, 0
+            try:
+                units = self._execute(txn)
+            except TransactionError as e:
+                err = e.err
+            self.accounts = snapshot
+        return {"err": err, "logs": [], "accounts": None, "unitsConsumed": units, "returnData": None}
+
+    def _post_token_balances(self, message) -> list[dict]:
+        balances = []
+        for index, address in enumerate(self._account_keys(message)):
+            account = self.accounts.get(address)
+            if account is None or account.owner not in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID) or len(account.data) < TOKEN_ACCOUNT_SIZE:
+                continue
+            token_account = decode_token_account(account.data)
+            balances.append({
+                "accountIndex": index,
+                "mint": str(Pubkey.from_bytes(token_account.mint)),
+                "owner": str(Pubkey.from_bytes(token_account.owner)),
+                "programId": str(account.owner),
+                "uiTokenAmount": {"amount": str(token_account.amount)},
+            })
+        return balances
+
+    def transaction(self, signature: str) -> Optional[dict]:
+        # Only the fields the library reads: slot, error and post-token balances.
+        entry = self._signatures.get(signature)
+        if entry is None:
+            return None
+        slot, err, _ = entry
+        return {"slot": slot, "meta": {"err": err, "postTokenBalances": self._token_balances.get(signature, [])}}
+
+    def signature_status(self, signature: str) -> Optional[dict]:
+        entry = self._signatures.get(signature)
+        if entry is None:
+            return None
+        slot, err, _ = entry
+        depth = self.slot - slot
+        if depth >= FINALIZED_DEPTH:
+            status = "finalized"
+        elif depth >= self.confirm_slots:
+            status = "confirmed"
+        else:
+            status = "processed"
+        return {
+            "slot": slot,
+            "confirmations": None if status == "finalized" else depth,
+            "err": err,
+            "status": {"Err": err} if err else {"Ok": None},
+            "confirmationStatus": status,
+        }
+
+    # -- JSON-RPC --
+
+    def _context(self) -> dict:
+        return {"slot": self.slot, "apiVersion": "2.0.0"}
+
+    def _keyed_accounts(self, predicate, config: dict) -> list[dict]:
+        data_slice = config.get("dataSlice")
+        with self._lock:
+            items = list(self.accounts.items())
+        return [{"pubkey": str(address), "account": account.encode(data_slice)} for address, account in items if predicate(address, account)]
+
+    def _matches_filters(self, account: FakeAccount, filters: list[dict]) -> bool:
+        for f in filters:
+            if "dataSize" in f and len(account.data) != f["dataSize"]:
+                return False
+            if "memcmp" in f:
+                offset = f["memcmp"]["offset"]
+                expected = _b58decode(f["memcmp"]["bytes"])
+                if account.data[offset:offset + len(expected)] != expected:
+                    return False
+        return True
+
+    def handle(self, method: str, params: list):
+        config = params[-1] if params and isinstance(params[-1], dict) else {}
+        if method == "getAccountInfo":
+            account = self.accounts.get(Pubkey.from_string(params[0]))
+            return {"context": self._context(), "value": account.encode(config.get("dataSlice")) if account else None}
+        if method == "getMultipleAccounts":
+            accounts = [self.accounts.get(Pubkey.from_string(address)) for address in params[0]]
+            return {"context": self._context(), "value": [a.encode(config.get("dataSlice")) if a else None for a in accounts]}
+        if method == "getBalance":
+            account = self.accounts.get(Pubkey.from_string(params[0]))
+            return {"context": self._context(), "value": account.lamports if account else 0}
+        if method == "getTokenAccountsByOwner":
+            owner = bytes(Pubkey.from_string(params[0]))
+            mint = Pubkey.from_string(params[1]["mint"]) if "mint" in params[1] else None
+            program = Pubkey.from_string(params[1]["programId"]) if "programId" in params[1] else None
+            config = params[2] if len(params) > 2 else {}
+
+            def predicate(_, account: FakeAccount) -> bool:
+                return (
+                    account.owner in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID)
+                    and len(account.data) >= TOKEN_ACCOUNT_SIZE
+                    and account.data[32:64] == owner
+                    and (mint is None or account.data[:32] == bytes(mint))
+                    and (program is None or account.owner == program)
+                )
+
+            return {"context": self._context(), "value": self._keyed_accounts(predicate, config)}
+        if method == "getProgramAccounts":
+            program = Pubkey.from_string(params[0])
+            filters = config.get("filters") or []
+            value = self._keyed_accounts(lambda _, a: a.owner == program and self._matches_filters(a, filters), config)
+            return {"context": self._context(), "value": value} if config.get("withContext") else value
+        if method == "getLatestBlockhash":
+            blockhash, last_valid_block_height = self.blockhash()
+            return {"context": self._context(), "value": {"blockhash": blockhash, "lastValidBlockHeight": last_valid_block_height}}
+        if method == "getSlot":
+            return self.slot
+        if method == "getBlockHeight":
+            return self.block_height
+        if method == "getMinimumBalanceForRentExemption":
+            return self.rent_exempt_minimum(params[0])
+        if method == "getSignatureStatuses":
+            return {"context": self._context(), "value": [self.signature_status(signature) for signature in params[0]]}
+        if method == "getRecentPrioritizationFees":
+            slot = self.slot
+            return [{"slot": slot - i, "prioritizationFee": fee} for i, fee in enumerate(self.prioritization_fees)]
+        if method in ("sendTransaction", "simulateTransaction"):
+            raw = params[0]
+            raw = base64.b64decode(raw) if config.get("encoding", "base58") == "base64" else _b58decode(raw)
+            txn = VersionedTransaction.from_bytes(raw)
+            if method == "simulateTransaction":
+                return {"context": self._context(), "value": self.simulate_transaction(txn)}
+            return self.send_transaction(txn, preflight=not config.get("skipPreflight", False))
+        if method == "getTransaction":
+            # A real node has no processed transactions to return.
+            if config.get("commitment") == "processed":
+                raise ValueError("Method does not support commitment below `confirmed`")
+            return self.transaction(params[0])
+        if method == "getHealth":
+            return "ok"
+        raise LookupError(method)
+
+    def _delay(self, method: str) -> float:
+        latency = self.latency.get(method, self.latency.get("default", 0.0)) if isinstance(self.latency, dict) else self.latency
+        return latency + (random.uniform(0, self.jitter) if self.jitter else 0.0)
+
+    def _respond(self, request: dict) -> dict:
+        method = request.get("method", "")
+        with self._lock:
+            self.calls[method] += 1
+        try:
+            result = self.handle(method, request.get("params") or [])
+            return {"jsonrpc": "2.0", "id": request.get("id"), "result": result}
+        except LookupError:
+            error = {"code": -32601, "message": "Method not found"}
+        except TransactionError as e:
+            # What a real node answers when preflight simulation fails.
+            error = {
+                "code": -32002,
+                "message": _error_message(e.err),
+                "data": {"err": e.err, "logs": [], "accounts": None, "unitsConsumed": 0, "returnData": None},
+            }
+        except Exception as e:
+            error = {"code": -32602, "message": f"Invalid params: {e}"}
+        return {"jsonrpc": "2.0", "id": request.get("id"), "error": error}
+
+    def _serve_http(self, body: bytes) -> bytes:
+        request = json.loads(body)
+        requests = request if isinstance(request, list) else [request]
+        delay = max(self._delay(r.get("method", "")) for r in requests) if requests else 0.0
+        if delay:
+            time.sleep(delay)
+        responses = [self._respond(r) for r in requests]
+        return json.dumps(responses if isinstance(request, list) else responses[0]).encode()
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body are written separately; without this, Nagle's
+            # algorithm delays every keep-alive response by ~40 ms.
+            disable_nagle_algorithm = True
+
+            def do_POST(self) -> None:
+                body = fake._serve_http(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (e.g. a hedged or cancelled request).
+                    pass
+
+            def log_message(self, *args) -> None:
+                pass
+
+        return Handler
+
+    # -- websocket --
+
+    def _send(self, ws, message: dict) -> None:
+        if self._ws_loop is not None:
+            asyncio.run_coroutine_threadsafe(ws.send(json.dumps(message)), self._ws_loop)
+
+    def _notification(self, method: str, subscription: int, value) -> dict:
+        return {
+            "jsonrpc": "2.0",
+            "method": method,
+            "params": {"result": {"context": {"slot": self.slot}, "value": value}, "subscription": subscription},
+        }
+
+    def _notify_account(self, address: Pubkey, account: Optional[FakeAccount]) -> None:
+        if self._deferred is not None:
+            self._deferred.append((address, account))
+            return
+        for subscription, (kind, key, ws, _) in list(self._ws_subscriptions.items()):
+            if kind == "account" and key == address:
+                value = account.encode() if account else {"data": ["", "base64"], "executable": False, "lamports": 0, "owner": str(SYSTEM_PROGRAM), "rentEpoch": 0, "space": 0}
+                self._send(ws, self._notification("accountNotification", subscription, value))
+            elif kind == "program" and account is not None and account.owner == key:
+                value = {"pubkey": str(address), "account": account.encode()}
+                self._send(ws, self._notification("programNotification", subscription, value))
+
+    def _signature_delay(self, signature: str, commitment: str) -> Optional[float]:
+        entry = self._signatures.get(signature)
+        if entry is None:
+            return None
+        slots = {"processed": 0, "confirmed": self.confirm_slots, "finalized": FINALIZED_DEPTH}.get(commitment, self.confirm_slots)
+        return max(0.0, entry[2] + slots * self.slot_time - time.monotonic())
+
+    def _notify_signature(self, signature: str) -> None:
+        for subscription, (kind, key, ws, commitment) in list(self._ws_subscriptions.items()):
+            if kind == "signature" and key == signature:
+                self._schedule_signature(subscription, ws, signature, commitment)
+
+    def _schedule_signature(self, subscription: int, ws, signature: str, commitment: str) -> None:
+        delay = self._signature_delay(signature, commitment)
+        if delay is None or self._ws_loop is None:
+            return
+
+        def fire() -> None:
+            # signatureSubscribe is single-shot.
+            if self._ws_subscriptions.pop(subscription, None) is not None:
+                err = self._signatures[signature][1]
+                self._send(ws, self._notification("signatureNotification", subscription, {"err": err}))
+
+        self._ws_loop.call_soon_threadsafe(self._ws_loop.call_later, delay, fire)
+
+    async def _ws_handler(self, ws, *_) -> None:
+        owned = []
+        self._ws_connections.add(ws)
+        try:
+            async for text in ws:
+                request = json.loads(text)
+                method, params = request.get("method", ""), request.get("params") or []
+                with self._lock:
+                    self.calls[method] += 1
+                config = params[-1] if params and isinstance(params[-1], dict) else {}
+                if method.endswith("Unsubscribe"):
+                    result = self._ws_subscriptions.pop(params[0], None) is not None
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "id": request.get("id"), "result": result}))
+                    continue
+                kinds = {"accountSubscribe": "account", "programSubscribe": "program", "signatureSubscribe": "signature"}
+                if method not in kinds:
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "id": request.get("id"), "error": {"code": -32601, "message": "Method not found"}}))
+                    continue
+                subscription = self._next_subscription
+                self._next_subscription += 1
+                key = params[0] if kinds[method] == "signature" else Pubkey.from_string(params[0])
+                self._ws_subscriptions[subscription] = (kinds[method], key, ws, config.get("commitment", "finalized"))
+                owned.append(subscription)
+                await ws.send(json.dumps({"jsonrpc": "2.0", "id": request.get("id"), "result": subscription}))
+                if kinds[method] == "signature":
+                    self._schedule_signature(subscription, ws, key, config.get("commitment", "finalized"))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self._ws_connections.discard(ws)
+            for subscription in owned:
+                self._ws_subscriptions.pop(subscription, None)
+
+    def _run_ws(self, ready: threading.Event) -> None:
+        loop = asyncio.new_event_loop()
+
+        async def serve() -> None:
+            self._ws_server = await websockets.serve(self._ws_handler, self.host, 0)
+            port = self._ws_server.sockets[0].getsockname()[1]
+            self.ws_url = f"ws://{self.host}:{port}"
+            self._ws_loop = loop
+            ready.set()
+            await self._ws_server.wait_closed()
+
+        loop.run_until_complete(serve())
+        loop.close()
+
+    def disconnect_websockets(self) -> None:
+        # Drops every websocket client, as a node restart or a network blip would.
+        if self._ws_loop is not None:
+            for ws in list(self._ws_connections):
+                asyncio.run_coroutine_threadsafe(ws.close(), self._ws_loop)
+
+    # -- lifecycle --
+
+    def start(self) -> None:
+        self._http = ThreadingHTTPServer((self.host, 0), self._handler())
+        self._http.daemon_threads = True
+        self.url = f"http://{self.host}:{self._http.server_address[1]}"
+        self._threads = [threading.Thread(target=self._http.serve_forever, args=(0.05,), name="fake-rpc-http", daemon=True)]
+        self._threads[0].start()
+        if self.websocket:
+            ready = threading.Event()
+            thread = threading.Thread(target=self._run_ws, args=(ready,), name="fake-rpc-ws", daemon=True)
+            thread.start()
+            ready.wait()
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        if self._http is not None:
+            self._http.shutdown()
+            self._http.server_close()
+            self._http = None
+        if self._ws_server is not None and self._ws_loop is not None:
+            self._ws_loop.call_soon_threadsafe(self._ws_server.close)
+            self._ws_server = None
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+        self._ws_loop = None
+
+    def install(self, client, async_client=None) -> None:
+        # Points existing clients at the fake. Every module shares the
+        # clients created in config.py, so installing on those redirects the
+        # whole library.
+        client._provider = PooledHTTPProvider([self.url])
+        if async_client is not None:
+            async_client._provider = PooledAsyncHTTPProvider([self.url])
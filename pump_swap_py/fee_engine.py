@@ -0,0 +1,241 @@
+import asyncio
+from typing import Optional
+
+from solders.address_lookup_table_account import AddressLookupTableAccount  # type: ignore
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
+from solders.hash import Hash  # type: ignore
+from solders.instruction import Instruction  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+import config
+from config import (
+    UNIT_BUDGET,
+    UNIT_PRICE,
+    AUTO_FEES,
+    CU_MARGIN,
+    FEE_PERCENTILE,
+    FEE_CACHE_TTL,
+    MAX_UNIT_PRICE,
+)
+from pool_utils import LRUCache
+from rpc_pool import raw_request, raw_request_async
+
+MAX_COMPUTE_UNITS = 1_400_000
+# getRecentPrioritizationFees accepts at most 128 accounts.
+PRIORITIZATION_FEE_ACCOUNTS_LIMIT = 128
+# Headroom for the two compute budget instructions themselves.
+COMPUTE_BUDGET_UNITS = 300
+
+Shape = tuple[tuple[bytes, bytes, int], ...]
+
+def instruction_shape(instructions: list[Instruction]) -> Shape:
+    # Instructions with the same program, discriminator and account count
+    # cost about the same to execute, so simulations are cached per shape.
+    return tuple((bytes(ix.program_id), bytes(ix.data[:8]), len(ix.accounts)) for ix in instructions)
+
+def writable_accounts(instructions: list[Instruction]) -> list[Pubkey]:
+    accounts = []
+    for ix in instructions:
+        for meta in ix.accounts:
+            if meta.is_writable and not meta.is_signer and meta.pubkey not in accounts:
+                accounts.append(meta.pubkey)
+    return accounts[:PRIORITIZATION_FEE_ACCOUNTS_LIMIT]
+
+def fee_percentile(fees: list[int], percentile: float) -> Optional[int]:
+    if not fees:
+        return None
+    fees = sorted(fees)
+    return fees[min(len(fees) - 1, int(len(fees) * percentile / 100))]
+
+def _prioritization_fee_request(accounts: list[Pubkey]) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getRecentPrioritizationFees",
+        "params": [[str(account) for account in accounts]],
+    }
+
+def _parse_prioritization_fees(body: dict) -> list[int]:
+    if "error" in body:
+        raise RuntimeError(body["error"])
+    return [entry["prioritizationFee"] for entry in body["result"]]
+
+def get_recent_prioritization_fees(client, accounts: list[Pubkey]) -> list[int]:
+    # solana-py has no wrapper for this method.
+    return _parse_prioritization_fees(raw_request(client, _prioritization_fee_request(accounts)))
+
+async def get_recent_prioritization_fees_async(async_client, accounts: list[Pubkey]) -> list[int]:
+    return _parse_prioritization_fees(await raw_request_async(async_client, _prioritization_fee_request(accounts)))
+
+class FeeEngine:
+    # Picks the compute unit limit from a simulation of the message (cached
+    # per instruction shape) plus CU_MARGIN, and the unit price from the
+    # FEE_PERCENTILE of recent prioritization fees paid for the writable
+    # accounts involved (cached for FEE_CACHE_TTL seconds). Falls back to
+    # UNIT_BUDGET/UNIT_PRICE when disabled or when the RPC calls fail.
+    def __init__(
+        self,
+        client=None,
+        async_client=None,
+        enabled: bool = AUTO_FEES,
+        margin: float = CU_MARGIN,
+        percentile: float = FEE_PERCENTILE,
+        fee_ttl: float = FEE_CACHE_TTL,
+        min_unit_price: int = 0,
+        max_unit_price: int = MAX_UNIT_PRICE,
+        profile_size: int = 256,
+    ):
+        self._client = client
+        self._async_client = async_client
+        self.enabled = enabled
+        self.margin = margin
+        self.percentile = percentile
+        self.min_unit_price = min_unit_price
+        self.max_unit_price = max_unit_price
+        self.profiles = LRUCache(profile_size)
+        self.fees = LRUCache(profile_size, fee_ttl)
+
+    @property
+    def client(self):
+        return config.client if self._client is None else self._client
+
+    @property
+    def async_client(self):
+        return config.async_client if self._async_client is None else self._async_client
+
+    def _simulation_transaction(
+        self,
+        payer: Pubkey,
+        instructions: list[Instruction],
+        lookup_tables: list[AddressLookupTableAccount],
+        blockhash: Hash,
+    ) -> VersionedTransaction:
+        budget = [set_compute_unit_limit(MAX_COMPUTE_UNITS), set_compute_unit_price(0)]
+        message = MessageV0.try_compile(payer, budget + instructions, lookup_tables, blockhash)
+        return VersionedTransaction.populate(message, [Signature.default()] * message.header.num_required_signatures)
+
+    def _unit_limit(self, units_consumed: Optional[int]) -> int:
+        if not units_consumed:
+            return UNIT_BUDGET
+        return min(int(units_consumed * (1 + self.margin)) + COMPUTE_BUDGET_UNITS, MAX_COMPUTE_UNITS)
+
+    def _unit_price(self, fees: list[int]) -> int:
+        price = fee_percentile(fees, self.percentile)
+        if price is None:
+            return UNIT_PRICE
+        return max(self.min_unit_price, min(price, self.max_unit_price))
+
+    def max_fee_lamports(self, unit_limit: int = UNIT_BUDGET) -> int:
+        # The most unit_limit compute units are priced at, for reserving SOL
+        # before the price is picked.
+        unit_price = max(UNIT_PRICE, self.max_unit_price) if self.enabled else UNIT_PRICE
+        return unit_limit * unit_price // 1_000_000
+
+    def record_units(self, instructions: list[Instruction], units_consumed: int) -> None:
+        self.profiles.set(instruction_shape(instructions), units_consumed)
+
+    def compute_unit_limit(
+        self,
+        payer: Pubkey,
+        instructions: list[Instruction],
+        lookup_tables: list[AddressLookupTableAccount],
+        blockhash: Hash,
+    ) -> int:
+        shape = instruction_shape(instructions)
+        units = self.profiles.get(shape)
+        if units is None:
+            try:
+                result = self.client.simulate_transaction(
+                    self._simulation_transaction(payer, instructions, lookup_tables, blockhash)
+                ).value
+                if result.err is None and result.units_consumed:
+                    units = result.units_consumed
+                    self.profiles.set(shape, units)
+                elif result.err is not None:
+                    print(f"Simulation failed: {result.err}")
+            except Exception as e:
+                print(f"Error simulating transaction: {e}")
+        return self._unit_limit(units)
+
+    async def compute_unit_limit_async(
+        self,
+        payer: Pubkey,
+        instructions: list[Instruction],
+        lookup_tables: list[AddressLookupTableAccount],
+        blockhash: Hash,
+    ) -> int:
+        shape = instruction_shape(instructions)
+        units = self.profiles.get(shape)
+        if units is None:
+            try:
+                result = (await self.async_client.simulate_transaction(
+                    self._simulation_transaction(payer, instructions, lookup_tables, blockhash)
+                )).value
+                if result.err is None and result.units_consumed:
+                    units = result.units_consumed
+                    self.profiles.set(shape, units)
+                elif result.err is not None:
+                    print(f"Simulation failed: {result.err}")
+            except Exception as e:
+                print(f"Error simulating transaction: {e}")
+        return self._unit_limit(units)
+
+    def compute_unit_price(self, instructions: list[Instruction]) -> int:
+        accounts = writable_accounts(instructions)
+        key = tuple(accounts)
+        fees = self.fees.get(key)
+        if fees is None:
+            try:
+                fees = get_recent_prioritization_fees(self.client, accounts)
+                self.fees.set(key, fees)
+            except Exception as e:
+                print(f"Error fetching prioritization fees: {e}")
+                fees = []
+        return self._unit_price(fees)
+
+    async def compute_unit_price_async(self, instructions: list[Instruction]) -> int:
+        accounts = writable_accounts(instructions)
+        key = tuple(accounts)
+        fees = self.fees.get(key)
+        if fees is None:
+            try:
+                fees = await get_recent_prioritization_fees_async(self.async_client, accounts)
+                self.fees.set(key, fees)
+            except Exception as e:
+                print(f"Error fetching prioritization fees: {e}")
+                fees = []
+        return self._unit_price(fees)
+
+    def budget_instructions(
+        self,
+        payer: Pubkey,
+        instructions: list[Instruction],
+        lookup_tables: list[AddressLookupTableAccount],
+        blockhash: Hash,
+    ) -> list[Instruction]:
+        if not self.enabled:
+            return [set_compute_unit_limit(UNIT_BUDGET), set_compute_unit_price(UNIT_PRICE)]
+        return [
+            set_compute_unit_limit(self.compute_unit_limit(payer, instructions, lookup_tables, blockhash)),
+            set_compute_unit_price(self.compute_unit_price(instructions)),
+        ]
+
+    async def budget_instructions_async(
+        self,
+        payer: Pubkey,
+        instructions: list[Instruction],
+        lookup_tables: list[AddressLookupTableAccount],
+        blockhash: Hash,
+    ) -> list[Instruction]:
+        if not self.enabled:
+            return [set_compute_unit_limit(UNIT_BUDGET), set_compute_unit_price(UNIT_PRICE)]
+        limit, price = await asyncio.gather(
+            self.compute_unit_limit_async(payer, instructions, lookup_tables, blockhash),
+            self.compute_unit_price_async(instructions),
+        )
+        return [set_compute_unit_limit(limit), set_compute_unit_price(price)]
+
+fee_engine = FeeEngine()
@@ -0,0 +1,190 @@
+import struct
+from typing import Iterable, Optional
+
+from solana.rpc.commitment import Processed
+from solders.address_lookup_table_account import (  # type: ignore
+    ID as ADDRESS_LOOKUP_TABLE_PROGRAM,
+    LOOKUP_TABLE_MAX_ADDRESSES,
+    AddressLookupTable,
+    AddressLookupTableAccount,
+    derive_lookup_table_address,
+)
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+import config
+from config import LOOKUP_TABLE_ADDRESS
+from constants import *
+from chain_state import chain_state
+from common_utils import confirm_txn
+from pool_utils import PoolKeys, get_creator_vault_info
+
+CREATE_LOOKUP_TABLE = struct.Struct("<IQB")
+EXTEND_LOOKUP_TABLE = struct.Struct("<IQ")
+# Sized so the create plus the first extend fit in one transaction.
+MAX_ADDRESSES_PER_EXTEND = 28
+
+# Accounts every swap references regardless of pool. Program IDs that are
+# invoked stay static in the message, so only their use as plain accounts
+# is served from the table.
+STATIC_LOOKUP_ADDRESSES = [
+    GLOBAL_CONFIG,
+    SYSTEM_PROGRAM,
+    ASSOCIATED_TOKEN_PROGRAM,
+    PROTOCOL_FEE_RECIPIENT,
+    PROTOCOL_FEE_RECIPIENT_TOKEN_ACCOUNT,
+    EVENT_AUTH,
+    PF_AMM,
+    GLOBAL_VOLUME_ACCUMULATOR,
+    TOKEN_PROGRAM_ID,
+    TOKEN_2022_PROGRAM_ID,
+    WSOL,
+]
+
+def pool_lookup_addresses(pool_keys: PoolKeys) -> list[Pubkey]:
+    creator_vault_authority, creator_vault_ata = get_creator_vault_info(pool_keys.creator)
+    addresses = [
+        pool_keys.amm,
+        pool_keys.base_mint,
+        pool_keys.quote_mint,
+        pool_keys.pool_base_token_account,
+        pool_keys.pool_quote_token_account,
+    ]
+    if creator_vault_authority is not None and creator_vault_ata is not None:
+        addresses += [creator_vault_authority, creator_vault_ata]
+    return addresses
+
+def create_lookup_table_instruction(authority: Pubkey, payer: Pubkey, recent_slot: int) -> tuple[Pubkey, Instruction]:
+    table, bump = derive_lookup_table_address(authority, recent_slot)
+    keys = [
+        AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+        AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),
+    ]
+    data = CREATE_LOOKUP_TABLE.pack(0, recent_slot, bump)
+    return table, Instruction(ADDRESS_LOOKUP_TABLE_PROGRAM, data, keys)
+
+def extend_lookup_table_instructions(table: Pubkey, authority: Pubkey, payer: Pubkey, addresses: list[Pubkey]) -> list[Instruction]:
+    if len(addresses) > LOOKUP_TABLE_MAX_ADDRESSES:
+        raise ValueError(f"A lookup table holds at most {LOOKUP_TABLE_MAX_ADDRESSES} addresses")
+    keys = [
+        AccountMeta(pubkey=table, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=authority, is_signer=True, is_writable=False),
+        AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+        AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),
+    ]
+    instructions = []
+    for i in range(0, len(addresses), MAX_ADDRESSES_PER_EXTEND):
+        chunk = addresses[i:i + MAX_ADDRESSES_PER_EXTEND]
+        data = EXTEND_LOOKUP_TABLE.pack(2, len(chunk)) + b"".join(bytes(address) for address in chunk)
+        instructions.append(Instruction(ADDRESS_LOOKUP_TABLE_PROGRAM, data, keys))
+    return instructions
+
+class LookupTableCache:
+    # Lookup table accounts are fetched once and kept in memory; trades only
+    # read them. The static table (LOOKUP_TABLE_ADDRESS) applies to every
+    # swap, per-pool tables are registered with register_pool_table().
+    def __init__(self, client=None, async_client=None, static_table: Optional[Pubkey] = None):
+        self._client = client
+        self._async_client = async_client
+        self.static_table = static_table
+        self._tables: dict[Pubkey, AddressLookupTableAccount] = {}
+        self._pool_tables: dict[Pubkey, Pubkey] = {}
+
+    @property
+    def client(self):
+        return config.client if self._client is None else self._client
+
+    @property
+    def async_client(self):
+        return config.async_client if self._async_client is None else self._async_client
+
+    def register_pool_table(self, amm: Pubkey, table: Pubkey) -> None:
+        self._pool_tables[amm] = table
+
+    def put(self, table: Pubkey, data: bytes) -> AddressLookupTableAccount:
+        account = AddressLookupTableAccount(table, list(AddressLookupTable.deserialize(bytes(data)).addresses))
+        self._tables[table] = account
+        return account
+
+    def invalidate(self, table: Optional[Pubkey] = None) -> None:
+        if table is None:
+            self._tables.clear()
+        else:
+            self._tables.pop(table, None)
+
+    def get(self, table: Pubkey) -> Optional[AddressLookupTableAccount]:
+        account = self._tables.get(table)
+        if account is not None:
+            return account
+        try:
+            resp = self.client.get_account_info(table, commitment=Processed)
+            if resp.value is None:
+                print(f"Lookup table {table} not found.")
+                return None
+            return self.put(table, resp.value.data)
+        except Exception as e:
+            print(f"Error fetching lookup table {table}: {e}")
+            return None
+
+    async def get_async(self, table: Pubkey) -> Optional[AddressLookupTableAccount]:
+        account = self._tables.get(table)
+        if account is not None:
+            return account
+        try:
+            resp = await self.async_client.get_account_info(table, commitment=Processed)
+            if resp.value is None:
+                print(f"Lookup table {table} not found.")
+                return None
+            return self.put(table, resp.value.data)
+        except Exception as e:
+            print(f"Error fetching lookup table {table}: {e}")
+            return None
+
+    def _table_addresses(self, pools: Iterable[PoolKeys]) -> list[Pubkey]:
+        tables = [self.static_table] if self.static_table is not None else []
+        for pool_keys in pools:
+            table = self._pool_tables.get(pool_keys.amm)
+            if table is not None and table not in tables:
+                tables.append(table)
+        return tables
+
+    def tables_for(self, *pools: PoolKeys) -> list[AddressLookupTableAccount]:
+        accounts = (self.get(table) for table in self._table_addresses(pools))
+        return [account for account in accounts if account is not None]
+
+    async def tables_for_async(self, *pools: PoolKeys) -> list[AddressLookupTableAccount]:
+        accounts = [await self.get_async(table) for table in self._table_addresses(pools)]
+        return [account for account in accounts if account is not None]
+
+lookup_tables = LookupTableCache(
+    static_table=Pubkey.from_string(LOOKUP_TABLE_ADDRESS) if LOOKUP_TABLE_ADDRESS else None,
+)
+
+def create_lookup_table(addresses: list[Pubkey], payer=None) -> Optional[Pubkey]:
+    # One-off setup: creates a table owned by the payer and fills it. Put the
+    # printed address in LOOKUP_TABLE_ADDRESS (for STATIC_LOOKUP_ADDRESSES) or
+    # pass it to lookup_tables.register_pool_table().
+    payer = payer or config.payer_keypair
+    client = config.client
+    try:
+        recent_slot = client.get_slot(commitment=Processed).value
+        table, create_instruction = create_lookup_table_instruction(payer.pubkey(), payer.pubkey(), recent_slot)
+        extend_instructions = extend_lookup_table_instructions(table, payer.pubkey(), payer.pubkey(), addresses)
+        batches = [[create_instruction, *extend_instructions[:1]], *([ix] for ix in extend_instructions[1:])]
+        for instructions in batches:
+            blockhash_info = chain_state.get_blockhash()
+            message = MessageV0.try_compile(payer.pubkey(), instructions, [], blockhash_info.blockhash)
+            txn_sig = client.send_transaction(VersionedTransaction(message, [payer])).value
+            print("Transaction Signature:", txn_sig)
+            if not confirm_txn(txn_sig, last_valid_block_height=blockhash_info.last_valid_block_height):
+                print("Lookup table transaction failed.")
+                return None
+        print("Lookup table created:", table)
+        return table
+    except Exception as e:
+        print("Error occurred during lookup table creation:", e)
+        return None
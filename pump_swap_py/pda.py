@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Iterable, Optional
+from solders.pubkey import Pubkey  # type: ignore
+from constants import PF_AMM
+
+PDA_CACHE_SIZE = 65_536
+
+# find_program_address walks bump seeds down from 255, hashing each candidate,
+# so the result is memoized per (seeds, program) for the life of the process.
+@lru_cache(maxsize=PDA_CACHE_SIZE)
+def find_program_address(seeds: tuple[bytes, ...], program_id: Pubkey = PF_AMM) -> tuple[Pubkey, int]:
+    return Pubkey.find_program_address(list(seeds), program_id)
+
+def get_creator_vault_authority(creator: Pubkey) -> Pubkey:
+    return find_program_address((b"creator_vault", bytes(creator)), PF_AMM)[0]
+
+def get_user_volume_accumulator(user: Pubkey) -> Pubkey:
+    return find_program_address((b"user_volume_accumulator", bytes(user)), PF_AMM)[0]
+
+def precompute_payer_pdas(payer: Pubkey) -> dict[str, Pubkey]:
+    return {
+        "user_volume_accumulator": get_user_volume_accumulator(payer),
+    }
+
+def derive_creator_vault_authorities(
+    creators: Iterable[Pubkey],
+    max_workers: Optional[int] = None,
+    chunk_size: int = 256,
+) -> dict[Pubkey, Pubkey]:
+    creators = list(dict.fromkeys(creators))
+    if max_workers is None or max_workers <= 1 or len(creators) <= chunk_size:
+        return {creator: get_creator_vault_authority(creator) for creator in creators}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        authorities = executor.map(get_creator_vault_authority, creators, chunksize=chunk_size)
+        return dict(zip(creators, authorities))
+
+def clear_pda_cache() -> None:
+    find_program_address.cache_clear()
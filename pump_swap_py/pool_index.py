@@ -0,0 +1,246 @@
+import asyncio
+import os
+import struct
+from typing import Iterable, Optional
+
+from solana.rpc.commitment import Commitment, Processed
+from solana.rpc.types import DataSliceOpts
+from solana.rpc.websocket_api import connect
+from solders.pubkey import Pubkey  # type: ignore
+from solders.rpc.responses import ProgramNotification  # type: ignore
+
+import config
+from config import WS_RPC
+from constants import PF_AMM, WSOL, POOL_DISCRIMINATOR
+from pool_utils import POOL_STRUCT, PoolKeys, decode_pool
+from token_accounts import TOKEN_ACCOUNT_AMOUNT, TOKEN_AMOUNT_SLICE
+
+SNAPSHOT_MAGIC = b"PSIX"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHI")
+SNAPSHOT_RECORD = struct.Struct("<32s32s32s32s32s32sQQ")
+MULTIPLE_ACCOUNTS_LIMIT = 100
+
+class PoolEntry:
+    __slots__ = ("amm", "base_mint", "quote_mint", "base_vault", "quote_vault", "coin_creator", "base_reserve", "quote_reserve")
+
+    def __init__(self, amm: bytes, base_mint: bytes, quote_mint: bytes, base_vault: bytes, quote_vault: bytes,
+                 coin_creator: bytes, base_reserve: int = 0, quote_reserve: int = 0):
+        self.amm = amm
+        self.base_mint = base_mint
+        self.quote_mint = quote_mint
+        self.base_vault = base_vault
+        self.quote_vault = quote_vault
+        self.coin_creator = coin_creator
+        self.base_reserve = base_reserve
+        self.quote_reserve = quote_reserve
+
+    @property
+    def liquidity(self) -> int:
+        return self.base_reserve * self.quote_reserve
+
+    def to_pool_keys(self) -> PoolKeys:
+        return PoolKeys(
+            amm=Pubkey.from_bytes(self.amm),
+            base_mint=Pubkey.from_bytes(self.base_mint),
+            quote_mint=Pubkey.from_bytes(self.quote_mint),
+            pool_base_token_account=Pubkey.from_bytes(self.base_vault),
+            pool_quote_token_account=Pubkey.from_bytes(self.quote_vault),
+            creator=Pubkey.from_bytes(self.coin_creator),
+        )
+
+class PoolIndex:
+    # All PF_AMM pools in memory, with a mint -> pools multimap and the last
+    # known vault balances, so picking the best pair for a mint needs no RPC.
+    def __init__(self):
+        self._pools: dict[bytes, PoolEntry] = {}
+        self._by_mint: dict[bytes, set[bytes]] = {}
+        self._by_vault: dict[bytes, bytes] = {}
+        self._unfunded: set[bytes] = set()
+        self._liquidity_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._pools)
+
+    def __contains__(self, amm) -> bool:
+        return bytes(amm) in self._pools
+
+    def get(self, amm) -> Optional[PoolEntry]:
+        return self._pools.get(bytes(amm))
+
+    def pools_for_mint(self, mint) -> list[PoolEntry]:
+        mint = bytes(Pubkey.from_string(mint)) if isinstance(mint, str) else bytes(mint)
+        return [self._pools[amm] for amm in self._by_mint.get(mint, ())]
+
+    def best_pair(self, mint) -> Optional[str]:
+        mint = bytes(Pubkey.from_string(mint)) if isinstance(mint, str) else bytes(mint)
+        wsol = bytes(WSOL)
+        best_pool: Optional[PoolEntry] = None
+        for amm in self._by_mint.get(mint, ()):
+            pool = self._pools[amm]
+            if not ((pool.base_mint == mint and pool.quote_mint == wsol) or (pool.base_mint == wsol and pool.quote_mint == mint)):
+                continue
+            if pool.liquidity > 0 and (best_pool is None or pool.liquidity > best_pool.liquidity):
+                best_pool = pool
+        return str(Pubkey.from_bytes(best_pool.amm)) if best_pool is not None else None
+
+    def _add(self, entry: PoolEntry) -> None:
+        old = self._pools.get(entry.amm)
+        if old is not None:
+            if (old.base_vault, old.quote_vault) == (entry.base_vault, entry.quote_vault):
+                entry.base_reserve, entry.quote_reserve = old.base_reserve, old.quote_reserve
+            self._remove(entry.amm)
+        self._pools[entry.amm] = entry
+        for mint in (entry.base_mint, entry.quote_mint):
+            self._by_mint.setdefault(mint, set()).add(entry.amm)
+        self._by_vault[entry.base_vault] = entry.amm
+        self._by_vault[entry.quote_vault] = entry.amm
+
+    def _remove(self, amm: bytes) -> None:
+        entry = self._pools.pop(amm, None)
+        if entry is None:
+            return
+        for mint in (entry.base_mint, entry.quote_mint):
+            pools = self._by_mint.get(mint)
+            if pools is not None:
+                pools.discard(amm)
+                if not pools:
+                    del self._by_mint[mint]
+        self._by_vault.pop(entry.base_vault, None)
+        self._by_vault.pop(entry.quote_vault, None)
+
+    def apply_pool_account(self, amm, data) -> bool:
+        # Returns False for accounts that aren't pools (or were closed).
+        amm = bytes(amm)
+        if len(data) < POOL_STRUCT.size or bytes(data[:8]) != POOL_DISCRIMINATOR:
+            self._remove(amm)
+            return False
+        pool = decode_pool(data)
+        self._add(PoolEntry(amm, pool.base_mint, pool.quote_mint, pool.pool_base_token_account,
+                            pool.pool_quote_token_account, pool.coin_creator))
+        return True
+
+    def remove_pool(self, amm) -> None:
+        self._remove(bytes(amm))
+
+    def apply_vault_balance(self, vault, amount: int) -> None:
+        vault = bytes(vault)
+        amm = self._by_vault.get(vault)
+        if amm is None:
+            return
+        pool = self._pools[amm]
+        if vault == pool.base_vault:
+            pool.base_reserve = amount
+        else:
+            pool.quote_reserve = amount
+
+    def load_from_rpc(self, client=None) -> int:
+        # One getProgramAccounts over PF_AMM, sliced to the fields we decode.
+        client = config.client if client is None else client
+        resp = client.get_program_accounts(
+            PF_AMM,
+            encoding="base64",
+            data_slice=DataSliceOpts(offset=0, length=POOL_STRUCT.size),
+        )
+        for keyed_account in resp.value:
+            self.apply_pool_account(keyed_account.pubkey, keyed_account.account.data)
+        self.refresh_liquidity(client)
+        return len(self._pools)
+
+    def refresh_liquidity(self, client=None, amms: Optional[Iterable] = None) -> None:
+        # Fetches only the 8 byte amount of each vault, 100 vaults per call.
+        client = config.client if client is None else client
+        pools = self._pools.values() if amms is None else [self._pools[bytes(a)] for a in amms if bytes(a) in self._pools]
+        vaults = [vault for pool in pools for vault in (pool.base_vault, pool.quote_vault)]
+        for i in range(0, len(vaults), MULTIPLE_ACCOUNTS_LIMIT):
+            chunk = vaults[i:i + MULTIPLE_ACCOUNTS_LIMIT]
+            try:
+                resp = client.get_multiple_accounts(
+                    [Pubkey.from_bytes(vault) for vault in chunk],
+                    commitment=Processed,
+                    data_slice=TOKEN_AMOUNT_SLICE,
+                )
+            except Exception as e:
+                print(f"Error refreshing pool liquidity: {e}")
+                continue
+            for vault, account in zip(chunk, resp.value):
+                if account is not None and len(account.data) == TOKEN_ACCOUNT_AMOUNT.size:
+                    self.apply_vault_balance(vault, TOKEN_ACCOUNT_AMOUNT.unpack(account.data)[0])
+
+    async def refresh_liquidity_async(self, client=None, amms: Optional[Iterable] = None) -> None:
+        client = config.async_client if client is None else client
+        pools = self._pools.values() if amms is None else [self._pools[bytes(a)] for a in amms if bytes(a) in self._pools]
+        vaults = [vault for pool in pools for vault in (pool.base_vault, pool.quote_vault)]
+        for i in range(0, len(vaults), MULTIPLE_ACCOUNTS_LIMIT):
+            chunk = vaults[i:i + MULTIPLE_ACCOUNTS_LIMIT]
+            try:
+                resp = await client.get_multiple_accounts(
+                    [Pubkey.from_bytes(vault) for vault in chunk],
+                    commitment=Processed,
+                    data_slice=TOKEN_AMOUNT_SLICE,
+                )
+            except Exception as e:
+                print(f"Error refreshing pool liquidity: {e}")
+                continue
+            for vault, account in zip(chunk, resp.value):
+                if account is not None and len(account.data) == TOKEN_ACCOUNT_AMOUNT.size:
+                    self.apply_vault_balance(vault, TOKEN_ACCOUNT_AMOUNT.unpack(account.data)[0])
+
+    def save(self, path: str) -> None:
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(self._pools)))
+            pack = SNAPSHOT_RECORD.pack
+            f.write(b"".join(
+                pack(p.amm, p.base_mint, p.quote_mint, p.base_vault, p.quote_vault, p.coin_creator, p.base_reserve, p.quote_reserve)
+                for p in self._pools.values()
+            ))
+        os.replace(f"{path}.tmp", path)
+
+    @classmethod
+    def load(cls, path: str) -> "PoolIndex":
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, count = SNAPSHOT_HEADER.unpack_from(data)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError(f"{path} is not a pool index snapshot")
+        index = cls()
+        records = memoryview(data)[SNAPSHOT_HEADER.size:SNAPSHOT_HEADER.size + count * SNAPSHOT_RECORD.size]
+        for fields in SNAPSHOT_RECORD.iter_unpack(records):
+            index._add(PoolEntry(*fields))
+        return index
+
+    def _fund_later(self, amm: bytes) -> None:
+        # New pools are queued and their vaults fetched together, from one
+        # task that is kept referenced until it is done.
+        self._unfunded.add(amm)
+        if self._liquidity_task is None or self._liquidity_task.done():
+            self._liquidity_task = asyncio.ensure_future(self._fund_new_pools())
+
+    async def _fund_new_pools(self) -> None:
+        while self._unfunded:
+            amms, self._unfunded = list(self._unfunded), set()
+            await self.refresh_liquidity_async(amms=amms)
+
+    async def stream(self, ws_url: str = WS_RPC, commitment: Commitment = Processed, reconnect_delay: float = 1.0) -> None:
+        # Applies pool account changes from programSubscribe until cancelled.
+        # Pools that are new (or moved to other vaults) have no liquidity
+        # yet, so their vault balances are fetched once.
+        while True:
+            try:
+                async with connect(ws_url) as ws:
+                    await ws.program_subscribe(PF_AMM, commitment=commitment, encoding="base64")
+                    async for messages in ws:
+                        for message in messages:
+                            if isinstance(message, ProgramNotification):
+                                keyed_account = message.result.value
+                                old = self.get(keyed_account.pubkey)
+                                old_vaults = None if old is None else (old.base_vault, old.quote_vault)
+                                if self.apply_pool_account(keyed_account.pubkey, keyed_account.account.data):
+                                    pool = self.get(keyed_account.pubkey)
+                                    if old_vaults != (pool.base_vault, pool.quote_vault):
+                                        self._fund_later(pool.amm)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Pool index stream lost: {e}")
+            await asyncio.sleep(reconnect_delay)
@@ -1,175 +1,436 @@
-from dataclasses import dataclass
-from typing import List, Optional
-from solders.pubkey import Pubkey  # type: ignore
-from solders.rpc.responses import RpcKeyedAccount  # type: ignore
-from solana.rpc.commitment import Processed
-from solana.rpc.types import MemcmpOpts, TokenAccountOpts
-from construct import Padding, Struct, Int8ul, Int16ul, Int64ul, Bytes
-from config import client
-from constants import PF_AMM, WSOL, TOKEN_PROGRAM_ID
-
-POOL_LAYOUT = Struct(
-    Padding(8),
-    "pool_bump" / Int8ul,  # u8
-    "index" / Int16ul,  # u16
-    "creator" / Bytes(32),  # pubkey (32 bytes)
-    "base_mint" / Bytes(32),  # pubkey (32 bytes)
-    "quote_mint" / Bytes(32),  # pubkey (32 bytes)
-    "lp_mint" / Bytes(32),  # pubkey (32 bytes)
-    "pool_base_token_account" / Bytes(32),  # pubkey (32 bytes)
-    "pool_quote_token_account" / Bytes(32),  # pubkey (32 bytes)
-    "lp_supply" / Int64ul,  # u64
-    "coin_creator" / Bytes(32),  # pubkey (32 bytes)
-)
-
-@dataclass
-class PoolKeys:
-    amm: Pubkey
-    base_mint: Pubkey
-    quote_mint: Pubkey
-    pool_base_token_account: Pubkey
-    pool_quote_token_account: Pubkey
-    creator: Pubkey
-
-def fetch_pool_keys(pair_address: str):
-    try:
-        amm = Pubkey.from_string(pair_address)
-        account_info = client.get_account_info_json_parsed(amm, commitment=Processed)
-        amm_data = account_info.value.data
-        decoded_data = POOL_LAYOUT.parse(amm_data)
-
-        return PoolKeys(
-            amm=amm,
-            base_mint=Pubkey.from_bytes(decoded_data.base_mint),
-            quote_mint=Pubkey.from_bytes(decoded_data.quote_mint),
-            pool_base_token_account=Pubkey.from_bytes(decoded_data.pool_base_token_account),
-            pool_quote_token_account=Pubkey.from_bytes(decoded_data.pool_quote_token_account),
-            creator=Pubkey.from_bytes(decoded_data.coin_creator),
-        )
-    except:
-        return None
-
-def get_pool_reserves(pool_keys: PoolKeys):
-    try:
-        
-        base_vault = pool_keys.pool_base_token_account
-        quote_vault = pool_keys.pool_quote_token_account # SOL
-        
-        balances_response = client.get_multiple_accounts_json_parsed(
-            [base_vault, quote_vault], 
-            Processed
-        )
-        
-        balances = balances_response.value
-
-        base_account = balances[0]
-        quote_account = balances[1]
-        
-        base_account_balance = int(base_account.data.parsed['info']['tokenAmount']['amount'])
-        quote_account_balance = int(quote_account.data.parsed['info']['tokenAmount']['amount'])
-        
-        if base_account_balance is None or quote_account_balance is None:
-            return None, None
-        
-        return base_account_balance, quote_account_balance
-
-    except Exception as e:
-        print(f"Error occurred: {e}")
-        return None, None
-
-def fetch_pair_from_rpc(base_str: str) -> Optional[str]:
-    quote_str: str = "So11111111111111111111111111111111111111112"
-    filters: List[List[MemcmpOpts]] = [
-        [MemcmpOpts(offset=43, bytes=base_str), MemcmpOpts(offset=75, bytes=quote_str)],
-        [MemcmpOpts(offset=43, bytes=quote_str), MemcmpOpts(offset=75, bytes=base_str)]
-    ]
-    pools: List[RpcKeyedAccount] = []
-    for f in filters:
-        try:
-            resp = client.get_program_accounts(PF_AMM, filters=f)
-            pools.extend(resp.value)
-        except Exception as e:
-            print(f"Error fetching program accounts with filters {f}: {e}")
-            continue
-
-    if not pools:
-        return None
-
-    best_pool_addr: Optional[str] = None
-    max_liquidity: int = 0
-
-    for pool in pools:
-        try:
-            pool_data: bytes = pool.account.data
-            base_token_account: Pubkey = Pubkey.from_bytes(pool_data[139:171])
-            quote_token_account: Pubkey = Pubkey.from_bytes(pool_data[171:203])
-        except Exception as e:
-            print(f"Error processing pool {pool.pubkey}: {e}")
-            continue
-
-        try:
-            base_resp = client.get_token_account_balance(base_token_account)
-            quote_resp = client.get_token_account_balance(quote_token_account)
-        except Exception as e:
-            print(f"Error fetching token account balance: {e}")
-            continue
-
-        if base_resp.value is None or quote_resp.value is None:
-            continue
-
-        try:
-            base_balance: int = int(base_resp.value.amount)
-            quote_balance: int = int(quote_resp.value.amount)
-        except Exception as e:
-            print(f"Error converting token balances to int: {e}")
-            continue
-
-        liquidity: int = base_balance * quote_balance
-        if liquidity > max_liquidity:
-            max_liquidity = liquidity
-            best_pool_addr = str(pool.pubkey)
-    return best_pool_addr
-
-def sol_for_tokens(quote_amount_in, pool_base_token_reserves, pool_quote_token_reserves):
-    base_amount_out = pool_base_token_reserves - (pool_base_token_reserves * pool_quote_token_reserves) // (pool_quote_token_reserves + quote_amount_in)
-    return int(base_amount_out)
-
-def tokens_for_sol(base_amount_in, pool_base_token_reserves, pool_quote_token_reserves):
-    quote_amount_out = pool_quote_token_reserves - (pool_base_token_reserves * pool_quote_token_reserves) // (pool_base_token_reserves + base_amount_in)
-    lp_fee = int(quote_amount_out * .002)
-    protocol_fee = int(quote_amount_out * .0005)
-    fees = lp_fee + protocol_fee
-    return int(quote_amount_out - fees)
-
-def get_creator_vault_info(creator: Pubkey) -> tuple[Pubkey|None, Pubkey|None]:
-    try:
-        creator_vault_authority, _ = Pubkey.find_program_address(
-            [
-                b"creator_vault", 
-                bytes(creator),
-            ],
-            PF_AMM,
-        )
-        creator_vault_ata = client.get_token_accounts_by_owner_json_parsed(
-            creator_vault_authority,
-            TokenAccountOpts(
-                mint=WSOL,
-                program_id=TOKEN_PROGRAM_ID
-            )
-        ).value[0].pubkey
-        return creator_vault_authority, creator_vault_ata
-    except:
-        return None, None
-    
-def get_user_volume_accumulator(user: Pubkey) -> Pubkey:
-    try:
-        user_volume_accumulator, _ = Pubkey.find_program_address(
-            [
-                b"user_volume_accumulator", 
-                bytes(user),
-            ],
-            PF_AMM,
-        )
-        return user_volume_accumulator
-    except Exception as e:
+import atexit
+import json
+import os
+import struct
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, List, Optional
+from solders.pubkey import Pubkey  # type: ignore
+from solders.rpc.responses import RpcKeyedAccount  # type: ignore
+from solana.rpc.commitment import Processed
+from solana.rpc.types import DataSliceOpts, MemcmpOpts, TokenAccountOpts
+import config
+from config import POOL_CACHE_SIZE, POOL_CACHE_TTL, POOL_CACHE_PATH
+from constants import PF_AMM, WSOL, TOKEN_PROGRAM_ID, LP_FEE_BPS, PROTOCOL_FEE_BPS, FEE_DENOMINATOR
+import pda
+from token_accounts import TOKEN_AMOUNT_SLICE, decode_mint_decimals, decode_token_amount
+
+# 8 byte discriminator, pool_bump u8, index u16, creator, base_mint, quote_mint,
+# lp_mint, pool_base_token_account, pool_quote_token_account, lp_supply u64, coin_creator
+POOL_STRUCT = struct.Struct("<8xBH32s32s32s32s32s32sQ32s")
+POOL_BASE_MINT_OFFSET = 43
+POOL_QUOTE_MINT_OFFSET = 75
+
+class PoolAccount:
+    __slots__ = (
+        "pool_bump",
+        "index",
+        "creator",
+        "base_mint",
+        "quote_mint",
+        "lp_mint",
+        "pool_base_token_account",
+        "pool_quote_token_account",
+        "lp_supply",
+        "coin_creator",
+    )
+
+    def __init__(self, pool_bump, index, creator, base_mint, quote_mint, lp_mint,
+                 pool_base_token_account, pool_quote_token_account, lp_supply, coin_creator):
+        self.pool_bump = pool_bump
+        self.index = index
+        self.creator = creator
+        self.base_mint = base_mint
+        self.quote_mint = quote_mint
+        self.lp_mint = lp_mint
+        self.pool_base_token_account = pool_base_token_account
+        self.pool_quote_token_account = pool_quote_token_account
+        self.lp_supply = lp_supply
+        self.coin_creator = coin_creator
+
+    def to_pool_keys(self, amm: Pubkey) -> "PoolKeys":
+        return PoolKeys(
+            amm=amm,
+            base_mint=Pubkey.from_bytes(self.base_mint),
+            quote_mint=Pubkey.from_bytes(self.quote_mint),
+            pool_base_token_account=Pubkey.from_bytes(self.pool_base_token_account),
+            pool_quote_token_account=Pubkey.from_bytes(self.pool_quote_token_account),
+            creator=Pubkey.from_bytes(self.coin_creator),
+        )
+
+def decode_pool(data) -> PoolAccount:
+    return PoolAccount(*POOL_STRUCT.unpack_from(data))
+
+def decode_pools(accounts, stride: Optional[int] = None) -> list[PoolAccount]:
+    # Accepts a list of account buffers, or one contiguous buffer (bytes,
+    # bytearray, a 2D uint8 NumPy array, ...) holding accounts back to back.
+    if isinstance(accounts, (list, tuple)):
+        unpack_from = POOL_STRUCT.unpack_from
+        return [PoolAccount(*unpack_from(data)) for data in accounts]
+
+    view = memoryview(accounts)
+    if stride is None:
+        stride = view.shape[1] if view.ndim == 2 else POOL_STRUCT.size
+    if view.ndim != 1 or view.format != "B":
+        view = view.cast("B")
+
+    if stride == POOL_STRUCT.size:
+        return [PoolAccount(*fields) for fields in POOL_STRUCT.iter_unpack(view)]
+
+    # A truncated last account is an error, as it is for iter_unpack above.
+    if len(view) % stride:
+        raise struct.error(f"buffer of {len(view)} bytes is not a multiple of the {stride} byte stride")
+    unpack_from = POOL_STRUCT.unpack_from
+    return [PoolAccount(*unpack_from(view, offset)) for offset in range(0, len(view), stride)]
+
+@dataclass
+class PoolKeys:
+    amm: Pubkey
+    base_mint: Pubkey
+    quote_mint: Pubkey
+    pool_base_token_account: Pubkey
+    pool_quote_token_account: Pubkey
+    creator: Pubkey
+
+@dataclass
+class MintInfo:
+    token_program: Pubkey
+    decimals: int
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: Hashable) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        if self.ttl is not None and time.time() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, stored_at: Optional[float] = None) -> None:
+        self._entries[key] = (value, time.time() if stored_at is None else stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable) -> Any:
+        entry = self._entries.pop(key, None)
+        return entry[0] if entry else None
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def dump(self, encode: Callable[[Any], Any]) -> dict:
+        return {key: [encode(value), stored_at] for key, (value, stored_at) in self._entries.items()}
+
+    def load(self, data: dict, decode: Callable[[Any], Any]) -> None:
+        for key, (value, stored_at) in data.items():
+            if self.ttl is not None and time.time() - stored_at > self.ttl:
+                continue
+            self.set(key, decode(value), stored_at)
+
+# Pool keys, mint info and creator vaults never change for a given pool, so
+# they are cached across trades (keyed by pair, mint and creator address).
+pool_keys_cache = LRUCache(POOL_CACHE_SIZE, POOL_CACHE_TTL)
+mint_info_cache = LRUCache(POOL_CACHE_SIZE, POOL_CACHE_TTL)
+creator_vault_cache = LRUCache(POOL_CACHE_SIZE, POOL_CACHE_TTL)
+
+def _encode_pool_keys(pool_keys: PoolKeys) -> dict:
+    return {name: str(value) for name, value in vars(pool_keys).items()}
+
+def _decode_pool_keys(data: dict) -> PoolKeys:
+    return PoolKeys(**{name: Pubkey.from_string(value) for name, value in data.items()})
+
+def _encode_mint_info(mint_info: MintInfo) -> list:
+    return [str(mint_info.token_program), mint_info.decimals]
+
+def _decode_mint_info(data: list) -> MintInfo:
+    return MintInfo(Pubkey.from_string(data[0]), data[1])
+
+def _encode_creator_vault(vault: tuple[Pubkey, Pubkey]) -> list:
+    return [str(vault[0]), str(vault[1])]
+
+def _decode_creator_vault(data: list) -> tuple[Pubkey, Pubkey]:
+    return Pubkey.from_string(data[0]), Pubkey.from_string(data[1])
+
+def save_pool_cache(path: Optional[str] = POOL_CACHE_PATH) -> bool:
+    if not path:
+        return False
+    try:
+        snapshot = {
+            "pool_keys": pool_keys_cache.dump(_encode_pool_keys),
+            "mint_info": mint_info_cache.dump(_encode_mint_info),
+            "creator_vault": creator_vault_cache.dump(_encode_creator_vault),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+        return True
+    except Exception as e:
+        print(f"Error saving pool cache: {e}")
+        return False
+
+def load_pool_cache(path: Optional[str] = POOL_CACHE_PATH) -> bool:
+    if not path or not os.path.exists(path):
+        return False
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+        pool_keys_cache.load(snapshot.get("pool_keys", {}), _decode_pool_keys)
+        mint_info_cache.load(snapshot.get("mint_info", {}), _decode_mint_info)
+        creator_vault_cache.load(snapshot.get("creator_vault", {}), _decode_creator_vault)
+        return True
+    except Exception as e:
+        print(f"Error loading pool cache: {e}")
+        return False
+
+def clear_pool_cache() -> None:
+    pool_keys_cache.clear()
+    mint_info_cache.clear()
+    creator_vault_cache.clear()
+
+if POOL_CACHE_PATH:
+    load_pool_cache(POOL_CACHE_PATH)
+    atexit.register(save_pool_cache, POOL_CACHE_PATH)
+
+def parse_pool_keys(amm: Pubkey, amm_data: bytes) -> PoolKeys:
+    return decode_pool(amm_data).to_pool_keys(amm)
+
+def fetch_pool_keys(pair_address: str):
+    pool_keys = pool_keys_cache.get(pair_address)
+    if pool_keys is not None:
+        return pool_keys
+    try:
+        amm = Pubkey.from_string(pair_address)
+        account_info = config.client.get_account_info(amm, commitment=Processed)
+        pool_keys = parse_pool_keys(amm, account_info.value.data)
+        pool_keys_cache.set(pair_address, pool_keys)
+        return pool_keys
+    except:
+        return None
+
+async def fetch_pool_keys_async(pair_address: str):
+    pool_keys = pool_keys_cache.get(pair_address)
+    if pool_keys is not None:
+        return pool_keys
+    try:
+        amm = Pubkey.from_string(pair_address)
+        account_info = await config.async_client.get_account_info(amm, commitment=Processed)
+        pool_keys = parse_pool_keys(amm, account_info.value.data)
+        pool_keys_cache.set(pair_address, pool_keys)
+        return pool_keys
+    except Exception:
+        return None
+
+def parse_mint_info(token_info) -> MintInfo:
+    return MintInfo(token_program=token_info.owner, decimals=decode_mint_decimals(token_info.data))
+
+def get_mint_info(mint: Pubkey) -> MintInfo | None:
+    mint_info = mint_info_cache.get(str(mint))
+    if mint_info is not None:
+        return mint_info
+    try:
+        mint_info = parse_mint_info(config.client.get_account_info(mint).value)
+        mint_info_cache.set(str(mint), mint_info)
+        return mint_info
+    except Exception:
+        return None
+
+async def get_mint_info_async(mint: Pubkey) -> MintInfo | None:
+    mint_info = mint_info_cache.get(str(mint))
+    if mint_info is not None:
+        return mint_info
+    try:
+        mint_info = parse_mint_info((await config.async_client.get_account_info(mint)).value)
+        mint_info_cache.set(str(mint), mint_info)
+        return mint_info
+    except Exception:
+        return None
+
+# When set (see use_reserve_tracker), reserves are served from the tracker's
+# streamed vault balances and only fetched over RPC for untracked pools.
+reserve_tracker = None
+
+def use_reserve_tracker(tracker) -> None:
+    global reserve_tracker
+    reserve_tracker = tracker
+
+def get_pool_reserves(pool_keys: PoolKeys):
+    if reserve_tracker is not None:
+        base_reserve, quote_reserve = reserve_tracker.get_reserves(pool_keys)
+        if base_reserve is not None and quote_reserve is not None:
+            return base_reserve, quote_reserve
+    try:
+        
+        base_vault = pool_keys.pool_base_token_account
+        quote_vault = pool_keys.pool_quote_token_account # SOL
+        
+        balances_response = config.client.get_multiple_accounts(
+            [base_vault, quote_vault], 
+            Processed,
+            data_slice=TOKEN_AMOUNT_SLICE,
+        )
+        
+        return parse_pool_reserves(balances_response.value)
+
+    except Exception as e:
+        print(f"Error occurred: {e}")
+        return None, None
+
+async def get_pool_reserves_async(pool_keys: PoolKeys):
+    if reserve_tracker is not None:
+        base_reserve, quote_reserve = reserve_tracker.get_reserves(pool_keys)
+        if base_reserve is not None and quote_reserve is not None:
+            return base_reserve, quote_reserve
+    try:
+        balances_response = await config.async_client.get_multiple_accounts(
+            [pool_keys.pool_base_token_account, pool_keys.pool_quote_token_account],
+            Processed,
+            data_slice=TOKEN_AMOUNT_SLICE,
+        )
+        return parse_pool_reserves(balances_response.value)
+
+    except Exception as e:
+        print(f"Error occurred: {e}")
+        return None, None
+
+def parse_pool_reserves(balances) -> tuple[int|None, int|None]:
+    base_account = balances[0]
+    quote_account = balances[1]
+
+    if base_account is None or quote_account is None:
+        return None, None
+
+    base_account_balance = decode_token_amount(base_account.data)
+    quote_account_balance = decode_token_amount(quote_account.data)
+
+    return base_account_balance, quote_account_balance
+
+# When set (see use_pool_index), fetch_pair_from_rpc answers from the local
+# pool index and only scans the program accounts for mints it doesn't know.
+pool_index = None
+
+def use_pool_index(index) -> None:
+    global pool_index
+    pool_index = index
+
+def fetch_pair_from_rpc(base_str: str) -> Optional[str]:
+    if pool_index is not None:
+        best_pool_addr = pool_index.best_pair(base_str)
+        if best_pool_addr is not None:
+            return best_pool_addr
+    quote_str: str = "So11111111111111111111111111111111111111112"
+    filters: List[List[MemcmpOpts]] = [
+        [MemcmpOpts(offset=POOL_BASE_MINT_OFFSET, bytes=base_str), MemcmpOpts(offset=POOL_QUOTE_MINT_OFFSET, bytes=quote_str)],
+        [MemcmpOpts(offset=POOL_BASE_MINT_OFFSET, bytes=quote_str), MemcmpOpts(offset=POOL_QUOTE_MINT_OFFSET, bytes=base_str)]
+    ]
+    pools: List[RpcKeyedAccount] = []
+    for f in filters:
+        try:
+            resp = config.client.get_program_accounts(PF_AMM, filters=f)
+            pools.extend(resp.value)
+        except Exception as e:
+            print(f"Error fetching program accounts with filters {f}: {e}")
+            continue
+
+    if not pools:
+        return None
+
+    best_pool_addr: Optional[str] = None
+    max_liquidity: int = 0
+
+    for pool in pools:
+        try:
+            pool_account = decode_pool(pool.account.data)
+            base_token_account: Pubkey = Pubkey.from_bytes(pool_account.pool_base_token_account)
+            quote_token_account: Pubkey = Pubkey.from_bytes(pool_account.pool_quote_token_account)
+        except Exception as e:
+            print(f"Error processing pool {pool.pubkey}: {e}")
+            continue
+
+        try:
+            balances_resp = config.client.get_multiple_accounts(
+                [base_token_account, quote_token_account],
+                data_slice=TOKEN_AMOUNT_SLICE,
+            )
+        except Exception as e:
+            print(f"Error fetching token account balance: {e}")
+            continue
+
+        base_balance, quote_balance = parse_pool_reserves(balances_resp.value)
+        if base_balance is None or quote_balance is None:
+            continue
+
+        liquidity: int = base_balance * quote_balance
+        if liquidity > max_liquidity:
+            max_liquidity = liquidity
+            best_pool_addr = str(pool.pubkey)
+    return best_pool_addr
+
+def sol_for_tokens(quote_amount_in, pool_base_token_reserves, pool_quote_token_reserves):
+    base_amount_out = pool_base_token_reserves - (pool_base_token_reserves * pool_quote_token_reserves) // (pool_quote_token_reserves + quote_amount_in)
+    return int(base_amount_out)
+
+def tokens_for_sol(base_amount_in, pool_base_token_reserves, pool_quote_token_reserves):
+    quote_amount_out = pool_quote_token_reserves - (pool_base_token_reserves * pool_quote_token_reserves) // (pool_base_token_reserves + base_amount_in)
+    lp_fee = quote_amount_out * LP_FEE_BPS // FEE_DENOMINATOR
+    protocol_fee = quote_amount_out * PROTOCOL_FEE_BPS // FEE_DENOMINATOR
+    fees = lp_fee + protocol_fee
+    return int(quote_amount_out - fees)
+
+def get_creator_vault_info(creator: Pubkey) -> tuple[Pubkey|None, Pubkey|None]:
+    vault = creator_vault_cache.get(str(creator))
+    if vault is not None:
+        return vault
+    try:
+        creator_vault_authority = pda.get_creator_vault_authority(creator)
+        creator_vault_ata = config.client.get_token_accounts_by_owner(
+            creator_vault_authority,
+            TokenAccountOpts(
+                mint=WSOL,
+                data_slice=DataSliceOpts(offset=0, length=0),
+            )
+        ).value[0].pubkey
+        creator_vault_cache.set(str(creator), (creator_vault_authority, creator_vault_ata))
+        return creator_vault_authority, creator_vault_ata
+    except:
+        return None, None
+
+async def get_creator_vault_info_async(creator: Pubkey) -> tuple[Pubkey|None, Pubkey|None]:
+    vault = creator_vault_cache.get(str(creator))
+    if vault is not None:
+        return vault
+    try:
+        creator_vault_authority = pda.get_creator_vault_authority(creator)
+        creator_vault_ata = (await config.async_client.get_token_accounts_by_owner(
+            creator_vault_authority,
+            TokenAccountOpts(
+                mint=WSOL,
+                data_slice=DataSliceOpts(offset=0, length=0),
+            )
+        )).value[0].pubkey
+        creator_vault_cache.set(str(creator), (creator_vault_authority, creator_vault_ata))
+        return creator_vault_authority, creator_vault_ata
+    except Exception:
+        return None, None
+    
+def get_user_volume_accumulator(user: Pubkey) -> Pubkey:
+    try:
+        return pda.get_user_volume_accumulator(user)
+    except Exception as e:
         return None
\ No newline at end of file
@@ -0,0 +1,289 @@
+import asyncio
+import threading
+from typing import Optional
+
+from solana.rpc.commitment import Commitment, Confirmed, Finalized, Processed
+from solana.rpc.types import DataSliceOpts, TokenAccountOpts
+
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+
+import config
+from constants import TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID
+from rpc_pool import raw_request, raw_request_async
+from token_accounts import TOKEN_ACCOUNT_AMOUNT_OFFSET, TOKEN_ACCOUNT_AMOUNT, decode_token_amount, decode_token_mint
+
+# Mint and amount, the first 72 bytes of a token account.
+MINT_AND_AMOUNT_SLICE = DataSliceOpts(offset=0, length=TOKEN_ACCOUNT_AMOUNT_OFFSET + TOKEN_ACCOUNT_AMOUNT.size)
+
+def _transaction_request(signature: Signature, commitment: Commitment) -> dict:
+    # getTransaction rejects processed, so it is asked at confirmed at least.
+    commitment = Finalized if commitment == Finalized else Confirmed
+    return {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "getTransaction",
+        "params": [str(signature), {"encoding": "json", "commitment": commitment, "maxSupportedTransactionVersion": 0}],
+    }
+
+def _parse_post_token_balances(body: dict, owner: Pubkey) -> Optional[dict[Pubkey, int]]:
+    # None if the transaction isn't available (yet) or failed.
+    if "error" in body:
+        raise RuntimeError(body["error"])
+    result = body.get("result")
+    if result is None or result["meta"]["err"] is not None:
+        return None
+    owner = str(owner)
+    return {
+        Pubkey.from_string(entry["mint"]): int(entry["uiTokenAmount"]["amount"])
+        for entry in result["meta"].get("postTokenBalances") or []
+        if entry.get("owner") == owner
+    }
+
+class Portfolio:
+    # One wallet's token accounts and balances by mint, so buy() and sell()
+    # don't need getTokenAccountsByOwner. load() seeds it with one scan per
+    # token program; once loaded, a mint it doesn't know has no token
+    # account. Confirmed trades update it: buy and sell amounts are exact,
+    # so a known balance is adjusted in place, and an unknown one is read
+    # from the transaction's post-token balances in the background. With a
+    # reserve tracker passed to stream(), balances follow accountSubscribe
+    # instead. invalidate() forgets a mint (or everything); it is then
+    # queried again on its next use.
+    def __init__(self, owner: Pubkey = None, client=None, async_client=None, commitment: Commitment = Processed):
+        self.owner = owner or config.payer_keypair.pubkey()
+        self.client = config.client if client is None else client
+        self.async_client = config.async_client if async_client is None else async_client
+        self.commitment = commitment
+        self.loaded = False
+        self.accounts: dict[Pubkey, Pubkey] = {}
+        self.balances: dict[Pubkey, int] = {}
+        self.queries = 0
+        self.tracker = None
+        # Mints whose token account state isn't known even though loaded is set.
+        self._unknown: set[Pubkey] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, mint: Pubkey) -> bool:
+        return mint in self.accounts
+
+    def _store_scan(self, keyed_accounts) -> None:
+        for keyed in keyed_accounts:
+            data = keyed.account.data
+            mint = decode_token_mint(data)
+            self.accounts[mint] = keyed.pubkey
+            self.balances[mint] = decode_token_amount(data)
+
+    def _reset(self) -> None:
+        if self.tracker is not None:
+            self.tracker.untrack_accounts(self.accounts.values())
+        self.accounts.clear()
+        self.balances.clear()
+        self._unknown.clear()
+
+    def load(self) -> bool:
+        try:
+            responses = [
+                self.client.get_token_accounts_by_owner(
+                    self.owner, TokenAccountOpts(program_id=program, data_slice=MINT_AND_AMOUNT_SLICE), self.commitment
+                )
+                for program in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID)
+            ]
+        except Exception as e:
+            print(f"Error loading token accounts of {self.owner}: {e}")
+            return False
+        with self._lock:
+            self._reset()
+            for resp in responses:
+                self._store_scan(resp.value)
+            self.loaded = True
+        self._track(self.accounts.values())
+        return True
+
+    async def load_async(self) -> bool:
+        try:
+            responses = await asyncio.gather(*(
+                self.async_client.get_token_accounts_by_owner(
+                    self.owner, TokenAccountOpts(program_id=program, data_slice=MINT_AND_AMOUNT_SLICE), self.commitment
+                )
+                for program in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID)
+            ))
+        except Exception as e:
+            print(f"Error loading token accounts of {self.owner}: {e}")
+            return False
+        with self._lock:
+            self._reset()
+            for resp in responses:
+                self._store_scan(resp.value)
+            self.loaded = True
+        self._track(self.accounts.values())
+        return True
+
+    def stream(self, tracker) -> None:
+        # Follows every token account's balance with a ReserveTracker.
+        self.tracker = tracker
+        self._track(self.accounts.values())
+
+    def _track(self, accounts) -> None:
+        if self.tracker is not None:
+            accounts = list(accounts)
+            if accounts:
+                self.tracker.track_accounts(accounts)
+
+    def _known(self, mint: Pubkey) -> bool:
+        return mint in self.accounts or (self.loaded and mint not in self._unknown)
+
+    def _store_query(self, mint: Pubkey, resp) -> None:
+        self.queries += 1
+        with self._lock:
+            self._unknown.discard(mint)
+            if resp.value:
+                keyed = resp.value[0]
+                new = self.accounts.get(mint) != keyed.pubkey
+                self.accounts[mint] = keyed.pubkey
+                self.balances[mint] = decode_token_amount(keyed.account.data)
+            else:
+                new = False
+                self.accounts.pop(mint, None)
+                self.balances.pop(mint, None)
+        if new:
+            self._track([self.accounts[mint]])
+
+    def _query(self, mint: Pubkey) -> None:
+        resp = self.client.get_token_accounts_by_owner(self.owner, TokenAccountOpts(mint, data_slice=MINT_AND_AMOUNT_SLICE), self.commitment)
+        self._store_query(mint, resp)
+
+    async def _query_async(self, mint: Pubkey) -> None:
+        resp = await self.async_client.get_token_accounts_by_owner(self.owner, TokenAccountOpts(mint, data_slice=MINT_AND_AMOUNT_SLICE), self.commitment)
+        self._store_query(mint, resp)
+
+    def _cached_balance(self, mint: Pubkey) -> Optional[int]:
+        account = self.accounts.get(mint)
+        if account is None:
+            return 0
+        if self.tracker is not None:
+            amount = self.tracker.get_amount(account)
+            if amount is not None:
+                return amount
+        return self.balances.get(mint)
+
+    def get_token_account(self, mint: Pubkey) -> Optional[Pubkey]:
+        if not self._known(mint):
+            self._query(mint)
+        return self.accounts.get(mint)
+
+    async def get_token_account_async(self, mint: Pubkey) -> Optional[Pubkey]:
+        if not self._known(mint):
+            await self._query_async(mint)
+        return self.accounts.get(mint)
+
+    def get_token_balance(self, mint: Pubkey) -> int:
+        if self._known(mint):
+            balance = self._cached_balance(mint)
+            if balance is not None:
+                return balance
+        self._query(mint)
+        return self.balances.get(mint, 0)
+
+    async def get_token_balance_async(self, mint: Pubkey) -> int:
+        if self._known(mint):
+            balance = self._cached_balance(mint)
+            if balance is not None:
+                return balance
+        await self._query_async(mint)
+        return self.balances.get(mint, 0)
+
+    def invalidate(self, mint: Optional[Pubkey] = None) -> None:
+        with self._lock:
+            if mint is None:
+                self._reset()
+                self.loaded = False
+                return
+            self._unknown.add(mint)
+            account = self.accounts.pop(mint, None)
+            self.balances.pop(mint, None)
+        if account is not None and self.tracker is not None:
+            self.tracker.untrack_accounts([account])
+
+    def record_trade(
+        self,
+        mint: Pubkey,
+        token_account: Pubkey,
+        confirmed: bool,
+        delta: int = 0,
+        closed: bool = False,
+        signature: Optional[Signature] = None,
+    ) -> None:
+        # delta is the exact change of the token balance (base amount out of
+        # a buy, minus the base amount in of a sell).
+        if not confirmed:
+            # Whatever happened on chain, the cache may be wrong now.
+            self.invalidate(mint)
+            return
+        with self._lock:
+            if closed:
+                self._unknown.discard(mint)
+                self.accounts.pop(mint, None)
+                self.balances.pop(mint, None)
+                new = False
+            else:
+                new = self.accounts.get(mint) != token_account
+                self.accounts[mint] = token_account
+                balance = self.balances.get(mint, 0 if new else None)
+                if balance is not None and mint not in self._unknown:
+                    self.balances[mint] = balance + delta
+                else:
+                    self.balances.pop(mint, None)
+        if closed:
+            if self.tracker is not None:
+                self.tracker.untrack_accounts([token_account])
+            return
+        if new:
+            self._track([token_account])
+        if mint not in self.balances and signature is not None:
+            self._apply_transaction_later(signature)
+
+    def apply_post_token_balances(self, post_balances: dict[Pubkey, int]) -> None:
+        with self._lock:
+            for mint, amount in post_balances.items():
+                if mint in self.accounts:
+                    self.balances[mint] = amount
+                    self._unknown.discard(mint)
+
+    def apply_transaction(self, signature: Signature) -> bool:
+        # Only the post-token balances are needed, so the response isn't
+        # parsed into solders types.
+        try:
+            body = raw_request(self.client, _transaction_request(signature, self.commitment))
+            post_balances = _parse_post_token_balances(body, self.owner)
+        except Exception as e:
+            print(f"Error fetching transaction {signature}: {e}")
+            return False
+        if post_balances is None:
+            return False
+        self.apply_post_token_balances(post_balances)
+        return True
+
+    async def apply_transaction_async(self, signature: Signature) -> bool:
+        try:
+            body = await raw_request_async(self.async_client, _transaction_request(signature, self.commitment))
+            post_balances = _parse_post_token_balances(body, self.owner)
+        except Exception as e:
+            print(f"Error fetching transaction {signature}: {e}")
+            return False
+        if post_balances is None:
+            return False
+        self.apply_post_token_balances(post_balances)
+        return True
+
+    def _apply_transaction_later(self, signature: Signature) -> None:
+        # Off the trade's path: a task on a running event loop, else a thread.
+        try:
+            task = asyncio.get_running_loop().create_task(self.apply_transaction_async(signature))
+        except RuntimeError:
+            threading.Thread(target=self.apply_transaction, args=(signature,), daemon=True).start()
+            return
+        # The loop only keeps a weak reference to its tasks.
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
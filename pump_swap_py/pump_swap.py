@@ -1,342 +1,312 @@
-import base64
-import os
-import struct
-from typing import Optional
-
-from solana.rpc.commitment import Processed
-from solana.rpc.types import TokenAccountOpts, TxOpts
-
-from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
-from solders.instruction import AccountMeta, Instruction  # type: ignore
-from solders.message import MessageV0  # type: ignore
-from solders.pubkey import Pubkey  # type: ignore
-from solders.system_program import (
-    CreateAccountWithSeedParams,
-    create_account_with_seed,
-)
-from solders.transaction import VersionedTransaction  # type: ignore
-
-from spl.token.client import Token
-from spl.token.instructions import (
-    CloseAccountParams,
-    InitializeAccountParams,
-    close_account,
-    create_associated_token_account,
-    get_associated_token_address,
-    initialize_account,
-)
-
-from config import client, payer_keypair, UNIT_BUDGET, UNIT_PRICE
-from constants import *
-from common_utils import confirm_txn, get_token_balance
-from pool_utils import *
-
-def buy(pair_address: str, sol_in: float = 0.1, slippage: int = 5) -> bool:
-    try:
-        print(f"Starting buy transaction for pair address: {pair_address}")
-
-        print("Fetching pool keys...")
-        pool_keys: Optional[PoolKeys] = fetch_pool_keys(pair_address)
-        
-        if pool_keys is None:
-            print("No pool keys found, aborting transaction.")
-            return False
-        print("Pool keys fetched successfully.")
-
-        print("Fetching creator vault info...")
-        creator_vault_authority, creator_vault_ata = get_creator_vault_info(pool_keys.creator)
-        user_volume_accumulator = get_user_volume_accumulator(payer_keypair.pubkey())
-        if user_volume_accumulator is None:
-            print("No user volume accumulator found, aborting transaction.")
-            return False
-        if creator_vault_authority is None or creator_vault_ata is None:
-            print("No creator vault info found, aborting transaction.")
-            return False
-        print("Creator vault info fetched successfully.")
-
-        mint = pool_keys.base_mint
-        token_info = client.get_account_info_json_parsed(mint).value
-        base_token_program = token_info.owner
-        decimal = token_info.data.parsed['info']['decimals']
-
-        print("Calculating transaction amounts...")
-        sol_decimal = 1e9
-        token_decimal = 10**decimal
-        slippage_adjustment = 1 + (slippage / 100)
-        max_quote_amount_in = int((sol_in * slippage_adjustment) * sol_decimal)
-
-        base_reserve, quote_reserve = get_pool_reserves(pool_keys)
-        raw_sol_in = int(sol_in * sol_decimal)
-        base_amount_out = sol_for_tokens(raw_sol_in, base_reserve, quote_reserve)
-        print(f"Max Quote Amount In: {max_quote_amount_in / sol_decimal} | Base Amount Out: {base_amount_out / token_decimal}")
-
-        print("Checking for existing token account...")
-        token_account_check = client.get_token_accounts_by_owner(payer_keypair.pubkey(), TokenAccountOpts(mint), Processed)
-        
-        if token_account_check.value:
-            token_account = token_account_check.value[0].pubkey
-            token_account_instruction = None
-            print("Existing token account found.")
-        else:
-            token_account = get_associated_token_address(payer_keypair.pubkey(), mint, base_token_program)
-            token_account_instruction = create_associated_token_account(payer_keypair.pubkey(), payer_keypair.pubkey(), mint, base_token_program)
-            print("No existing token account found; creating associated token account.")
-
-        print("Generating seed for WSOL account...")
-        seed = base64.urlsafe_b64encode(os.urandom(24)).decode("utf-8")
-        wsol_token_account = Pubkey.create_with_seed(payer_keypair.pubkey(), seed, TOKEN_PROGRAM_ID)
-        balance_needed = Token.get_min_balance_rent_for_exempt_for_account(client)
-
-        print("Creating and initializing WSOL account...")
-        create_wsol_account_instruction = create_account_with_seed(
-            CreateAccountWithSeedParams(
-                from_pubkey=payer_keypair.pubkey(),
-                to_pubkey=wsol_token_account,
-                base=payer_keypair.pubkey(),
-                seed=seed,
-                lamports=int(balance_needed + max_quote_amount_in),
-                space=ACCOUNT_SPACE,
-                owner=TOKEN_PROGRAM_ID,
-            )
-        )
-
-        init_wsol_account_instruction = initialize_account(
-            InitializeAccountParams(
-                program_id=TOKEN_PROGRAM_ID,
-                account=wsol_token_account,
-                mint=WSOL,
-                owner=payer_keypair.pubkey(),
-            )
-        )
-
-        print("Creating swap instructions...")
-        keys = [
-            AccountMeta(pubkey=pool_keys.amm, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=payer_keypair.pubkey(), is_signer=True, is_writable=True),
-            AccountMeta(pubkey=GLOBAL_CONFIG, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=pool_keys.base_mint, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=pool_keys.quote_mint, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=token_account, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=wsol_token_account, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=pool_keys.pool_base_token_account, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=pool_keys.pool_quote_token_account, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT_TOKEN_ACCOUNT, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=base_token_program, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=ASSOCIATED_TOKEN_PROGRAM, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=EVENT_AUTH, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=PF_AMM, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=creator_vault_ata, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=creator_vault_authority, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=GLOBAL_VOLUME_ACCUMULATOR, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=user_volume_accumulator, is_signer=False, is_writable=True),
-        ]
-
-        data = bytearray()
-        data.extend(bytes.fromhex("66063d1201daebea"))
-        data.extend(struct.pack('<Q', base_amount_out))
-        data.extend(struct.pack('<Q', max_quote_amount_in))
-        swap_instruction = Instruction(PF_AMM, bytes(data), keys)
-
-        print("Preparing to close WSOL account after swap...")
-        close_wsol_account_instruction = close_account(
-            CloseAccountParams(
-                program_id=TOKEN_PROGRAM_ID,
-                account=wsol_token_account,
-                dest=payer_keypair.pubkey(),
-                owner=payer_keypair.pubkey(),
-            )
-        )
-
-        instructions = [
-            set_compute_unit_limit(UNIT_BUDGET),
-            set_compute_unit_price(UNIT_PRICE),
-            create_wsol_account_instruction,
-            init_wsol_account_instruction,
-        ]
-
-        if token_account_instruction:
-            instructions.append(token_account_instruction)
-
-        instructions.append(swap_instruction)
-        instructions.append(close_wsol_account_instruction)
-        
-        print("Compiling transaction message...")
-        compiled_message = MessageV0.try_compile(
-            payer_keypair.pubkey(),
-            instructions,
-            [],
-            client.get_latest_blockhash().value.blockhash,
-        )
-
-        print("Sending transaction...")
-        txn_sig = client.send_transaction(
-            txn=VersionedTransaction(compiled_message, [payer_keypair]),
-            opts=TxOpts(skip_preflight=False)
-        ).value
-        print(f"Transaction Signature: {txn_sig}")
-        
-        print("Confirming transaction...")
-        confirmed = confirm_txn(txn_sig)
-        
-        print(f"Transaction confirmed: {confirmed}")
-        return confirmed
-    except Exception as e:
-        print("Error occurred during transaction:", e)
-        return False
-
-def sell(pair_address: str, percentage: int = 100, slippage: int = 5) -> bool:
-    try:
-        print(f"Starting sell transaction for pair address: {pair_address} with percentage: {percentage}%")
-        
-        print("Fetching pool keys...")
-        pool_keys: Optional[PoolKeys] = fetch_pool_keys(pair_address)
-        if pool_keys is None:
-            print("No pool keys found, aborting transaction.")
-            return False
-        print("Pool keys fetched successfully.")
-
-        print("Fetching creator vault info...")
-        creator_vault_authority, creator_vault_ata = get_creator_vault_info(pool_keys.creator)
-        if creator_vault_authority is None or creator_vault_ata is None:
-            print("No creator vault info found, aborting transaction.")
-            return False
-        print("Creator vault info fetched successfully.")
-
-        mint = pool_keys.base_mint
-        token_info = client.get_account_info_json_parsed(mint).value
-        base_token_program = token_info.owner
-        decimal = token_info.data.parsed['info']['decimals']
-
-        if not (1 <= percentage <= 100):
-            print("Percentage must be between 1 and 100.")
-            return False
-
-        token_account = get_associated_token_address(payer_keypair.pubkey(), mint, base_token_program)
-
-        print("Generating seed for WSOL account...")
-        seed = base64.urlsafe_b64encode(os.urandom(24)).decode("utf-8")
-        wsol_token_account = Pubkey.create_with_seed(payer_keypair.pubkey(), seed, TOKEN_PROGRAM_ID)
-        balance_needed = Token.get_min_balance_rent_for_exempt_for_account(client)
-
-        print("Creating and initializing WSOL account...")
-        create_wsol_account_instruction = create_account_with_seed(
-            CreateAccountWithSeedParams(
-                from_pubkey=payer_keypair.pubkey(),
-                to_pubkey=wsol_token_account,
-                base=payer_keypair.pubkey(),
-                seed=seed,
-                lamports=int(balance_needed),
-                space=ACCOUNT_SPACE,
-                owner=TOKEN_PROGRAM_ID,
-            )
-        )
-
-        init_wsol_account_instruction = initialize_account(
-            InitializeAccountParams(
-                program_id=TOKEN_PROGRAM_ID,
-                account=wsol_token_account,
-                mint=WSOL,
-                owner=payer_keypair.pubkey(),
-            )
-        )
-
-        print("Retrieving token balance...")
-        token_balance = get_token_balance(mint)
-        if token_balance == 0 or token_balance is None:
-            print("Token balance is zero. Nothing to sell.")
-            return False
-
-        print("Calculating transaction amounts...")
-        sol_decimal = 1e9
-        token_decimal = 10**decimal
-        base_amount_in = int(token_balance * (percentage / 100))
-        base_reserve, quote_reserve = get_pool_reserves(pool_keys)
-        sol_out = tokens_for_sol(base_amount_in, base_reserve, quote_reserve)
-        slippage_adjustment = 1 - (slippage / 100)
-        min_quote_amount_out = int((sol_out * slippage_adjustment))
-        print(f"Base Amount In: {base_amount_in / token_decimal}, Minimum Quote Amount Out: {min_quote_amount_out / sol_decimal}")
-
-        print("Creating swap instructions...")    
-        keys = [
-            AccountMeta(pubkey=pool_keys.amm, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=payer_keypair.pubkey(), is_signer=True, is_writable=True),
-            AccountMeta(pubkey=GLOBAL_CONFIG, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=pool_keys.base_mint, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=pool_keys.quote_mint, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=token_account, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=wsol_token_account, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=pool_keys.pool_base_token_account, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=pool_keys.pool_quote_token_account, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT_TOKEN_ACCOUNT, is_signer=False, is_writable=True),
-            AccountMeta(pubkey=base_token_program, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=ASSOCIATED_TOKEN_PROGRAM, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=EVENT_AUTH, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=PF_AMM, is_signer=False, is_writable=False),
-            AccountMeta(pubkey=creator_vault_ata, is_signer=False, is_writable=True), 
-            AccountMeta(pubkey=creator_vault_authority, is_signer=False, is_writable=False),
-        ]
-
-        data = bytearray()
-        data.extend(bytes.fromhex("33e685a4017f83ad"))
-        data.extend(struct.pack('<Q', base_amount_in))
-        data.extend(struct.pack('<Q', min_quote_amount_out))
-        
-        swap_instruction = Instruction(PF_AMM, bytes(data), keys)
-
-        print("Preparing to close WSOL account after swap...")
-        close_wsol_account_instruction = close_account(
-            CloseAccountParams(
-                program_id=TOKEN_PROGRAM_ID,
-                account=wsol_token_account,
-                dest=payer_keypair.pubkey(),
-                owner=payer_keypair.pubkey(),
-            )
-        )
-
-        instructions = [
-            set_compute_unit_limit(UNIT_BUDGET),
-            set_compute_unit_price(UNIT_PRICE),
-            create_wsol_account_instruction,
-            init_wsol_account_instruction,
-            swap_instruction,
-            close_wsol_account_instruction
-        ]
-
-        if percentage == 100:
-            print("Preparing to close token account after swap (selling 100%).")
-            close_account_instruction = close_account(
-                CloseAccountParams(
-                    base_token_program, token_account, payer_keypair.pubkey(), payer_keypair.pubkey()
-                )
-            )
-            instructions.append(close_account_instruction)
-
-        print("Compiling transaction message...")
-        compiled_message = MessageV0.try_compile(
-            payer_keypair.pubkey(),
-            instructions,
-            [],
-            client.get_latest_blockhash().value.blockhash,
-        )
-
-        print("Sending transaction...")
-        txn_sig = client.send_transaction(
-            txn=VersionedTransaction(compiled_message, [payer_keypair]),
-            opts=TxOpts(skip_preflight=False)
-        ).value
-        print(f"Transaction Signature: {txn_sig}")
-        
-        print("Confirming transaction...")
-        confirmed = confirm_txn(txn_sig)
-        
-        print(f"Transaction confirmed: {confirmed}")
-        return confirmed
-    except Exception as e:
-        print("Error occurred during transaction:", e)
-        return False
\ No newline at end of file
+import base64
+import os
+from typing import Optional
+
+from solana.rpc.types import TxOpts
+
+from solders.instruction import Instruction  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.system_program import (
+    CreateAccountWithSeedParams,
+    create_account_with_seed,
+)
+from solders.transaction import VersionedTransaction  # type: ignore
+
+import config
+from constants import *
+from common_utils import confirm_txn, get_token_account, get_token_balance, record_trade
+from pool_utils import *
+from swap_template import get_swap_template
+from chain_state import chain_state
+from fee_engine import fee_engine
+from lookup_tables import lookup_tables
+import wsol
+from telemetry import telemetry
+from token_accounts import close_account, create_idempotent_associated_token_account, get_associated_token_address, initialize_account
+
+def create_wsol_account_instructions(lamports: int, owner: Pubkey = None) -> tuple[Pubkey, list[Instruction], Instruction]:
+    owner = owner or config.payer_keypair.pubkey()
+    seed = base64.urlsafe_b64encode(os.urandom(24)).decode("utf-8")
+    wsol_token_account = Pubkey.create_with_seed(owner, seed, TOKEN_PROGRAM_ID)
+
+    create_wsol_account_instruction = create_account_with_seed(
+        CreateAccountWithSeedParams(
+            from_pubkey=owner,
+            to_pubkey=wsol_token_account,
+            base=owner,
+            seed=seed,
+            lamports=int(lamports),
+            space=ACCOUNT_SPACE,
+            owner=TOKEN_PROGRAM_ID,
+        )
+    )
+
+    init_wsol_account_instruction = initialize_account(TOKEN_PROGRAM_ID, wsol_token_account, WSOL, owner)
+    close_wsol_account_instruction = close_account(TOKEN_PROGRAM_ID, wsol_token_account, owner, owner)
+
+    return wsol_token_account, [create_wsol_account_instruction, init_wsol_account_instruction], close_wsol_account_instruction
+
+def wsol_instructions_for(quote_amount_in: int) -> tuple[Pubkey, list[Instruction], list[Instruction]]:
+    # Returns the WSOL account to swap through with the instructions to run
+    # before and after the swap.
+    if config.PERSISTENT_WSOL:
+        wsol.wsol_account.get_balance()
+        return wsol.wsol_account.address, wsol.wsol_account.top_up_instructions(quote_amount_in), []
+    balance_needed = chain_state.get_rent_exempt_minimum()
+    wsol_token_account, wsol_instructions, close_wsol_account_instruction = create_wsol_account_instructions(balance_needed + quote_amount_in)
+    return wsol_token_account, wsol_instructions, [close_wsol_account_instruction]
+
+async def wsol_instructions_for_async(quote_amount_in: int) -> tuple[Pubkey, list[Instruction], list[Instruction]]:
+    if config.PERSISTENT_WSOL:
+        await wsol.wsol_account.get_balance_async()
+        return wsol.wsol_account.address, wsol.wsol_account.top_up_instructions(quote_amount_in), []
+    balance_needed = await chain_state.get_rent_exempt_minimum_async()
+    wsol_token_account, wsol_instructions, close_wsol_account_instruction = create_wsol_account_instructions(balance_needed + quote_amount_in)
+    return wsol_token_account, wsol_instructions, [close_wsol_account_instruction]
+
+def build_buy_instruction(
+    pool_keys: PoolKeys,
+    token_account: Pubkey,
+    wsol_token_account: Pubkey,
+    base_token_program: Pubkey,
+    creator_vault_authority: Pubkey,
+    creator_vault_ata: Pubkey,
+    user_volume_accumulator: Pubkey,
+    base_amount_out: int,
+    max_quote_amount_in: int,
+) -> Instruction:
+    template = get_swap_template(
+        pool_keys,
+        config.payer_keypair.pubkey(),
+        token_account,
+        base_token_program,
+        creator_vault_authority,
+        creator_vault_ata,
+        user_volume_accumulator,
+    )
+    return template.buy(base_amount_out, max_quote_amount_in, wsol_token_account)
+
+def build_sell_instruction(
+    pool_keys: PoolKeys,
+    token_account: Pubkey,
+    wsol_token_account: Pubkey,
+    base_token_program: Pubkey,
+    creator_vault_authority: Pubkey,
+    creator_vault_ata: Pubkey,
+    base_amount_in: int,
+    min_quote_amount_out: int,
+) -> Instruction:
+    template = get_swap_template(
+        pool_keys,
+        config.payer_keypair.pubkey(),
+        token_account,
+        base_token_program,
+        creator_vault_authority,
+        creator_vault_ata,
+        get_user_volume_accumulator(config.payer_keypair.pubkey()),
+    )
+    return template.sell(base_amount_in, min_quote_amount_out, wsol_token_account)
+
+def buy(pair_address: str, sol_in: float = 0.1, slippage: int = 5) -> bool:
+    try:
+        with telemetry.span("buy", pair=pair_address, sol_in=sol_in, slippage=slippage) as trade:
+            with telemetry.span("pool_keys"):
+                pool_keys: Optional[PoolKeys] = fetch_pool_keys(pair_address)
+            if pool_keys is None:
+                print("No pool keys found, aborting transaction.")
+                return False
+
+            with telemetry.span("creator_vault"):
+                creator_vault_authority, creator_vault_ata = get_creator_vault_info(pool_keys.creator)
+            user_volume_accumulator = get_user_volume_accumulator(config.payer_keypair.pubkey())
+            if user_volume_accumulator is None:
+                print("No user volume accumulator found, aborting transaction.")
+                return False
+            if creator_vault_authority is None or creator_vault_ata is None:
+                print("No creator vault info found, aborting transaction.")
+                return False
+
+            mint = pool_keys.base_mint
+            with telemetry.span("mint_info"):
+                mint_info = get_mint_info(mint)
+            if mint_info is None:
+                print("No mint info found, aborting transaction.")
+                return False
+            base_token_program = mint_info.token_program
+
+            sol_decimal = 1e9
+            slippage_adjustment = 1 + (slippage / 100)
+            max_quote_amount_in = int((sol_in * slippage_adjustment) * sol_decimal)
+
+            with telemetry.span("reserves"):
+                base_reserve, quote_reserve = get_pool_reserves(pool_keys)
+            raw_sol_in = int(sol_in * sol_decimal)
+            base_amount_out = sol_for_tokens(raw_sol_in, base_reserve, quote_reserve)
+            trade.set("base_amount_out", base_amount_out)
+            trade.set("max_quote_amount_in", max_quote_amount_in)
+
+            with telemetry.span("accounts"):
+                token_account = get_token_account(mint)
+                if token_account is not None:
+                    token_account_instruction = None
+                else:
+                    token_account = get_associated_token_address(config.payer_keypair.pubkey(), mint, base_token_program)
+                    # Idempotent, in case a cached "no account" answer is out of date.
+                    token_account_instruction = create_idempotent_associated_token_account(config.payer_keypair.pubkey(), config.payer_keypair.pubkey(), mint, base_token_program)
+                wsol_token_account, wsol_instructions, close_wsol_instructions = wsol_instructions_for(max_quote_amount_in)
+
+            with telemetry.span("build"):
+                swap_instruction = build_buy_instruction(
+                    pool_keys,
+                    token_account,
+                    wsol_token_account,
+                    base_token_program,
+                    creator_vault_authority,
+                    creator_vault_ata,
+                    user_volume_accumulator,
+                    base_amount_out,
+                    max_quote_amount_in,
+                )
+
+                instructions = [*wsol_instructions]
+
+                if token_account_instruction:
+                    instructions.append(token_account_instruction)
+
+                instructions.append(swap_instruction)
+                instructions.extend(close_wsol_instructions)
+
+            with telemetry.span("compile"):
+                blockhash_info = chain_state.get_blockhash()
+                tables = lookup_tables.tables_for(pool_keys)
+                budget_instructions = fee_engine.budget_instructions(config.payer_keypair.pubkey(), instructions, tables, blockhash_info.blockhash)
+                compiled_message = MessageV0.try_compile(
+                    config.payer_keypair.pubkey(),
+                    budget_instructions + instructions,
+                    tables,
+                    blockhash_info.blockhash,
+                )
+
+            with telemetry.span("sign"):
+                txn = VersionedTransaction(compiled_message, [config.payer_keypair])
+
+            with telemetry.span("send"):
+                txn_sig = config.client.send_transaction(txn=txn, opts=TxOpts(skip_preflight=False)).value
+            print(f"Transaction Signature: {txn_sig}")
+            trade.set("signature", str(txn_sig))
+
+            with telemetry.span("confirm"):
+                confirmed = confirm_txn(txn_sig, last_valid_block_height=blockhash_info.last_valid_block_height)
+            if not close_wsol_instructions:  # swapped through the persistent account
+                wsol.wsol_account.record(confirmed, quote_in=max_quote_amount_in)
+            record_trade(mint, token_account, confirmed, base_amount_out, signature=txn_sig)
+            trade.set("confirmed", confirmed)
+
+            print(f"Transaction confirmed: {confirmed}")
+            return confirmed
+    except Exception as e:
+        print("Error occurred during transaction:", e)
+        return False
+
+def sell(pair_address: str, percentage: int = 100, slippage: int = 5) -> bool:
+    try:
+        with telemetry.span("sell", pair=pair_address, percentage=percentage, slippage=slippage) as trade:
+            with telemetry.span("pool_keys"):
+                pool_keys: Optional[PoolKeys] = fetch_pool_keys(pair_address)
+            if pool_keys is None:
+                print("No pool keys found, aborting transaction.")
+                return False
+
+            with telemetry.span("creator_vault"):
+                creator_vault_authority, creator_vault_ata = get_creator_vault_info(pool_keys.creator)
+            if creator_vault_authority is None or creator_vault_ata is None:
+                print("No creator vault info found, aborting transaction.")
+                return False
+
+            mint = pool_keys.base_mint
+            with telemetry.span("mint_info"):
+                mint_info = get_mint_info(mint)
+            if mint_info is None:
+                print("No mint info found, aborting transaction.")
+                return False
+            base_token_program = mint_info.token_program
+
+            if not (1 <= percentage <= 100):
+                print("Percentage must be between 1 and 100.")
+                return False
+
+            token_account = get_associated_token_address(config.payer_keypair.pubkey(), mint, base_token_program)
+
+            with telemetry.span("accounts"):
+                wsol_token_account, wsol_instructions, close_wsol_instructions = wsol_instructions_for(0)
+                token_balance = get_token_balance(mint)
+            if token_balance == 0 or token_balance is None:
+                print("Token balance is zero. Nothing to sell.")
+                return False
+
+            base_amount_in = int(token_balance * (percentage / 100))
+            with telemetry.span("reserves"):
+                base_reserve, quote_reserve = get_pool_reserves(pool_keys)
+            sol_out = tokens_for_sol(base_amount_in, base_reserve, quote_reserve)
+            slippage_adjustment = 1 - (slippage / 100)
+            min_quote_amount_out = int((sol_out * slippage_adjustment))
+            trade.set("base_amount_in", base_amount_in)
+            trade.set("min_quote_amount_out", min_quote_amount_out)
+
+            with telemetry.span("build"):
+                swap_instruction = build_sell_instruction(
+                    pool_keys,
+                    token_account,
+                    wsol_token_account,
+                    base_token_program,
+                    creator_vault_authority,
+                    creator_vault_ata,
+                    base_amount_in,
+                    min_quote_amount_out,
+                )
+
+                instructions = [
+                    *wsol_instructions,
+                    swap_instruction,
+                    *close_wsol_instructions,
+                ]
+
+                if percentage == 100:
+                    # Selling 100%, so the token account is closed after the swap.
+                    close_account_instruction = close_account(
+                        base_token_program, token_account, config.payer_keypair.pubkey(), config.payer_keypair.pubkey()
+                    )
+                    instructions.append(close_account_instruction)
+
+            with telemetry.span("compile"):
+                blockhash_info = chain_state.get_blockhash()
+                tables = lookup_tables.tables_for(pool_keys)
+                budget_instructions = fee_engine.budget_instructions(config.payer_keypair.pubkey(), instructions, tables, blockhash_info.blockhash)
+                compiled_message = MessageV0.try_compile(
+                    config.payer_keypair.pubkey(),
+                    budget_instructions + instructions,
+                    tables,
+                    blockhash_info.blockhash,
+                )
+
+            with telemetry.span("sign"):
+                txn = VersionedTransaction(compiled_message, [config.payer_keypair])
+
+            with telemetry.span("send"):
+                txn_sig = config.client.send_transaction(txn=txn, opts=TxOpts(skip_preflight=False)).value
+            print(f"Transaction Signature: {txn_sig}")
+            trade.set("signature", str(txn_sig))
+
+            with telemetry.span("confirm"):
+                confirmed = confirm_txn(txn_sig, last_valid_block_height=blockhash_info.last_valid_block_height)
+            if not close_wsol_instructions:  # swapped through the persistent account
+                wsol.wsol_account.record(confirmed, quote_out=min_quote_amount_out)
+            record_trade(mint, token_account, confirmed, -base_amount_in, closed=percentage == 100, signature=txn_sig)
+            trade.set("confirmed", confirmed)
+
+            print(f"Transaction confirmed: {confirmed}")
+            return confirmed
+    except Exception as e:
+        print("Error occurred during transaction:", e)
+        return False
@@ -0,0 +1,242 @@
+import asyncio
+from typing import Optional
+
+from solana.rpc.types import TxOpts
+
+from solders.message import MessageV0  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+import config
+from constants import *
+from common_utils import confirm_txn_async, get_token_account_async, get_token_balance_async, record_trade
+from pool_utils import *
+from chain_state import chain_state
+from fee_engine import fee_engine
+from lookup_tables import lookup_tables
+import wsol
+from telemetry import telemetry
+from token_accounts import close_account, create_idempotent_associated_token_account, get_associated_token_address
+from pump_swap import build_buy_instruction, build_sell_instruction, wsol_instructions_for_async
+
+# Same flow as pump_swap.buy/sell, but every lookup that does not depend on
+# another one is issued at the same time, so the pre-flight cost is the
+# slowest round-trip instead of the sum of all of them.
+
+async def buy(pair_address: str, sol_in: float = 0.1, slippage: int = 5) -> bool:
+    try:
+        with telemetry.span("buy", pair=pair_address, sol_in=sol_in, slippage=slippage) as trade:
+            with telemetry.span("pool_keys"):
+                pool_keys: Optional[PoolKeys] = await fetch_pool_keys_async(pair_address)
+            if pool_keys is None:
+                print("No pool keys found, aborting transaction.")
+                return False
+
+            mint = pool_keys.base_mint
+            user_volume_accumulator = get_user_volume_accumulator(config.payer_keypair.pubkey())
+            if user_volume_accumulator is None:
+                print("No user volume accumulator found, aborting transaction.")
+                return False
+
+            sol_decimal = 1e9
+            slippage_adjustment = 1 + (slippage / 100)
+            max_quote_amount_in = int((sol_in * slippage_adjustment) * sol_decimal)
+
+            with telemetry.span("prefetch"):
+                (
+                    (creator_vault_authority, creator_vault_ata),
+                    mint_info,
+                    (base_reserve, quote_reserve),
+                    token_account,
+                    (wsol_token_account, wsol_instructions, close_wsol_instructions),
+                    blockhash_info,
+                ) = await asyncio.gather(
+                    telemetry.wrap("creator_vault", get_creator_vault_info_async(pool_keys.creator)),
+                    telemetry.wrap("mint_info", get_mint_info_async(mint)),
+                    telemetry.wrap("reserves", get_pool_reserves_async(pool_keys)),
+                    telemetry.wrap("accounts", get_token_account_async(mint)),
+                    telemetry.wrap("wsol", wsol_instructions_for_async(max_quote_amount_in)),
+                    telemetry.wrap("blockhash", chain_state.get_blockhash_async()),
+                )
+
+            if creator_vault_authority is None or creator_vault_ata is None:
+                print("No creator vault info found, aborting transaction.")
+                return False
+
+            if mint_info is None:
+                print("No mint info found, aborting transaction.")
+                return False
+            base_token_program = mint_info.token_program
+
+            raw_sol_in = int(sol_in * sol_decimal)
+            base_amount_out = sol_for_tokens(raw_sol_in, base_reserve, quote_reserve)
+            trade.set("base_amount_out", base_amount_out)
+            trade.set("max_quote_amount_in", max_quote_amount_in)
+
+            with telemetry.span("build"):
+                if token_account is not None:
+                    token_account_instruction = None
+                else:
+                    token_account = get_associated_token_address(config.payer_keypair.pubkey(), mint, base_token_program)
+                    # Idempotent, in case a cached "no account" answer is out of date.
+                    token_account_instruction = create_idempotent_associated_token_account(config.payer_keypair.pubkey(), config.payer_keypair.pubkey(), mint, base_token_program)
+
+                swap_instruction = build_buy_instruction(
+                    pool_keys,
+                    token_account,
+                    wsol_token_account,
+                    base_token_program,
+                    creator_vault_authority,
+                    creator_vault_ata,
+                    user_volume_accumulator,
+                    base_amount_out,
+                    max_quote_amount_in,
+                )
+
+                instructions = [*wsol_instructions]
+
+                if token_account_instruction:
+                    instructions.append(token_account_instruction)
+
+                instructions.append(swap_instruction)
+                instructions.extend(close_wsol_instructions)
+
+            with telemetry.span("compile"):
+                tables = await lookup_tables.tables_for_async(pool_keys)
+                budget_instructions = await fee_engine.budget_instructions_async(config.payer_keypair.pubkey(), instructions, tables, blockhash_info.blockhash)
+                compiled_message = MessageV0.try_compile(
+                    config.payer_keypair.pubkey(),
+                    budget_instructions + instructions,
+                    tables,
+                    blockhash_info.blockhash,
+                )
+
+            with telemetry.span("sign"):
+                txn = VersionedTransaction(compiled_message, [config.payer_keypair])
+
+            with telemetry.span("send"):
+                txn_sig = (await config.async_client.send_transaction(txn=txn, opts=TxOpts(skip_preflight=False))).value
+            print(f"Transaction Signature: {txn_sig}")
+            trade.set("signature", str(txn_sig))
+
+            with telemetry.span("confirm"):
+                confirmed = await confirm_txn_async(txn_sig, blockhash_info.last_valid_block_height)
+            if not close_wsol_instructions:  # swapped through the persistent account
+                wsol.wsol_account.record(confirmed, quote_in=max_quote_amount_in)
+            record_trade(mint, token_account, confirmed, base_amount_out, signature=txn_sig)
+            trade.set("confirmed", confirmed)
+
+            print(f"Transaction confirmed: {confirmed}")
+            return confirmed
+    except Exception as e:
+        print("Error occurred during transaction:", e)
+        return False
+
+async def sell(pair_address: str, percentage: int = 100, slippage: int = 5) -> bool:
+    try:
+        with telemetry.span("sell", pair=pair_address, percentage=percentage, slippage=slippage) as trade:
+            if not (1 <= percentage <= 100):
+                print("Percentage must be between 1 and 100.")
+                return False
+
+            with telemetry.span("pool_keys"):
+                pool_keys: Optional[PoolKeys] = await fetch_pool_keys_async(pair_address)
+            if pool_keys is None:
+                print("No pool keys found, aborting transaction.")
+                return False
+
+            mint = pool_keys.base_mint
+
+            with telemetry.span("prefetch"):
+                (
+                    (creator_vault_authority, creator_vault_ata),
+                    mint_info,
+                    (base_reserve, quote_reserve),
+                    token_balance,
+                    (wsol_token_account, wsol_instructions, close_wsol_instructions),
+                    blockhash_info,
+                ) = await asyncio.gather(
+                    telemetry.wrap("creator_vault", get_creator_vault_info_async(pool_keys.creator)),
+                    telemetry.wrap("mint_info", get_mint_info_async(mint)),
+                    telemetry.wrap("reserves", get_pool_reserves_async(pool_keys)),
+                    telemetry.wrap("accounts", get_token_balance_async(mint)),
+                    telemetry.wrap("wsol", wsol_instructions_for_async(0)),
+                    telemetry.wrap("blockhash", chain_state.get_blockhash_async()),
+                )
+
+            if creator_vault_authority is None or creator_vault_ata is None:
+                print("No creator vault info found, aborting transaction.")
+                return False
+
+            if mint_info is None:
+                print("No mint info found, aborting transaction.")
+                return False
+            base_token_program = mint_info.token_program
+
+            token_account = get_associated_token_address(config.payer_keypair.pubkey(), mint, base_token_program)
+
+            if token_balance == 0 or token_balance is None:
+                print("Token balance is zero. Nothing to sell.")
+                return False
+
+            base_amount_in = int(token_balance * (percentage / 100))
+            sol_out = tokens_for_sol(base_amount_in, base_reserve, quote_reserve)
+            slippage_adjustment = 1 - (slippage / 100)
+            min_quote_amount_out = int((sol_out * slippage_adjustment))
+            trade.set("base_amount_in", base_amount_in)
+            trade.set("min_quote_amount_out", min_quote_amount_out)
+
+            with telemetry.span("build"):
+                swap_instruction = build_sell_instruction(
+                    pool_keys,
+                    token_account,
+                    wsol_token_account,
+                    base_token_program,
+                    creator_vault_authority,
+                    creator_vault_ata,
+                    base_amount_in,
+                    min_quote_amount_out,
+                )
+
+                instructions = [
+                    *wsol_instructions,
+                    swap_instruction,
+                    *close_wsol_instructions,
+                ]
+
+                if percentage == 100:
+                    # Selling 100%, so the token account is closed after the swap.
+                    close_account_instruction = close_account(
+                        base_token_program, token_account, config.payer_keypair.pubkey(), config.payer_keypair.pubkey()
+                    )
+                    instructions.append(close_account_instruction)
+
+            with telemetry.span("compile"):
+                tables = await lookup_tables.tables_for_async(pool_keys)
+                budget_instructions = await fee_engine.budget_instructions_async(config.payer_keypair.pubkey(), instructions, tables, blockhash_info.blockhash)
+                compiled_message = MessageV0.try_compile(
+                    config.payer_keypair.pubkey(),
+                    budget_instructions + instructions,
+                    tables,
+                    blockhash_info.blockhash,
+                )
+
+            with telemetry.span("sign"):
+                txn = VersionedTransaction(compiled_message, [config.payer_keypair])
+
+            with telemetry.span("send"):
+                txn_sig = (await config.async_client.send_transaction(txn=txn, opts=TxOpts(skip_preflight=False))).value
+            print(f"Transaction Signature: {txn_sig}")
+            trade.set("signature", str(txn_sig))
+
+            with telemetry.span("confirm"):
+                confirmed = await confirm_txn_async(txn_sig, blockhash_info.last_valid_block_height)
+            if not close_wsol_instructions:  # swapped through the persistent account
+                wsol.wsol_account.record(confirmed, quote_out=min_quote_amount_out)
+            record_trade(mint, token_account, confirmed, -base_amount_in, closed=percentage == 100, signature=txn_sig)
+            trade.set("confirmed", confirmed)
+
+            print(f"Transaction confirmed: {confirmed}")
+            return confirmed
+    except Exception as e:
+        print("Error occurred during transaction:", e)
+        return False
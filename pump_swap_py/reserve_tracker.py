@@ -0,0 +1,191 @@
+import asyncio
+import time
+from typing import Iterable, Optional
+
+from solana.rpc.commitment import Commitment, Processed
+from solana.rpc.websocket_api import SolanaWsClientProtocol, connect
+from solders.pubkey import Pubkey  # type: ignore
+from solders.rpc.responses import AccountNotification, SubscriptionResult  # type: ignore
+
+import config
+from config import WS_RPC
+from pool_utils import PoolKeys
+from token_accounts import decode_token_amount
+
+class ReserveTracker:
+    # Streams the base/quote vault balances of tracked pools over
+    # accountSubscribe and serves reserves from memory. Reconnects with
+    # exponential backoff and resubscribes every tracked vault.
+    def __init__(
+        self,
+        ws_url: str = WS_RPC,
+        client=None,
+        commitment: Commitment = Processed,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 30.0,
+    ):
+        self.ws_url = ws_url
+        self.client = config.async_client if client is None else client
+        self.commitment = commitment
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self.connected = asyncio.Event()
+        self.reconnects = 0
+        self._vault_refs: dict[Pubkey, int] = {}
+        self._amounts: dict[Pubkey, int] = {}
+        self._slots: dict[Pubkey, int] = {}
+        self._updated_at: dict[Pubkey, float] = {}
+        self._subscriptions: dict[int, Pubkey] = {}
+        self._subscribed: dict[Pubkey, int] = {}
+        self._ws: Optional[SolanaWsClientProtocol] = None
+        self._task: Optional[asyncio.Task] = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def track(self, pools: Iterable[PoolKeys]) -> None:
+        self.track_accounts(vault for pool_keys in pools for vault in (pool_keys.pool_base_token_account, pool_keys.pool_quote_token_account))
+
+    def untrack(self, pools: Iterable[PoolKeys]) -> None:
+        self.untrack_accounts(vault for pool_keys in pools for vault in (pool_keys.pool_base_token_account, pool_keys.pool_quote_token_account))
+
+    def track_accounts(self, accounts: Iterable[Pubkey]) -> None:
+        # Any token account can be streamed, e.g. a wallet's (see portfolio.py).
+        new_vaults = []
+        for vault in accounts:
+            self._vault_refs[vault] = self._vault_refs.get(vault, 0) + 1
+            if self._vault_refs[vault] == 1:
+                new_vaults.append(vault)
+        if self._ws is not None and new_vaults:
+            for vault in new_vaults:
+                self._spawn(self._subscribe(self._ws, vault))
+            self._spawn(self.refresh(new_vaults))
+
+    def untrack_accounts(self, accounts: Iterable[Pubkey]) -> None:
+        for vault in accounts:
+            refs = self._vault_refs.get(vault, 0) - 1
+            if refs > 0:
+                self._vault_refs[vault] = refs
+                continue
+            self._vault_refs.pop(vault, None)
+            self._amounts.pop(vault, None)
+            self._slots.pop(vault, None)
+            self._updated_at.pop(vault, None)
+            subscription = self._subscribed.pop(vault, None)
+            if subscription is not None:
+                self._subscriptions.pop(subscription, None)
+                if self._ws is not None:
+                    self._spawn(self._unsubscribe(self._ws, subscription))
+
+    def get_amount(self, account: Pubkey) -> Optional[int]:
+        return self._amounts.get(account)
+
+    def get_reserves(self, pool_keys: PoolKeys) -> tuple[int|None, int|None]:
+        return self._amounts.get(pool_keys.pool_base_token_account), self._amounts.get(pool_keys.pool_quote_token_account)
+
+    def last_update(self, pool_keys: PoolKeys) -> Optional[float]:
+        base = self._updated_at.get(pool_keys.pool_base_token_account)
+        quote = self._updated_at.get(pool_keys.pool_quote_token_account)
+        if base is None or quote is None:
+            return None
+        return min(base, quote)
+
+    def apply_account_data(self, vault: Pubkey, data: bytes, slot: int = 0) -> None:
+        if vault not in self._vault_refs or slot < self._slots.get(vault, 0):
+            return
+        # A closed account is reported with no data.
+        self._amounts[vault] = decode_token_amount(data) if len(data) else 0
+        self._slots[vault] = slot
+        self._updated_at[vault] = time.monotonic()
+
+    async def refresh(self, vaults: Optional[list[Pubkey]] = None) -> None:
+        # Subscriptions only report changes, so balances are seeded with one
+        # getMultipleAccounts call per 100 vaults after (re)subscribing.
+        vaults = list(self._vault_refs) if vaults is None else vaults
+        for i in range(0, len(vaults), 100):
+            chunk = vaults[i:i + 100]
+            try:
+                resp = await self.client.get_multiple_accounts(chunk, commitment=self.commitment)
+            except Exception as e:
+                print(f"Error refreshing vault balances: {e}")
+                continue
+            for vault, account in zip(chunk, resp.value):
+                if account is not None:
+                    self.apply_account_data(vault, account.data, resp.context.slot)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _spawn(self, coroutine) -> asyncio.Task:
+        # The loop only keeps a weak reference to its tasks.
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _subscribe(self, ws: SolanaWsClientProtocol, vault: Pubkey) -> None:
+        try:
+            await ws.account_subscribe(vault, commitment=self.commitment, encoding="base64")
+        except Exception as e:
+            print(f"Error subscribing to {vault}: {e}")
+
+    async def _unsubscribe(self, ws: SolanaWsClientProtocol, subscription: int) -> None:
+        try:
+            await ws.account_unsubscribe(subscription)
+        except Exception as e:
+            print(f"Error unsubscribing {subscription}: {e}")
+
+    def _handle(self, ws: SolanaWsClientProtocol, message) -> None:
+        if isinstance(message, SubscriptionResult):
+            vault = ws.subscriptions[message.result].account
+            if vault not in self._vault_refs:
+                self._spawn(self._unsubscribe(ws, message.result))
+                return
+            self._subscriptions[message.result] = vault
+            self._subscribed[vault] = message.result
+        elif isinstance(message, AccountNotification):
+            vault = self._subscriptions.get(message.subscription)
+            if vault is not None:
+                self.apply_account_data(vault, message.result.value.data, message.result.context.slot)
+
+    async def _run(self) -> None:
+        delay = self.reconnect_delay
+        while True:
+            try:
+                async with connect(self.ws_url) as ws:
+                    self._ws = ws
+                    self._subscriptions.clear()
+                    self._subscribed.clear()
+                    for vault in list(self._vault_refs):
+                        await self._subscribe(ws, vault)
+                    self._spawn(self.refresh())
+                    self.connected.set()
+                    delay = self.reconnect_delay
+                    async for messages in ws:
+                        for message in messages:
+                            self._handle(ws, message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Reserve tracker connection lost: {e}")
+            finally:
+                # Balances can't be trusted while no updates are streaming.
+                self._ws = None
+                self.connected.clear()
+                self._amounts.clear()
+                self._slots.clear()
+                self._updated_at.clear()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
@@ -0,0 +1,194 @@
+import math
+from dataclasses import dataclass, field
+from typing import Optional
+
+from solana.rpc.commitment import Processed
+from solana.rpc.types import MemcmpOpts
+
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+
+import config
+from constants import *
+import pool_utils
+from pool_utils import POOL_BASE_MINT_OFFSET, POOL_QUOTE_MINT_OFFSET, PoolKeys, parse_pool_keys, parse_pool_reserves, sol_for_tokens, tokens_for_sol
+from batch_swap import SwapIntent, build_swap_transactions, send_swap_transactions
+from token_accounts import TOKEN_AMOUNT_SLICE
+
+TOTAL_FEE_BPS = LP_FEE_BPS + PROTOCOL_FEE_BPS
+MULTIPLE_ACCOUNTS_LIMIT = 100
+
+@dataclass
+class RouteLeg:
+    pool_keys: PoolKeys
+    amount_in: int  # lamports (fees included) for buys, tokens for sells
+    amount_out: int  # expected tokens for buys, lamports (after fees) for sells
+
+@dataclass
+class Route:
+    side: str
+    amount_in: int
+    amount_out: int
+    legs: list[RouteLeg] = field(default_factory=list)
+    single_pool_out: int = 0  # what the best single pool would give for the whole amount
+
+    @property
+    def improvement(self) -> float:
+        # Extra output from splitting, relative to the best single pool.
+        return self.amount_out / self.single_pool_out - 1 if self.single_pool_out else 0.0
+
+def buy_amount_out(amount_in: int, base_reserve: int, quote_reserve: int) -> int:
+    # The fees are charged on top of what goes into the curve.
+    return sol_for_tokens(amount_in * FEE_DENOMINATOR // (FEE_DENOMINATOR + TOTAL_FEE_BPS), base_reserve, quote_reserve)
+
+def amount_out(side: str, amount_in: int, base_reserve: int, quote_reserve: int) -> int:
+    if amount_in <= 0:
+        return 0
+    if side == "buy":
+        return buy_amount_out(amount_in, base_reserve, quote_reserve)
+    return tokens_for_sol(amount_in, base_reserve, quote_reserve)
+
+def split_order(amount_in: int, reserves: list[tuple[int, int]], side: str = "buy") -> list[int]:
+    # Splits amount_in across constant-product pools (base, quote reserves)
+    # so the total output is maximal. Every pool charges the same fee, so
+    # for buys the fee only scales the input and for sells the output. At
+    # the optimum every pool used has the same marginal price, which gives
+    # a closed form once the set of pools used is known: the pools are
+    # taken best spot price first while the next one's spot price is still
+    # better than the marginal price of those already used. O(n log n).
+    if side not in ("buy", "sell"):
+        raise ValueError(f"side must be 'buy' or 'sell', got {side!r}")
+    if amount_in <= 0 or not reserves:
+        return [0] * len(reserves)
+    g = FEE_DENOMINATOR / (FEE_DENOMINATOR + TOTAL_FEE_BPS) if side == "buy" else 1.0
+    sqrt = math.sqrt
+    # (price, r_in, sqrt(r_in * r_out), index), best price first.
+    if side == "buy":
+        pools = sorted((quote / base, quote, sqrt(quote * base), i) for i, (base, quote) in enumerate(reserves) if base > 0 and quote > 0)
+    else:
+        pools = sorted((base / quote, base, sqrt(base * quote), i) for i, (base, quote) in enumerate(reserves) if base > 0 and quote > 0)
+    amounts = [0] * len(reserves)
+    if not pools:
+        return amounts
+
+    # With pools A used, r_in + g * x_i = sqrt(r_in * r_out) * scale, where
+    # scale = (g * amount_in + sum r_in) / sum sqrt(r_in * r_out) over A.
+    effective = g * amount_in
+    sum_in = sum_root = 0.0
+    used = 0
+    for price, r_in, root, _ in pools:
+        if used and sum_root * sqrt(price) >= effective + sum_in:
+            break
+        sum_in += r_in
+        sum_root += root
+        used += 1
+    scale = (effective + sum_in) / sum_root
+
+    total = 0
+    for _, r_in, root, i in pools[:used]:
+        amount = max(int((root * scale - r_in) / g), 0)
+        amounts[i] = amount
+        total += amount
+    # Rounding leftovers go to the largest leg.
+    largest = max(pools[:used], key=lambda pool: amounts[pool[3]])[3]
+    amounts[largest] += amount_in - total
+    return amounts
+
+def plan_route(
+    pools: list[tuple[PoolKeys, int, int]],
+    amount_in: int,
+    side: str = "buy",
+    min_leg_fraction: float = 0.01,
+) -> Route:
+    # pools are (pool keys, base reserve, quote reserve). Legs smaller than
+    # min_leg_fraction of the order aren't worth their instruction, so they
+    # are dropped and the rest is split again.
+    candidates = [pool for pool in pools if pool[1] and pool[2]]
+    route = Route(side, amount_in, 0)
+    if not candidates:
+        return route
+    while True:
+        amounts = split_order(amount_in, [(base, quote) for _, base, quote in candidates], side)
+        largest = max(amounts)
+        small = {i for i, amount in enumerate(amounts) if 0 < amount < amount_in * min_leg_fraction and amount < largest}
+        if not small:
+            break
+        candidates = [pool for i, pool in enumerate(candidates) if i not in small]
+    for (pool_keys, base, quote), leg_in in zip(candidates, amounts):
+        if leg_in > 0:
+            leg_out = amount_out(side, leg_in, base, quote)
+            route.legs.append(RouteLeg(pool_keys, leg_in, leg_out))
+            route.amount_out += leg_out
+    route.single_pool_out = max(amount_out(side, amount_in, base, quote) for _, base, quote in pools if base and quote)
+    return route
+
+def fetch_pools_for_mint(mint: Pubkey) -> list[PoolKeys]:
+    # Pools of mint against WSOL, from the pool index when one is set.
+    if pool_utils.pool_index is not None:
+        entries = pool_utils.pool_index.pools_for_mint(mint)
+        if entries:
+            return [entry.to_pool_keys() for entry in entries if entry.base_mint == bytes(mint) and entry.quote_mint == bytes(WSOL)]
+    filters = [MemcmpOpts(offset=POOL_BASE_MINT_OFFSET, bytes=str(mint)), MemcmpOpts(offset=POOL_QUOTE_MINT_OFFSET, bytes=str(WSOL))]
+    try:
+        resp = config.client.get_program_accounts(PF_AMM, filters=filters)
+    except Exception as e:
+        print(f"Error fetching pools for {mint}: {e}")
+        return []
+    pools = []
+    for pool in resp.value:
+        try:
+            pools.append(parse_pool_keys(pool.pubkey, pool.account.data))
+        except Exception as e:
+            print(f"Error processing pool {pool.pubkey}: {e}")
+    return pools
+
+def get_reserves_for_pools(pools: list[PoolKeys]) -> list[tuple[PoolKeys, Optional[int], Optional[int]]]:
+    # Streamed reserves where the reserve tracker has them, the rest with
+    # one getMultipleAccounts call per 50 pools.
+    reserves = {}
+    missing = []
+    for pool_keys in pools:
+        if pool_utils.reserve_tracker is not None:
+            base, quote = pool_utils.reserve_tracker.get_reserves(pool_keys)
+            if base is not None and quote is not None:
+                reserves[pool_keys.amm] = (base, quote)
+                continue
+        missing.append(pool_keys)
+    per_request = MULTIPLE_ACCOUNTS_LIMIT // 2
+    for i in range(0, len(missing), per_request):
+        chunk = missing[i:i + per_request]
+        vaults = [vault for pool_keys in chunk for vault in (pool_keys.pool_base_token_account, pool_keys.pool_quote_token_account)]
+        try:
+            resp = config.client.get_multiple_accounts(vaults, Processed, data_slice=TOKEN_AMOUNT_SLICE)
+        except Exception as e:
+            print(f"Error fetching pool reserves: {e}")
+            continue
+        for j, pool_keys in enumerate(chunk):
+            reserves[pool_keys.amm] = parse_pool_reserves(resp.value[2 * j:2 * j + 2])
+    return [(pool_keys, *reserves.get(pool_keys.amm, (None, None))) for pool_keys in pools]
+
+def find_route(mint: str, amount: float, side: str = "buy", min_leg_fraction: float = 0.01) -> Route:
+    # amount is SOL in for buys and tokens (raw units) in for sells.
+    amount_in = int(amount * 1e9) if side == "buy" else int(amount)
+    pools = get_reserves_for_pools(fetch_pools_for_mint(Pubkey.from_string(mint)))
+    return plan_route(pools, amount_in, side, min_leg_fraction)
+
+def route_intents(route: Route, slippage: int = 5) -> list[SwapIntent]:
+    intents = []
+    for leg in route.legs:
+        pair_address = str(leg.pool_keys.amm)
+        if route.side == "buy":
+            # buy() adds the fees on top of the SOL it is given. Passed in
+            # lamports, as a round trip through SOL can lose one.
+            quote_amount = leg.amount_in * FEE_DENOMINATOR // (FEE_DENOMINATOR + TOTAL_FEE_BPS)
+            intents.append(SwapIntent(pair_address, "buy", quote_amount / 1e9, slippage, quote_amount=quote_amount))
+        else:
+            intents.append(SwapIntent(pair_address, "sell", 0, slippage, base_amount=leg.amount_in))
+    return intents
+
+def execute_route(route: Route, slippage: int = 5) -> list[Optional[Signature]]:
+    # Sends every leg, packed into as few transactions as fit.
+    if not route.legs:
+        print("Route has no legs, nothing to execute.")
+        return []
+    return send_swap_transactions(build_swap_transactions(route_intents(route, slippage)))
@@ -0,0 +1,331 @@
+import asyncio
+import json
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Optional
+
+import httpx
+from solana.rpc.api import Client
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.providers.async_http import AsyncHTTPProvider
+from solana.rpc.providers.core import DEFAULT_TIMEOUT, _after_request_unparsed
+from solana.rpc.providers.http import HTTPProvider
+from solders.rpc.requests import (  # type: ignore
+    Body,
+    SendLegacyTransaction,
+    SendRawTransaction,
+    SendVersionedTransaction,
+    batch_to_json,
+)
+
+from telemetry import telemetry
+
+SEND_REQUESTS = (SendLegacyTransaction, SendRawTransaction, SendVersionedTransaction)
+# Used as the hedge delay until an endpoint has enough latency samples.
+DEFAULT_HEDGE_DELAY = 0.25
+MIN_LATENCY_SAMPLES = 20
+
+class Endpoint:
+    def __init__(self, url: str, window: int = 256):
+        self.url = url
+        self.latencies: deque[float] = deque(maxlen=window)
+        self.outcomes: deque[bool] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.wins = 0
+
+    def record(self, latency: float) -> None:
+        self.requests += 1
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+
+    def record_error(self) -> None:
+        self.requests += 1
+        self.errors += 1
+        self.outcomes.append(False)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+    def hedge_delay(self, default: float = DEFAULT_HEDGE_DELAY) -> float:
+        if len(self.latencies) < MIN_LATENCY_SAMPLES:
+            return default
+        return self.percentile(95)
+
+    def score(self) -> float:
+        # Median latency, inflated by the recent error rate. Endpoints that
+        # haven't been used yet score 0 so they get tried.
+        if not self.outcomes:
+            return 0.0
+        p50 = self.percentile(50)
+        if p50 is None:
+            return float("inf")
+        error_rate = self.outcomes.count(False) / len(self.outcomes)
+        return p50 * (1 + 10 * error_rate)
+
+    def summary(self) -> dict:
+        return {
+            "url": self.url,
+            "requests": self.requests,
+            "errors": self.errors,
+            "wins": self.wins,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+        }
+
+class _EndpointPool:
+    def _init_pool(self, endpoints: list[str], hedge_delay: float) -> None:
+        if not endpoints:
+            raise ValueError("At least one RPC endpoint is required")
+        self.endpoints = [Endpoint(url) for url in endpoints]
+        self.hedge_delay = hedge_delay
+        self.hedges = 0
+
+    def ranked(self) -> list[Endpoint]:
+        return sorted(self.endpoints, key=Endpoint.score)
+
+    def stats(self) -> list[dict]:
+        return [endpoint.summary() for endpoint in self.endpoints]
+
+    def _headers(self) -> dict:
+        return self._build_common_request_kwargs()["headers"]
+
+def _is_rpc_error(text: str) -> bool:
+    try:
+        return "error" in json.loads(text)
+    except ValueError:
+        return True
+
+class PooledHTTPProvider(_EndpointPool, HTTPProvider):
+    # Drop-in provider for solana.rpc.api.Client over several endpoints,
+    # sharing one keep-alive connection pool. Reads go to the fastest
+    # endpoint and are hedged to the next one if no answer arrives within
+    # its p95 latency; transactions are sent to every endpoint at once.
+    def __init__(
+        self,
+        endpoints: list[str],
+        extra_headers: Optional[dict] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        hedge_delay: float = DEFAULT_HEDGE_DELAY,
+        max_connections: int = 64,
+        keepalive_expiry: float = 60.0,
+    ):
+        super().__init__(endpoints[0], extra_headers, timeout)
+        self._init_pool(endpoints, hedge_delay)
+        self.session.close()
+        self.session = httpx.Client(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self._executor = ThreadPoolExecutor(max_workers=4 * len(self.endpoints), thread_name_prefix="rpc-pool")
+
+    def _post(self, endpoint: Endpoint, content: str) -> str:
+        start = time.perf_counter()
+        try:
+            text = _after_request_unparsed(self.session.post(endpoint.url, content=content, headers=self._headers()))
+        except Exception:
+            endpoint.record_error()
+            raise
+        endpoint.record(time.perf_counter() - start)
+        return text
+
+    def _hedged(self, content: str) -> str:
+        remaining = self.ranked()
+        endpoint = remaining.pop(0)
+        if not remaining:
+            return self._post(endpoint, content)
+        pending = {self._executor.submit(self._post, endpoint, content): endpoint}
+        delay = endpoint.hedge_delay(self.hedge_delay)
+        error: Optional[BaseException] = None
+        while pending:
+            done, _ = wait(pending, timeout=delay if remaining else None, return_when=FIRST_COMPLETED)
+            for future in done:
+                winner = pending.pop(future)
+                if future.exception() is None:
+                    winner.wins += 1
+                    return future.result()
+                error = future.exception()
+            if remaining and (not done or not pending):
+                endpoint = remaining.pop(0)
+                pending[self._executor.submit(self._post, endpoint, content)] = endpoint
+                delay = endpoint.hedge_delay(self.hedge_delay)
+                self.hedges += 1
+                telemetry.count("rpc_hedges_total")
+        raise error
+
+    def _fan_out(self, content: str) -> str:
+        # The first successful answer wins; an RPC error (e.g. "already
+        # processed" from a slower endpoint) is only returned if every
+        # endpoint answered with one.
+        pending = {self._executor.submit(self._post, endpoint, content): endpoint for endpoint in self.endpoints}
+        error: Optional[BaseException] = None
+        error_text: Optional[str] = None
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                endpoint = pending.pop(future)
+                if future.exception() is not None:
+                    error = future.exception()
+                elif _is_rpc_error(future.result()):
+                    error_text = error_text or future.result()
+                else:
+                    endpoint.wins += 1
+                    return future.result()
+        if error_text is not None:
+            return error_text
+        raise error
+
+    def make_request_unparsed(self, body: Body) -> str:
+        with telemetry.timer("rpc_request", method=type(body).__name__):
+            if isinstance(body, SEND_REQUESTS):
+                return self._fan_out(body.to_json())
+            return self._hedged(body.to_json())
+
+    def make_batch_request_unparsed(self, reqs: tuple[Body, ...]) -> str:
+        with telemetry.timer("rpc_request", method="Batch"):
+            return self._hedged(batch_to_json(reqs))
+
+    def make_raw_request_unparsed(self, request: dict) -> str:
+        # For methods solana-py has no request type for; hedged like any read.
+        with telemetry.timer("rpc_request", method=request["method"]):
+            return self._hedged(json.dumps(request))
+
+class PooledAsyncHTTPProvider(_EndpointPool, AsyncHTTPProvider):
+    # Async counterpart of PooledHTTPProvider for AsyncClient.
+    def __init__(
+        self,
+        endpoints: list[str],
+        extra_headers: Optional[dict] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        hedge_delay: float = DEFAULT_HEDGE_DELAY,
+        max_connections: int = 64,
+        keepalive_expiry: float = 60.0,
+    ):
+        # Skips AsyncHTTPProvider.__init__, whose own httpx.AsyncClient could
+        # only be closed by awaiting.
+        super(AsyncHTTPProvider, self).__init__(endpoints[0], extra_headers, timeout)
+        self._init_pool(endpoints, hedge_delay)
+        self.session = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+        self._background: set[asyncio.Task] = set()
+
+    def _forget(self, task: asyncio.Task) -> None:
+        self._background.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def _post(self, endpoint: Endpoint, content: str) -> str:
+        start = time.perf_counter()
+        try:
+            text = _after_request_unparsed(await self.session.post(endpoint.url, content=content, headers=self._headers()))
+        except Exception:
+            endpoint.record_error()
+            raise
+        endpoint.record(time.perf_counter() - start)
+        return text
+
+    async def _hedged(self, content: str) -> str:
+        remaining = self.ranked()
+        endpoint = remaining.pop(0)
+        if not remaining:
+            return await self._post(endpoint, content)
+        pending = {asyncio.ensure_future(self._post(endpoint, content)): endpoint}
+        delay = endpoint.hedge_delay(self.hedge_delay)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=delay if remaining else None, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    winner = pending.pop(task)
+                    if task.exception() is None:
+                        winner.wins += 1
+                        return task.result()
+                    error = task.exception()
+                if remaining and (not done or not pending):
+                    endpoint = remaining.pop(0)
+                    pending[asyncio.ensure_future(self._post(endpoint, content))] = endpoint
+                    delay = endpoint.hedge_delay(self.hedge_delay)
+                    self.hedges += 1
+                    telemetry.count("rpc_hedges_total")
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _fan_out(self, content: str) -> str:
+        pending = {asyncio.ensure_future(self._post(endpoint, content)): endpoint for endpoint in self.endpoints}
+        error: Optional[BaseException] = None
+        error_text: Optional[str] = None
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                endpoint = pending.pop(task)
+                if task.exception() is not None:
+                    error = task.exception()
+                elif _is_rpc_error(task.result()):
+                    error_text = error_text or task.result()
+                else:
+                    endpoint.wins += 1
+                    # Let the slower sends finish; they still help the transaction land.
+                    for other in pending:
+                        self._background.add(other)
+                        other.add_done_callback(self._forget)
+                    return task.result()
+        if error_text is not None:
+            return error_text
+        raise error
+
+    async def make_request_unparsed(self, body: Body) -> str:
+        with telemetry.timer("rpc_request", method=type(body).__name__):
+            if isinstance(body, SEND_REQUESTS):
+                return await self._fan_out(body.to_json())
+            return await self._hedged(body.to_json())
+
+    async def make_batch_request_unparsed(self, reqs: tuple[Body, ...]) -> str:
+        with telemetry.timer("rpc_request", method="Batch"):
+            return await self._hedged(batch_to_json(reqs))
+
+    async def make_raw_request_unparsed(self, request: dict) -> str:
+        with telemetry.timer("rpc_request", method=request["method"]):
+            return await self._hedged(json.dumps(request))
+
+def raw_request(client, request: dict) -> dict:
+    # For methods solana-py has no request type for: through the pool when
+    # the client has one, else over the client's own HTTP session.
+    provider = client._provider
+    if isinstance(provider, PooledHTTPProvider):
+        return json.loads(provider.make_raw_request_unparsed(request))
+    return provider.session.post(provider.endpoint_uri, json=request).json()
+
+async def raw_request_async(async_client, request: dict) -> dict:
+    provider = async_client._provider
+    if isinstance(provider, PooledAsyncHTTPProvider):
+        return json.loads(await provider.make_raw_request_unparsed(request))
+    return (await provider.session.post(provider.endpoint_uri, json=request)).json()
+
+def pooled_client(endpoints: list[str], **kwargs) -> Client:
+    client = Client(endpoints[0])
+    client._provider.session.close()
+    client._provider = PooledHTTPProvider(endpoints, **kwargs)
+    return client
+
+def pooled_async_client(endpoints: list[str], **kwargs) -> AsyncClient:
+    # Likewise skips AsyncClient.__init__, which only adds a provider of its own.
+    client = AsyncClient.__new__(AsyncClient)
+    super(AsyncClient, client).__init__()
+    client._provider = PooledAsyncHTTPProvider(endpoints, **kwargs)
+    return client
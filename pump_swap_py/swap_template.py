@@ -0,0 +1,88 @@
+import struct
+
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from config import POOL_CACHE_SIZE, POOL_CACHE_TTL
+from constants import *
+from pool_utils import LRUCache, PoolKeys
+
+SWAP_DATA = struct.Struct("<8sQQ")
+WSOL_ACCOUNT_INDEX = 6
+
+class SwapTemplate:
+    # Account metas for a (pool, payer, token account) are fixed, so they are
+    # built once; a trade only patches in the WSOL account and the amounts.
+    __slots__ = ("sell_keys", "buy_keys")
+
+    def __init__(
+        self,
+        pool_keys: PoolKeys,
+        payer: Pubkey,
+        token_account: Pubkey,
+        base_token_program: Pubkey,
+        creator_vault_authority: Pubkey,
+        creator_vault_ata: Pubkey,
+        user_volume_accumulator: Pubkey,
+    ):
+        self.sell_keys = [
+            AccountMeta(pubkey=pool_keys.amm, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=payer, is_signer=True, is_writable=True),
+            AccountMeta(pubkey=GLOBAL_CONFIG, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=pool_keys.base_mint, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=pool_keys.quote_mint, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=token_account, is_signer=False, is_writable=True),
+            None,  # WSOL account, set per trade
+            AccountMeta(pubkey=pool_keys.pool_base_token_account, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=pool_keys.pool_quote_token_account, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT_TOKEN_ACCOUNT, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=base_token_program, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=ASSOCIATED_TOKEN_PROGRAM, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=EVENT_AUTH, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=PF_AMM, is_signer=False, is_writable=False),
+            AccountMeta(pubkey=creator_vault_ata, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=creator_vault_authority, is_signer=False, is_writable=False),
+        ]
+        self.buy_keys = self.sell_keys + [
+            AccountMeta(pubkey=GLOBAL_VOLUME_ACCUMULATOR, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=user_volume_accumulator, is_signer=False, is_writable=True),
+        ]
+
+    def buy(self, base_amount_out: int, max_quote_amount_in: int, wsol_token_account: Pubkey) -> Instruction:
+        keys = self.buy_keys.copy()
+        keys[WSOL_ACCOUNT_INDEX] = AccountMeta(pubkey=wsol_token_account, is_signer=False, is_writable=True)
+        return Instruction(PF_AMM, SWAP_DATA.pack(BUY_DISCRIMINATOR, base_amount_out, max_quote_amount_in), keys)
+
+    def sell(self, base_amount_in: int, min_quote_amount_out: int, wsol_token_account: Pubkey) -> Instruction:
+        keys = self.sell_keys.copy()
+        keys[WSOL_ACCOUNT_INDEX] = AccountMeta(pubkey=wsol_token_account, is_signer=False, is_writable=True)
+        return Instruction(PF_AMM, SWAP_DATA.pack(SELL_DISCRIMINATOR, base_amount_in, min_quote_amount_out), keys)
+
+swap_template_cache = LRUCache(POOL_CACHE_SIZE, POOL_CACHE_TTL)
+
+def get_swap_template(
+    pool_keys: PoolKeys,
+    payer: Pubkey,
+    token_account: Pubkey,
+    base_token_program: Pubkey,
+    creator_vault_authority: Pubkey,
+    creator_vault_ata: Pubkey,
+    user_volume_accumulator: Pubkey,
+) -> SwapTemplate:
+    key = (pool_keys.amm, payer, token_account)
+    template = swap_template_cache.get(key)
+    if template is None:
+        template = SwapTemplate(
+            pool_keys,
+            payer,
+            token_account,
+            base_token_program,
+            creator_vault_authority,
+            creator_vault_ata,
+            user_volume_accumulator,
+        )
+        swap_template_cache.set(key, template)
+    return template
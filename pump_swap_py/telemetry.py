@@ -0,0 +1,320 @@
+import bisect
+import contextvars
+import itertools
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Optional
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = tuple[tuple[str, str], ...]
+
+_current_span: contextvars.ContextVar[Optional["Span"]] = contextvars.ContextVar("current_span", default=None)
+_ids = itertools.count(1)
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def percentile(self, p: float) -> Optional[float]:
+        # Upper bound of the bucket holding the p-th percentile (inf past the last one).
+        if not self.count:
+            return None
+        rank = self.count * p / 100
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+class Span:
+    __slots__ = ("telemetry", "name", "attributes", "trace_id", "span_id", "parent_id", "start", "end", "start_time", "error", "_token")
+
+    def __init__(self, telemetry: "Telemetry", name: str, attributes: dict):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        self.end: Optional[float] = None
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> Optional[float]:
+        return None if self.end is None else self.end - self.start
+
+    def __enter__(self) -> "Span":
+        parent = _current_span.get()
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self._token = _current_span.set(self)
+        self.start_time = time.time_ns()
+        self.start = time.perf_counter()
+        self.telemetry._started(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end = time.perf_counter()
+        if exc_type is not None:
+            self.error = exc_type.__name__
+        _current_span.reset(self._token)
+        self.telemetry._finished(self)
+        return False
+
+    def to_dict(self) -> dict:
+        # Field names follow the OpenTelemetry span data model.
+        end_time = self.start_time + int((self.duration or 0) * 1e9)
+        return {
+            "name": self.name,
+            "trace_id": f"{self.trace_id:032x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_span_id": f"{self.parent_id:016x}" if self.parent_id is not None else None,
+            "start_time_unix_nano": self.start_time,
+            "end_time_unix_nano": end_time,
+            "attributes": dict(self.attributes),
+            "status": {"code": "ERROR", "message": self.error} if self.error else {"code": "OK"},
+        }
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def set(self, key: str, value) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+# Returned by every span()/timer() call while telemetry is disabled.
+NOOP_SPAN = _NoopSpan()
+
+class _Timer:
+    __slots__ = ("telemetry", "name", "labels", "start")
+
+    def __init__(self, telemetry: "Telemetry", name: str, labels: Labels):
+        self.telemetry = telemetry
+        self.name = name
+        self.labels = labels
+
+    def set(self, key: str, value) -> None:
+        pass
+
+    def __enter__(self) -> "_Timer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        telemetry = self.telemetry
+        telemetry._observe(f"{self.name}_seconds", self.labels, time.perf_counter() - self.start)
+        telemetry._count(f"{self.name}s_total", self.labels, 1)
+        # Cancellation (a BaseException) isn't counted as an error.
+        if exc_type is not None and issubclass(exc_type, Exception):
+            telemetry._count(f"{self.name}_errors_total", self.labels, 1)
+        return False
+
+class Telemetry:
+    # Stage spans (buy/sell and each step inside them), RPC request
+    # counters and latency histograms. Spans nest through a context
+    # variable, so they follow asyncio tasks, and are handed to every
+    # exporter when they start and end. While disabled, span() and timer()
+    # return NOOP_SPAN and nothing is recorded.
+    def __init__(self, enabled: bool = False, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.exporters: list = []
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def add_exporter(self, exporter) -> None:
+        self.exporters.append(exporter)
+
+    def remove_exporter(self, exporter) -> None:
+        self.exporters.remove(exporter)
+
+    def span(self, name: str, **attributes):
+        if not self.enabled:
+            return NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def timer(self, name: str, **labels):
+        if not self.enabled:
+            return NOOP_SPAN
+        return _Timer(self, name, tuple(sorted(labels.items())))
+
+    def wrap(self, name: str, awaitable: Awaitable, **attributes) -> Awaitable:
+        # Runs an awaitable (e.g. one leg of an asyncio.gather) inside a span.
+        if not self.enabled:
+            return awaitable
+        return self._traced(name, awaitable, attributes)
+
+    async def _traced(self, name: str, awaitable: Awaitable, attributes: dict):
+        with Span(self, name, attributes):
+            return await awaitable
+
+    def count(self, name: str, value: float = 1, **labels) -> None:
+        if self.enabled:
+            self._count(name, tuple(sorted(labels.items())), value)
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if self.enabled:
+            self._observe(name, tuple(sorted(labels.items())), value)
+
+    def _count(self, name: str, labels: Labels, value: float) -> None:
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def _observe(self, name: str, labels: Labels, value: float) -> None:
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def _started(self, span: Span) -> None:
+        for exporter in self.exporters:
+            on_start = getattr(exporter, "on_start", None)
+            if on_start is not None:
+                on_start(span)
+
+    def _finished(self, span: Span) -> None:
+        labels = (("span", span.name),)
+        self._observe("span_seconds", labels, span.duration)
+        if span.error is not None:
+            self._count("span_errors_total", labels, 1)
+        for exporter in self.exporters:
+            try:
+                exporter.on_end(span)
+            except Exception as e:
+                print(f"Error exporting span {span.name}: {e}")
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self.histograms.get((name, tuple(sorted(labels.items()))))
+
+    def counter(self, name: str, **labels) -> float:
+        return self.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def stage_summary(self) -> dict[str, dict]:
+        return {
+            dict(labels)["span"]: {"count": h.count, "mean": h.mean, "p50": h.percentile(50), "p99": h.percentile(99)}
+            for (name, labels), h in self.histograms.items()
+            if name == "span_seconds"
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def prometheus_text(self, prefix: str = "pump_swap") -> str:
+        # Prometheus text exposition format, for a /metrics endpoint or a
+        # node_exporter textfile.
+        def label_text(labels: Labels, extra: str = "") -> str:
+            parts = [f'{key}="{value}"' for key, value in labels]
+            if extra:
+                parts.append(extra)
+            return "{" + ",".join(parts) + "}" if parts else ""
+
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                typed.add(name)
+            lines.append(f"{prefix}_{name}{label_text(labels)} {value:g}")
+        for (name, labels), histogram in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {prefix}_{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                bucket_labels = label_text(labels, f'le="{le}"')
+                lines.append(f"{prefix}_{name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{prefix}_{name}_sum{label_text(labels)} {histogram.sum:g}")
+            lines.append(f"{prefix}_{name}_count{label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+class LogExporter:
+    # One log line per finished span, e.g. "buy > send 41.20 ms".
+    def __init__(self, logger: logging.Logger = logging.getLogger("pump_swap"), level: int = logging.INFO):
+        self.logger = logger
+        self.level = level
+        self._names: dict[int, str] = {}
+
+    def on_start(self, span: Span) -> None:
+        parent = self._names.get(span.parent_id)
+        self._names[span.span_id] = f"{parent} > {span.name}" if parent else span.name
+
+    def on_end(self, span: Span) -> None:
+        name = self._names.pop(span.span_id, span.name)
+        fields = [f"{key}={value}" for key, value in span.attributes.items()]
+        if span.error:
+            fields.append(f"error={span.error}")
+        self.logger.log(self.level, " ".join([name, f"{span.duration * 1e3:.2f}", "ms", *fields]))
+
+class CallbackExporter:
+    # Calls on_end (and on_start, if given) with Span.to_dict() for each span.
+    def __init__(self, on_end: Callable[[dict], None], on_start: Optional[Callable[[dict], None]] = None):
+        self._on_end = on_end
+        self._on_start = on_start
+
+    def on_start(self, span: Span) -> None:
+        if self._on_start is not None:
+            self._on_start(span.to_dict())
+
+    def on_end(self, span: Span) -> None:
+        self._on_end(span.to_dict())
+
+class OpenTelemetryExporter:
+    # Mirrors spans into an OpenTelemetry tracer (requires opentelemetry-api
+    # and an SDK/exporter configured by the application).
+    def __init__(self, tracer=None):
+        from opentelemetry import trace
+
+        self._trace = trace
+        self.tracer = tracer or trace.get_tracer("pump_swap")
+        self._spans: dict[int, object] = {}
+
+    def on_start(self, span: Span) -> None:
+        parent = self._spans.get(span.parent_id)
+        context = self._trace.set_span_in_context(parent) if parent is not None else None
+        self._spans[span.span_id] = self.tracer.start_span(span.name, context=context, start_time=span.start_time)
+
+    def on_end(self, span: Span) -> None:
+        otel_span = self._spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        otel_span.set_attributes({key: value if isinstance(value, (bool, int, float, str)) else str(value) for key, value in span.attributes.items()})
+        if span.error:
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.error))
+        otel_span.end(end_time=span.to_dict()["end_time_unix_nano"])
+
+telemetry = Telemetry()
@@ -0,0 +1,135 @@
+import struct
+from typing import Optional
+
+from solana.rpc.types import DataSliceOpts
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from constants import ASSOCIATED_TOKEN_PROGRAM, SYSTEM_PROGRAM, SYSVAR_RENT, TOKEN_PROGRAM_ID
+import pda
+
+# SPL token account (165 bytes): mint (32), owner (32), amount u64,
+# delegate COption<Pubkey> (36), state u8, is_native COption<u64> (12),
+# delegated_amount u64, close_authority COption<Pubkey> (36).
+TOKEN_ACCOUNT_STRUCT = struct.Struct("<32s32sQ36xB4sQQ")
+TOKEN_ACCOUNT_SIZE = 165
+TOKEN_ACCOUNT_AMOUNT = struct.Struct("<Q")
+TOKEN_ACCOUNT_AMOUNT_OFFSET = 64
+# Only the amount is transferred when fetching balances.
+TOKEN_AMOUNT_SLICE = DataSliceOpts(offset=TOKEN_ACCOUNT_AMOUNT_OFFSET, length=TOKEN_ACCOUNT_AMOUNT.size)
+
+# SPL mint (82 bytes): mint_authority COption<Pubkey> (36), supply u64,
+# decimals u8, is_initialized u8, freeze_authority COption<Pubkey> (36).
+MINT_STRUCT = struct.Struct("<36xQBB")
+MINT_SIZE = 82
+MINT_DECIMALS_OFFSET = 44
+
+# Token-2022 keeps the same base layouts; accounts with extensions are
+# padded to 165 bytes and followed by an account type byte and TLV data.
+TOKEN_2022_ACCOUNT_TYPE_OFFSET = TOKEN_ACCOUNT_SIZE
+ACCOUNT_TYPE_MINT = 1
+ACCOUNT_TYPE_ACCOUNT = 2
+
+ACCOUNT_STATE_FROZEN = 2
+
+# Token program instruction indices. The instructions below are built by
+# hand: they are a byte or two of data, and spl.token's builders would pull
+# in construct at import and run it on every trade.
+INITIALIZE_ACCOUNT = 1
+CLOSE_ACCOUNT = 9
+SYNC_NATIVE = 17
+# Associated token program instruction indices.
+CREATE = 0
+CREATE_IDEMPOTENT = 1
+
+class TokenAccount:
+    __slots__ = ("mint", "owner", "amount", "state", "is_native", "delegated_amount")
+
+    def __init__(self, mint: bytes, owner: bytes, amount: int, state: int, is_native: bool, delegated_amount: int):
+        self.mint = mint
+        self.owner = owner
+        self.amount = amount
+        self.state = state
+        self.is_native = is_native
+        self.delegated_amount = delegated_amount
+
+    @property
+    def frozen(self) -> bool:
+        return self.state == ACCOUNT_STATE_FROZEN
+
+class Mint:
+    __slots__ = ("supply", "decimals", "is_initialized")
+
+    def __init__(self, supply: int, decimals: int, is_initialized: bool):
+        self.supply = supply
+        self.decimals = decimals
+        self.is_initialized = is_initialized
+
+def token_2022_account_type(data) -> Optional[int]:
+    # None for plain SPL token accounts and mints without extensions.
+    if len(data) <= TOKEN_2022_ACCOUNT_TYPE_OFFSET:
+        return None
+    return data[TOKEN_2022_ACCOUNT_TYPE_OFFSET]
+
+def decode_token_account(data) -> TokenAccount:
+    mint, owner, amount, state, is_native_tag, _, delegated_amount = TOKEN_ACCOUNT_STRUCT.unpack_from(data)
+    return TokenAccount(mint, owner, amount, state, is_native_tag != b"\x00\x00\x00\x00", delegated_amount)
+
+def decode_token_amount(data) -> int:
+    # Also accepts the 8 bytes returned for TOKEN_AMOUNT_SLICE.
+    if len(data) == TOKEN_ACCOUNT_AMOUNT.size:
+        return TOKEN_ACCOUNT_AMOUNT.unpack(data)[0]
+    return TOKEN_ACCOUNT_AMOUNT.unpack_from(data, TOKEN_ACCOUNT_AMOUNT_OFFSET)[0]
+
+def decode_token_mint(data) -> Pubkey:
+    return Pubkey.from_bytes(bytes(data[:32]))
+
+def decode_mint(data) -> Mint:
+    supply, decimals, is_initialized = MINT_STRUCT.unpack_from(data)
+    return Mint(supply, decimals, bool(is_initialized))
+
+def decode_mint_decimals(data) -> int:
+    return data[MINT_DECIMALS_OFFSET]
+
+def get_associated_token_address(owner: Pubkey, mint: Pubkey, token_program: Pubkey = TOKEN_PROGRAM_ID) -> Pubkey:
+    # Memoized with the other PDAs, see pda.py.
+    return pda.find_program_address((bytes(owner), bytes(token_program), bytes(mint)), ASSOCIATED_TOKEN_PROGRAM)[0]
+
+def _create_associated_token_account(payer: Pubkey, owner: Pubkey, mint: Pubkey, token_program: Pubkey, index: int) -> Instruction:
+    keys = [
+        AccountMeta(payer, True, True),
+        AccountMeta(get_associated_token_address(owner, mint, token_program), False, True),
+        AccountMeta(owner, False, False),
+        AccountMeta(mint, False, False),
+        AccountMeta(SYSTEM_PROGRAM, False, False),
+        AccountMeta(token_program, False, False),
+        AccountMeta(SYSVAR_RENT, False, False),
+    ]
+    # Create predates instruction indices and is sent with empty data.
+    return Instruction(ASSOCIATED_TOKEN_PROGRAM, bytes([index]) if index != CREATE else b"", keys)
+
+def create_associated_token_account(payer: Pubkey, owner: Pubkey, mint: Pubkey, token_program: Pubkey = TOKEN_PROGRAM_ID) -> Instruction:
+    return _create_associated_token_account(payer, owner, mint, token_program, CREATE)
+
+def create_idempotent_associated_token_account(payer: Pubkey, owner: Pubkey, mint: Pubkey, token_program: Pubkey) -> Instruction:
+    return _create_associated_token_account(payer, owner, mint, token_program, CREATE_IDEMPOTENT)
+
+def initialize_account(token_program: Pubkey, account: Pubkey, mint: Pubkey, owner: Pubkey) -> Instruction:
+    keys = [
+        AccountMeta(account, False, True),
+        AccountMeta(mint, False, False),
+        AccountMeta(owner, False, False),
+        AccountMeta(SYSVAR_RENT, False, False),
+    ]
+    return Instruction(token_program, bytes([INITIALIZE_ACCOUNT]), keys)
+
+def close_account(token_program: Pubkey, account: Pubkey, dest: Pubkey, owner: Pubkey) -> Instruction:
+    keys = [
+        AccountMeta(account, False, True),
+        AccountMeta(dest, False, True),
+        AccountMeta(owner, True, False),
+    ]
+    return Instruction(token_program, bytes([CLOSE_ACCOUNT]), keys)
+
+def sync_native(token_program: Pubkey, account: Pubkey) -> Instruction:
+    return Instruction(token_program, bytes([SYNC_NATIVE]), [AccountMeta(account, False, True)])
@@ -0,0 +1,356 @@
+import asyncio
+import contextlib
+from typing import Iterable, Optional
+
+from solana.rpc.commitment import Processed
+from solana.rpc.types import TokenAccountOpts, TxOpts
+
+from solders.keypair import Keypair  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+import config
+from constants import *
+import pda
+from batch_swap import SwapIntent
+from chain_state import chain_state
+from common_utils import get_token_balance_async
+from confirmation import confirmation_watcher
+from fee_engine import fee_engine
+from lookup_tables import lookup_tables
+from pool_utils import *
+from pump_swap import create_wsol_account_instructions
+from swap_template import get_swap_template
+from telemetry import telemetry
+from token_accounts import close_account, create_idempotent_associated_token_account, get_associated_token_address
+from wsol import WsolAccount
+
+class Trader:
+    # One wallet: its keypair, RPC clients and everything cached per wallet
+    # (token accounts, WSOL account, volume accumulator, SOL balance).
+    # Traders share only the pool, blockhash and fee caches, so trades of
+    # different traders run fully in parallel. Within a trader, the SOL a
+    # trade may spend (and the tokens a sell will sell) are reserved before
+    # it is sent, so concurrent trades can't overspend the wallet. The SOL
+    # balance is fetched once and then tracked as a lower bound, like
+    # WsolAccount; a failed trade drops it and it is refetched.
+    def __init__(
+        self,
+        keypair: Keypair,
+        client=None,
+        async_client=None,
+        persistent_wsol: Optional[bool] = None,
+        portfolio=None,
+    ):
+        # With a portfolio.Portfolio of this wallet, token accounts and
+        # balances are served from it instead of owner queries.
+        if persistent_wsol is None:
+            persistent_wsol = config.PERSISTENT_WSOL
+        self.keypair = keypair
+        self.pubkey = keypair.pubkey()
+        self.client = config.client if client is None else client
+        self.async_client = config.async_client if async_client is None else async_client
+        self.user_volume_accumulator = pda.get_user_volume_accumulator(self.pubkey)
+        self.wsol = WsolAccount(self.pubkey, self.client, self.async_client, keypair) if persistent_wsol else None
+        self.token_accounts: dict[Pubkey, Pubkey] = {}
+        self.portfolio = portfolio
+        self.balance: Optional[int] = None
+        self.reserved = 0
+        self.reserved_tokens: dict[Pubkey, int] = {}
+        self.trades = 0
+        self.failures = 0
+        # The persistent WSOL balance is topped up from a local estimate, so
+        # trades that use it are serialized.
+        self._wsol_lock = asyncio.Lock() if persistent_wsol else None
+
+    def __repr__(self) -> str:
+        return f"Trader({self.pubkey})"
+
+    @property
+    def fee_lamports(self) -> int:
+        # With AUTO_FEES the unit price is only picked when the transaction is
+        # built, so the most it can be is reserved.
+        return SIGNATURE_FEE + fee_engine.max_fee_lamports()
+
+    async def get_balance(self) -> int:
+        if self.balance is None:
+            self.balance = (await self.async_client.get_balance(self.pubkey, Processed)).value
+        return self.balance
+
+    def available(self) -> Optional[int]:
+        return None if self.balance is None else self.balance - self.reserved
+
+    async def _reserve(self, lamports: int) -> bool:
+        balance = await self.get_balance()
+        # No await between the check and the reservation.
+        if balance - self.reserved < lamports:
+            return False
+        self.reserved += lamports
+        return True
+
+    def _release_tokens(self, mint: Pubkey, amount: int) -> None:
+        remaining = self.reserved_tokens.get(mint, 0) - amount
+        if remaining > 0:
+            self.reserved_tokens[mint] = remaining
+        else:
+            self.reserved_tokens.pop(mint, None)
+
+    def _settle(self, reserved: int, confirmed: bool, delta: int) -> None:
+        self.reserved -= reserved
+        self.trades += 1
+        if confirmed:
+            if self.balance is not None:
+                self.balance += delta
+        else:
+            self.failures += 1
+            self.balance = None
+
+    async def _token_account(self, mint: Pubkey) -> Optional[Pubkey]:
+        if self.portfolio is not None:
+            return await self.portfolio.get_token_account_async(mint)
+        token_account = self.token_accounts.get(mint)
+        if token_account is None:
+            resp = await self.async_client.get_token_accounts_by_owner(self.pubkey, TokenAccountOpts(mint), Processed)
+            if resp.value:
+                token_account = self.token_accounts[mint] = resp.value[0].pubkey
+        return token_account
+
+    async def _token_balance(self, mint: Pubkey) -> Optional[int]:
+        if self.portfolio is not None:
+            return await self.portfolio.get_token_balance_async(mint)
+        return await get_token_balance_async(mint, self.pubkey)
+
+    async def _wsol_instructions(self, quote_amount_in: int, rent: int):
+        if self.wsol is not None:
+            await self.wsol.get_balance_async()
+            return self.wsol.address, self.wsol.top_up_instructions(quote_amount_in), []
+        wsol_token_account, wsol_instructions, close_wsol_instruction = create_wsol_account_instructions(rent + quote_amount_in, self.pubkey)
+        return wsol_token_account, wsol_instructions, [close_wsol_instruction]
+
+    def _wsol_section(self):
+        return self._wsol_lock if self._wsol_lock is not None else contextlib.nullcontext()
+
+    async def _send(self, pool_keys: PoolKeys, instructions: list, blockhash_info) -> tuple[bool, Signature]:
+        with telemetry.span("compile"):
+            tables = await lookup_tables.tables_for_async(pool_keys)
+            budget_instructions = await fee_engine.budget_instructions_async(self.pubkey, instructions, tables, blockhash_info.blockhash)
+            compiled_message = MessageV0.try_compile(self.pubkey, budget_instructions + instructions, tables, blockhash_info.blockhash)
+        with telemetry.span("sign"):
+            txn = VersionedTransaction(compiled_message, [self.keypair])
+        with telemetry.span("send"):
+            txn_sig = (await self.async_client.send_transaction(txn=txn, opts=TxOpts(skip_preflight=False))).value
+        with telemetry.span("confirm"):
+            return await confirmation_watcher.wait(txn_sig, blockhash_info.last_valid_block_height), txn_sig
+
+    async def buy(self, pair_address: str, sol_in: float = 0.1, slippage: int = 5) -> bool:
+        try:
+            with telemetry.span("buy", wallet=str(self.pubkey), pair=pair_address, sol_in=sol_in, slippage=slippage) as trade:
+                pool_keys: Optional[PoolKeys] = await fetch_pool_keys_async(pair_address)
+                if pool_keys is None:
+                    print(f"{self}: no pool keys found for {pair_address}, aborting transaction.")
+                    return False
+                mint = pool_keys.base_mint
+                max_quote_amount_in = int((sol_in * (1 + slippage / 100)) * 1e9)
+
+                with telemetry.span("prefetch"):
+                    (
+                        (creator_vault_authority, creator_vault_ata),
+                        mint_info,
+                        (base_reserve, quote_reserve),
+                        token_account,
+                        blockhash_info,
+                        rent,
+                    ) = await asyncio.gather(
+                        get_creator_vault_info_async(pool_keys.creator),
+                        get_mint_info_async(mint),
+                        get_pool_reserves_async(pool_keys),
+                        self._token_account(mint),
+                        chain_state.get_blockhash_async(),
+                        chain_state.get_rent_exempt_minimum_async(),
+                    )
+                if creator_vault_authority is None or creator_vault_ata is None or mint_info is None or base_reserve is None:
+                    print(f"{self}: missing pool data for {pair_address}, aborting transaction.")
+                    return False
+                base_token_program = mint_info.token_program
+
+                # Rent for a new token account is spent; rent for a per-trade
+                # WSOL account comes back when it is closed.
+                spent = max_quote_amount_in + self.fee_lamports + (rent if token_account is None else 0)
+                reserved = spent + (rent if self.wsol is None else 0)
+                if not await self._reserve(reserved):
+                    print(f"{self}: insufficient SOL for a {sol_in} SOL buy ({self.available()} lamports available).")
+                    return False
+
+                confirmed, txn_sig = False, None
+                try:
+                    async with self._wsol_section():
+                        wsol_token_account, wsol_instructions, close_wsol_instructions = await self._wsol_instructions(max_quote_amount_in, rent)
+                        instructions = [*wsol_instructions]
+                        if token_account is None:
+                            token_account = get_associated_token_address(self.pubkey, mint, base_token_program)
+                            # Idempotent, as a concurrent buy of the same mint may create it first.
+                            instructions.append(create_idempotent_associated_token_account(self.pubkey, self.pubkey, mint, base_token_program))
+                        template = get_swap_template(
+                            pool_keys, self.pubkey, token_account, base_token_program,
+                            creator_vault_authority, creator_vault_ata, self.user_volume_accumulator,
+                        )
+                        base_amount_out = sol_for_tokens(int(sol_in * 1e9), base_reserve, quote_reserve)
+                        instructions.append(template.buy(base_amount_out, max_quote_amount_in, wsol_token_account))
+                        instructions.extend(close_wsol_instructions)
+                        trade.set("base_amount_out", base_amount_out)
+
+                        confirmed, txn_sig = await self._send(pool_keys, instructions, blockhash_info)
+                        if self.wsol is not None:
+                            self.wsol.record(confirmed, quote_in=max_quote_amount_in)
+                finally:
+                    self._settle(reserved, confirmed, -spent)
+                if confirmed:
+                    self.token_accounts[mint] = token_account
+                if self.portfolio is not None:
+                    self.portfolio.record_trade(mint, token_account, confirmed, base_amount_out, signature=txn_sig)
+                trade.set("confirmed", confirmed)
+                return confirmed
+        except Exception as e:
+            print(f"{self}: error occurred during buy:", e)
+            return False
+
+    async def sell(self, pair_address: str, percentage: int = 100, slippage: int = 5) -> bool:
+        if not (1 <= percentage <= 100):
+            print("Percentage must be between 1 and 100.")
+            return False
+        try:
+            with telemetry.span("sell", wallet=str(self.pubkey), pair=pair_address, percentage=percentage, slippage=slippage) as trade:
+                pool_keys: Optional[PoolKeys] = await fetch_pool_keys_async(pair_address)
+                if pool_keys is None:
+                    print(f"{self}: no pool keys found for {pair_address}, aborting transaction.")
+                    return False
+                mint = pool_keys.base_mint
+
+                with telemetry.span("prefetch"):
+                    (
+                        (creator_vault_authority, creator_vault_ata),
+                        mint_info,
+                        (base_reserve, quote_reserve),
+                        token_balance,
+                        blockhash_info,
+                        rent,
+                    ) = await asyncio.gather(
+                        get_creator_vault_info_async(pool_keys.creator),
+                        get_mint_info_async(mint),
+                        get_pool_reserves_async(pool_keys),
+                        self._token_balance(mint),
+                        chain_state.get_blockhash_async(),
+                        chain_state.get_rent_exempt_minimum_async(),
+                    )
+                if creator_vault_authority is None or creator_vault_ata is None or mint_info is None or base_reserve is None:
+                    print(f"{self}: missing pool data for {pair_address}, aborting transaction.")
+                    return False
+                base_token_program = mint_info.token_program
+
+                # Tokens already promised to in-flight sells aren't sold twice.
+                pending = self.reserved_tokens.get(mint, 0)
+                base_amount_in = int(max((token_balance or 0) - pending, 0) * (percentage / 100))
+                if base_amount_in == 0:
+                    print(f"{self}: token balance is zero. Nothing to sell.")
+                    return False
+                sol_out = tokens_for_sol(base_amount_in, base_reserve, quote_reserve)
+                min_quote_amount_out = int(sol_out * (1 - slippage / 100))
+                token_account = get_associated_token_address(self.pubkey, mint, base_token_program)
+                # Only close the token account if no other sell still needs it.
+                close_token_account = percentage == 100 and pending == 0
+                trade.set("base_amount_in", base_amount_in)
+
+                # Promised before the next await, so a concurrent sell of the
+                # same mint sees them, and given back if SOL for fees is short.
+                self.reserved_tokens[mint] = pending + base_amount_in
+                reserved = self.fee_lamports + (rent if self.wsol is None else 0)
+                has_sol = False
+                try:
+                    has_sol = await self._reserve(reserved)
+                finally:
+                    if not has_sol:
+                        self._release_tokens(mint, base_amount_in)
+                if not has_sol:
+                    print(f"{self}: insufficient SOL for fees ({self.available()} lamports available).")
+                    return False
+
+                confirmed, txn_sig = False, None
+                try:
+                    async with self._wsol_section():
+                        wsol_token_account, wsol_instructions, close_wsol_instructions = await self._wsol_instructions(0, rent)
+                        template = get_swap_template(
+                            pool_keys, self.pubkey, token_account, base_token_program,
+                            creator_vault_authority, creator_vault_ata, self.user_volume_accumulator,
+                        )
+                        instructions = [
+                            *wsol_instructions,
+                            template.sell(base_amount_in, min_quote_amount_out, wsol_token_account),
+                            *close_wsol_instructions,
+                        ]
+                        if close_token_account:
+                            instructions.append(close_account(base_token_program, token_account, self.pubkey, self.pubkey))
+
+                        confirmed, txn_sig = await self._send(pool_keys, instructions, blockhash_info)
+                        if self.wsol is not None:
+                            self.wsol.record(confirmed, quote_out=min_quote_amount_out)
+                finally:
+                    self._release_tokens(mint, base_amount_in)
+                    # With a per-trade WSOL account the proceeds land as SOL;
+                    # with the persistent one they stay wrapped.
+                    proceeds = min_quote_amount_out if self.wsol is None else 0
+                    self._settle(reserved, confirmed, proceeds - self.fee_lamports + (rent if close_token_account else 0))
+                if confirmed and close_token_account:
+                    self.token_accounts.pop(mint, None)
+                if self.portfolio is not None:
+                    self.portfolio.record_trade(mint, token_account, confirmed, -base_amount_in, close_token_account, txn_sig)
+                trade.set("confirmed", confirmed)
+                return confirmed
+        except Exception as e:
+            print(f"{self}: error occurred during sell:", e)
+            return False
+
+    async def execute(self, intent: SwapIntent) -> bool:
+        if intent.side == "buy":
+            return await self.buy(intent.pair_address, intent.amount, intent.slippage)
+        return await self.sell(intent.pair_address, int(intent.amount), intent.slippage)
+
+class TradeExecutor:
+    # Runs trades for many traders concurrently on one event loop, at most
+    # max_concurrency in flight. Confirmations of every trader are batched
+    # by the shared confirmation_watcher.
+    def __init__(self, traders: Iterable[Trader] = (), max_concurrency: int = 256):
+        self.traders = {trader.pubkey: trader for trader in traders}
+        self.max_concurrency = max_concurrency
+
+    def add(self, trader: Trader) -> Trader:
+        self.traders[trader.pubkey] = trader
+        return trader
+
+    def trader(self, wallet: Pubkey) -> Trader:
+        return self.traders[wallet]
+
+    async def run(self, orders: Iterable[tuple[Trader, SwapIntent]]) -> list[bool]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def bounded(trader: Trader, intent: SwapIntent) -> bool:
+            async with semaphore:
+                return await trader.execute(intent)
+
+        return list(await asyncio.gather(*(bounded(trader, intent) for trader, intent in orders)))
+
+    def run_sync(self, orders: Iterable[tuple[Trader, SwapIntent]]) -> list[bool]:
+        return asyncio.run(self.run(orders))
+
+    def stats(self) -> list[dict]:
+        return [
+            {
+                "wallet": str(trader.pubkey),
+                "trades": trader.trades,
+                "failures": trader.failures,
+                "balance": trader.balance,
+                "reserved": trader.reserved,
+            }
+            for trader in self.traders.values()
+        ]
@@ -0,0 +1,110 @@
+from typing import Optional
+
+from solana.rpc.commitment import Processed
+from solana.rpc.types import TxOpts
+
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price  # type: ignore
+from solders.instruction import Instruction  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.system_program import TransferParams, transfer
+from solders.transaction import VersionedTransaction  # type: ignore
+
+import config
+from config import UNIT_PRICE
+from constants import *
+from common_utils import confirm_txn
+from chain_state import chain_state
+from token_accounts import close_account, create_idempotent_associated_token_account, decode_token_amount, get_associated_token_address, sync_native
+
+class WsolAccount:
+    # The payer's WSOL ATA, kept open between trades. The wrapped balance is
+    # tracked locally as a lower bound (buys assume max quote in was spent,
+    # sells assume only min quote out was received), so a top-up is only
+    # added when the balance may be short. A failed trade drops the estimate
+    # and it is reloaded before the next one.
+    def __init__(self, owner: Pubkey = None, client=None, async_client=None, keypair: Keypair = None):
+        self.keypair = keypair or config.payer_keypair
+        self.owner = owner or self.keypair.pubkey()
+        self.address = get_associated_token_address(self.owner, WSOL)
+        self.client = config.client if client is None else client
+        self.async_client = config.async_client if async_client is None else async_client
+        self.exists = False
+        self.balance: Optional[int] = None
+
+    def _store(self, account) -> int:
+        self.exists = account is not None
+        self.balance = decode_token_amount(account.data) if account is not None else 0
+        return self.balance
+
+    def load(self) -> int:
+        return self._store(self.client.get_account_info(self.address, commitment=Processed).value)
+
+    async def load_async(self) -> int:
+        return self._store((await self.async_client.get_account_info(self.address, commitment=Processed)).value)
+
+    def get_balance(self) -> int:
+        return self.balance if self.balance is not None else self.load()
+
+    async def get_balance_async(self) -> int:
+        return self.balance if self.balance is not None else await self.load_async()
+
+    def invalidate(self) -> None:
+        self.balance = None
+
+    def top_up_instructions(self, amount: int) -> list[Instruction]:
+        instructions = []
+        if not self.exists:
+            instructions.append(create_idempotent_associated_token_account(self.owner, self.owner, WSOL, TOKEN_PROGRAM_ID))
+        shortfall = amount - (self.balance or 0)
+        if shortfall > 0:
+            instructions.append(transfer(TransferParams(from_pubkey=self.owner, to_pubkey=self.address, lamports=shortfall)))
+            instructions.append(sync_native(TOKEN_PROGRAM_ID, self.address))
+        return instructions
+
+    def record(self, confirmed: bool, quote_in: int = 0, quote_out: int = 0) -> None:
+        if not confirmed:
+            self.invalidate()
+            return
+        self.exists = True
+        self.balance = max(self.balance or 0, quote_in) - quote_in + quote_out
+
+    def unwrap_instructions(self) -> list[Instruction]:
+        return [close_account(TOKEN_PROGRAM_ID, self.address, self.owner, self.owner)]
+
+    def unwrap(self) -> bool:
+        # Closes the account, returning the wrapped SOL and its rent to the payer.
+        try:
+            if not self.exists:
+                self.load()
+            if not self.exists:
+                print("No WSOL account to unwrap.")
+                return True
+            instructions = [set_compute_unit_limit(10_000), set_compute_unit_price(UNIT_PRICE), *self.unwrap_instructions()]
+            blockhash_info = chain_state.get_blockhash()
+            message = MessageV0.try_compile(self.owner, instructions, [], blockhash_info.blockhash)
+            txn_sig = self.client.send_transaction(
+                txn=VersionedTransaction(message, [self.keypair]),
+                opts=TxOpts(skip_preflight=False),
+            ).value
+            print(f"Transaction Signature: {txn_sig}")
+            confirmed = confirm_txn(txn_sig, last_valid_block_height=blockhash_info.last_valid_block_height)
+            if confirmed:
+                self.exists = False
+                self.balance = 0
+            else:
+                self.invalidate()
+            return confirmed
+        except Exception as e:
+            print("Error occurred during unwrap:", e)
+            return False
+
+# The payer's WsolAccount, created on first use so importing this module
+# doesn't need the keypair.
+def __getattr__(name: str):
+    if name == "wsol_account":
+        global wsol_account
+        wsol_account = WsolAccount()
+        return wsol_account
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# The library is a flat directory of modules that import each other by name.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pump_swap_py"))
+
+PAYER_LAMPORTS = 100 * 10**9
+
+@pytest.fixture
+def fake():
+    # A FakeRpc with the library's clients and shared caches pointed at it,
+    # and a funded payer.
+    from solders.keypair import Keypair  # type: ignore
+    import config
+    import pool_utils
+    from chain_state import chain_state
+    from confirmation import confirmation_watcher
+    from fake_rpc import FakeRpc
+    from fee_engine import fee_engine
+    from lookup_tables import lookup_tables
+    from swap_template import swap_template_cache
+
+    with FakeRpc(slot_time=0.05, websocket=True) as rpc:
+        config.init(str(Keypair()), [rpc.url], rpc.ws_url)
+        confirmation_watcher.ws_url = None
+        confirmation_watcher.websocket = True
+        chain_state.invalidate()
+        pool_utils.clear_pool_cache()
+        swap_template_cache.clear()
+        lookup_tables.invalidate()
+        fee_engine.profiles.clear()
+        fee_engine.fees.clear()
+        rpc.airdrop(config.payer_keypair.pubkey(), PAYER_LAMPORTS)
+        yield rpc
@@ -0,0 +1,38 @@
+import asyncio
+import time
+from typing import Callable, Optional
+
+from solders.hash import Hash  # type: ignore
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+from solders.signature import Signature  # type: ignore
+from solders.transaction import VersionedTransaction  # type: ignore
+
+from constants import BUY_DISCRIMINATOR, PF_AMM
+from swap_template import SWAP_DATA
+
+async def eventually(predicate: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+def transaction(payer, blockhash: str, fail: bool = False) -> VersionedTransaction:
+    # A signed no-op transaction, or with fail one whose swap instruction
+    # errors.
+    if fail:
+        instruction = Instruction(PF_AMM, SWAP_DATA.pack(BUY_DISCRIMINATOR, 1, 1), [AccountMeta(Pubkey.new_unique(), False, True)] * 9)
+    else:
+        instruction = Instruction(Pubkey.new_unique(), b"", [])
+    message = MessageV0.try_compile(payer.pubkey(), [instruction], [], Hash.from_string(blockhash))
+    return VersionedTransaction(message, [payer])
+
+def send_transaction(fake, payer, fail: bool = False, blockhash: Optional[str] = None) -> tuple[Signature, int]:
+    # Lands a transaction straight in the fake, returning its signature and
+    # last valid block height.
+    latest, last_valid_block_height = fake.blockhash()
+    txn = transaction(payer, blockhash or latest, fail)
+    fake.send_transaction(txn, preflight=False)
+    return txn.signatures[0], last_valid_block_height
@@ -0,0 +1,58 @@
+import asyncio
+
+from solders.keypair import Keypair  # type: ignore
+
+from armed_order import ArmedOrder
+from confirmation import confirmation_watcher
+from trader import Trader
+
+def seller(fake, balance: int = 1_000, lamports: int = 10**10):
+    pool_keys = fake.add_pool()
+    keypair = Keypair()
+    if lamports:
+        fake.airdrop(keypair.pubkey(), lamports)
+    token_account = fake.set_token_balance(keypair.pubkey(), pool_keys.base_mint, balance)
+    # Arming waits on the balance when it reserves.
+    fake.latency = {"getBalance": 0.2}
+    return Trader(keypair), pool_keys, token_account
+
+def test_concurrent_armed_sells_do_not_oversell(fake):
+    trader, pool_keys, _ = seller(fake)
+    orders = [ArmedOrder(trader, str(pool_keys.amm), "sell", 100, refresh_interval=10) for _ in range(2)]
+
+    async def run():
+        try:
+            assert sorted(await asyncio.gather(*(order.arm() for order in orders))) == [False, True]
+            assert trader.reserved_tokens == {pool_keys.base_mint: 1_000}
+            for order in orders:
+                order.disarm()
+            assert trader.reserved_tokens == {}
+            assert trader.reserved == 0
+        finally:
+            await confirmation_watcher.stop()
+
+    asyncio.run(run())
+
+def test_trader_sell_leaves_armed_tokens(fake):
+    trader, pool_keys, token_account = seller(fake)
+    order = ArmedOrder(trader, str(pool_keys.amm), "sell", 50, refresh_interval=10)
+
+    async def run():
+        try:
+            assert await order.arm()
+            # Sells what the armed order hasn't promised, keeping the account open.
+            assert await trader.sell(str(pool_keys.amm), 100)
+            assert fake.token_balance(token_account) == 500
+            assert await order.fire()
+        finally:
+            await confirmation_watcher.stop()
+
+    asyncio.run(run())
+    assert fake.token_balance(token_account) == 0
+    assert trader.reserved_tokens == {}
+
+def test_tokens_are_released_without_sol_for_fees(fake):
+    trader, pool_keys, _ = seller(fake, lamports=0)
+    order = ArmedOrder(trader, str(pool_keys.amm), "sell", 100, refresh_interval=10)
+    assert not asyncio.run(order.arm())
+    assert trader.reserved_tokens == {}
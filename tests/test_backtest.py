@@ -0,0 +1,213 @@
+import random
+from fractions import Fraction
+
+import numpy as np
+import pytest
+
+from backtest import (BUY, EVENT_COLUMNS, SELL, Backtest, EventChunk, EventWriter, Orders, buy_cost, read_events,
+                      sell_proceeds, write_events)
+from config import UNIT_BUDGET, UNIT_PRICE
+from constants import FEE_DENOMINATOR, LP_FEE_BPS, PROTOCOL_FEE_BPS, SIGNATURE_FEE
+from pool_utils import sol_for_tokens, tokens_for_sol
+
+B, Q = 10**15, 10**11
+FEE = 5_000
+
+def events(rows: list[tuple[int, ...]]) -> EventChunk:
+    # rows of (slot, pool), or (slot, pool, base_reserve, quote_reserve).
+    rows = [row if len(row) == 4 else (*row, B, Q) for row in rows]
+    return EventChunk(*(np.array(column, dtype=dtype) for column, dtype in zip(zip(*rows), EVENT_COLUMNS.values())))
+
+def split(chunk: EventChunk, *sizes: int) -> list[EventChunk]:
+    bounds = np.cumsum((0,) + sizes).tolist() + [len(chunk)]
+    return [EventChunk(*(column[start:end] for column in vars(chunk).values())) for start, end in zip(bounds, bounds[1:])]
+
+def at(plan: dict[tuple[int, int], tuple]):
+    # A strategy placing (side, amount) or (side, amount, slippage) at the
+    # rows with the given (slot, pool).
+    def strategy(chunk: EventChunk, backtest: Backtest) -> Orders:
+        rows = [row for row, key in enumerate(zip(chunk.slot.tolist(), chunk.pool.tolist())) if key in plan]
+        orders = [(*plan[(int(chunk.slot[row]), int(chunk.pool[row]))], 5)[:3] for row in rows]
+        return Orders(np.array(rows, dtype=np.int64), np.array([o[0] for o in orders], dtype=np.int64),
+                      np.array([o[1] for o in orders], dtype=float), np.array([o[2] for o in orders], dtype=float))
+    return strategy
+
+def test_rounding_is_against_the_trader():
+    rng = random.Random(24)
+    fee = Fraction(LP_FEE_BPS + PROTOCOL_FEE_BPS, FEE_DENOMINATOR)
+    for _ in range(200):
+        base, quote = rng.randrange(10**6, 10**15), rng.randrange(10**6, 10**12)
+        amount = rng.randrange(1, base // 10)
+        assert buy_cost(amount, base, quote) >= Fraction(quote * amount, base - amount) * (1 + fee)
+        assert sell_proceeds(amount, base, quote) <= Fraction(quote * amount, base + amount) * (1 - fee)
+        # Never better than the floor-fee quote the trading code uses.
+        assert sell_proceeds(amount, base, quote) <= tokens_for_sol(amount, base, quote)
+    assert buy_cost(B, B, Q) is None
+
+def test_latency_and_landing_slot():
+    stream = events([
+        (10, 0, B, Q),
+        (10, 1),
+        (11, 1),
+        (11, 0, B - 10**12, Q + 10**8),
+        (12, 1),
+        (13, 0, B - 2 * 10**12, Q + 2 * 10**8),
+    ])
+    base_amount = sol_for_tokens(10**8, B, Q)
+    for latency, landing_row in [(1, 3), (2, 5), (3, 5)]:
+        result = Backtest(at({(10, 0): (BUY, 0.1)}), latency_slots=latency, fee_lamports=FEE).run([stream])
+        [fill] = result.fills
+        assert (fill.pool, fill.side, fill.decided_slot, fill.slot) == (0, "buy", 10, int(stream.slot[landing_row]))
+        assert fill.base_amount == base_amount and fill.expected_quote == 10**8
+        assert fill.quote_amount == buy_cost(base_amount, int(stream.base_reserve[landing_row]), int(stream.quote_reserve[landing_row]))
+        assert result.sol == -fill.quote_amount - FEE
+        assert result.positions == {0: base_amount}
+
+    # Too late for any later row of its pool.
+    result = Backtest(at({(10, 0): (BUY, 0.1)}), latency_slots=4).run([stream])
+    assert result.fills == [] and result.pending == 1
+
+def test_orders_carry_across_chunks(tmp_path):
+    rng = random.Random(7)
+    rows, slot = [], 0
+    for _ in range(120):
+        slot += rng.choice((0, 1, 1, 3))
+        rows.append((slot, rng.randrange(4), rng.randrange(9 * 10**14, 11 * 10**14), rng.randrange(9 * 10**10, 11 * 10**10)))
+    stream = events(rows)
+    plan = {}
+    for row in range(0, 100, 3):
+        key = (rows[row][0], rows[row][1])
+        plan.setdefault(key, (BUY, 0.05, 10) if row % 2 else (SELL, 50.0, 10))
+
+    write_events(str(tmp_path), stream.slot, stream.pool, stream.base_reserve, stream.quote_reserve, part_events=25)
+    whole = Backtest(at(plan), latency_slots=2).run([stream])
+    chunked = Backtest(at(plan), latency_slots=2).run(str(tmp_path), chunk_events=2)
+    assert whole.filled > 10 and whole.positions
+    # Every fill lands at least the latency after its decision, so with
+    # two-row chunks most of them wait for a later chunk.
+    assert all(fill.slot >= fill.decided_slot + 2 for fill in chunked.fills)
+    for name in ("events", "orders", "filled", "skipped", "rejected_slippage", "rejected_funds", "expired", "pending",
+                 "fees", "sol", "value", "positions", "fills"):
+        assert getattr(chunked, name) == getattr(whole, name), name
+
+@pytest.mark.parametrize("sizes", [(), (1,), (2,), (3,), (1, 1, 1, 1)])
+def test_expiry(sizes):
+    stream = events([
+        (10, 0),
+        (10, 1),
+        (100, 2),
+        (160, 1),  # the last slot order 1 may land at
+        (161, 0),
+    ])
+    plan = {(10, 0): (BUY, 0.1), (10, 1): (BUY, 0.1), (100, 2): (BUY, 0.1)}
+    result = Backtest(at(plan), fee_lamports=FEE).run(split(stream, *sizes))
+    assert (result.orders, result.filled, result.expired, result.pending) == (3, 1, 1, 1)
+    assert [(fill.pool, fill.slot) for fill in result.fills] == [(1, 160)]
+    # Only the landed transaction pays.
+    assert result.fees == FEE
+
+    result = Backtest(at(plan), max_age_slots=149).run(split(stream, *sizes))
+    assert (result.filled, result.expired, result.pending) == (0, 2, 1)
+
+def test_rejected_for_slippage():
+    stream = events([
+        (10, 0),
+        (11, 0, B, Q * 110 // 100),  # buy lands after the price rose 10%
+        (12, 0),
+        (13, 0),  # fills
+        (14, 0),
+        (15, 0, B, Q * 90 // 100),  # sell lands after it fell 10%
+        (16, 0),
+        (17, 0, B, Q * 97 // 100),  # within 5%
+    ])
+    plan = {(10, 0): (BUY, 0.1), (12, 0): (BUY, 0.1), (14, 0): (SELL, 100.0), (16, 0): (SELL, 100.0)}
+    result = Backtest(at(plan), fee_lamports=FEE).run([stream])
+    assert (result.filled, result.rejected_slippage) == (2, 2)
+    buy, sell = result.fills
+    assert (buy.slot, sell.slot) == (13, 17)
+    assert sell.quote_amount == sell_proceeds(buy.base_amount, B, Q * 97 // 100)
+    assert sell.expected_quote == tokens_for_sol(buy.base_amount, B, Q)
+    # All four landed, so all four paid.
+    assert result.fees == 4 * FEE
+    assert result.sol == sell.quote_amount - buy.quote_amount - 4 * FEE
+    assert result.positions == {} and result.value == 0
+
+def test_rejected_for_funds():
+    stream = events([
+        (10, 0),
+        (11, 0),
+        (12, 0),
+        (12, 0),  # both sells decided here land on the next row
+        (13, 0),
+    ])
+    def strategy(chunk, backtest):
+        return Orders(np.array([0, 3, 3]), np.array([BUY, SELL, SELL]), np.array([0.1, 100.0, 100.0]))
+    result = Backtest(strategy, fee_lamports=FEE).run([stream])
+    assert (result.filled, result.rejected_funds, result.skipped) == (2, 1, 0)
+    assert result.fees == 3 * FEE
+    assert result.sol == result.fills[1].quote_amount - result.fills[0].quote_amount - 3 * FEE
+
+    # A buy for more than the pool holds.
+    stream = events([(10, 0, 1_000, 10**9), (11, 0, 1_000, 10**9)])
+    result = Backtest(at({(10, 0): (BUY, 1_000.0)}), fee_lamports=FEE).run([stream])
+    assert (result.filled, result.rejected_funds, result.fees, result.sol) == (0, 1, FEE, -FEE)
+
+def test_sell_without_a_position_is_skipped():
+    stream = events([(10, 0), (11, 0)])
+    result = Backtest(at({(10, 0): (SELL, 100.0)})).run([stream])
+    assert (result.orders, result.skipped, result.fees, result.pending) == (1, 1, 0, 0)
+    assert Backtest(at({})).fee_lamports == SIGNATURE_FEE + UNIT_BUDGET * UNIT_PRICE // 1_000_000
+
+def test_positions_are_marked_at_the_last_reserves():
+    first = events([
+        (10, 0),
+        (10, 1),
+        (11, 0),
+        (11, 1),
+        (12, 0, B - 10**13, Q + 10**9),
+    ])
+    second = events([
+        (13, 1, B // 2, Q * 3),
+        (14, 1, B, Q * 2),
+        (15, 2),
+    ])
+    plan = {(10, 0): (BUY, 0.1), (10, 1): (BUY, 0.2)}
+    result = Backtest(at(plan), fee_lamports=FEE).run([first, second])
+    positions = {fill.pool: fill.base_amount for fill in result.fills}
+    assert result.positions == positions and len(positions) == 2
+    # Pool 0 last traded in the first chunk, pool 1 in the second.
+    assert result.value == sell_proceeds(positions[0], B - 10**13, Q + 10**9) + sell_proceeds(positions[1], B, Q * 2)
+    assert result.pnl == result.sol + result.value
+
+def test_event_files_round_trip(tmp_path):
+    rng = np.random.default_rng(1)
+    n = 23
+    columns = (
+        np.sort(rng.integers(0, 2**40, n)),
+        rng.integers(0, 2**32, n),
+        rng.integers(0, 2**63, n),
+        rng.integers(0, 2**63, n),
+    )
+    with EventWriter(str(tmp_path / "events"), part_events=5) as writer:
+        writer.append(*(column[0] for column in columns))
+        for start, end in [(1, 3), (3, 11), (11, 12), (12, n)]:
+            writer.append(*(column[start:end] for column in columns))
+    # A part is written once part_events have been appended, whole appends at a time.
+    assert writer.parts == 2
+    assert sorted(path.name for path in (tmp_path / "events").iterdir()) == ["part-00000", "part-00001"]
+    assert len(np.load(tmp_path / "events" / "part-00000" / "slot.npy")) == 11
+
+    chunks = list(read_events(str(tmp_path / "events"), chunk_events=3))
+    assert all(0 < len(chunk) <= 3 for chunk in chunks)
+    for name, column in zip(EVENT_COLUMNS, columns):
+        values = [getattr(chunk, name) for chunk in chunks]
+        assert {value.dtype for value in values} == {np.dtype(EVENT_COLUMNS[name])}
+        assert np.array_equal(np.concatenate(values), column)
+
+    # write_events splits into parts of part_events, and a directory of
+    # plain .npy columns reads as a single part.
+    write_events(str(tmp_path / "parts"), *columns, part_events=10)
+    assert len(list((tmp_path / "parts").iterdir())) == 3
+    assert np.array_equal(np.concatenate([chunk.slot for chunk in read_events(str(tmp_path / "parts"))]), columns[0])
+    single = tmp_path / "parts" / "part-00001"
+    assert [len(chunk) for chunk in read_events(str(single), chunk_events=4)] == [4, 4, 2]
@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from batch_quote import FAST_PATH_LIMIT, quote_grid, sol_for_tokens_batch, tokens_for_sol_batch
+from constants import FEE_DENOMINATOR, LP_FEE_BPS, PROTOCOL_FEE_BPS
+from pool_utils import sol_for_tokens, tokens_for_sol
+
+U64_MAX = 2**64 - 1
+EDGES = [1, 2, FAST_PATH_LIMIT - 1, FAST_PATH_LIMIT, FAST_PATH_LIMIT + 1, 2**63 - 1, 2**63, U64_MAX]
+
+def random_u64(rng: np.random.Generator, n: int, low: int = 0) -> list[int]:
+    # Log-uniform over the whole u64 range, so small, fast-path and
+    # overflowing magnitudes are all drawn.
+    values = rng.integers(0, 2**64, n, dtype=np.uint64, endpoint=False) >> rng.integers(0, 64, n).astype(np.uint64)
+    return [max(int(v), low) for v in values]
+
+@pytest.mark.parametrize("seed", range(20))
+@pytest.mark.parametrize("batch, scalar", [(sol_for_tokens_batch, sol_for_tokens), (tokens_for_sol_batch, tokens_for_sol)])
+def test_matches_scalar_over_u64(seed, batch, scalar):
+    rng = np.random.default_rng(seed)
+    amounts = random_u64(rng, 500)
+    base = random_u64(rng, 500, low=1)
+    quote = random_u64(rng, 500, low=1)
+    dtype = np.uint64
+    if seed % 2:
+        # Only fast-path magnitudes, so the float64 estimate is exercised
+        # instead of the Python int fallback.
+        amounts, base, quote = ([v % (FAST_PATH_LIMIT // 2) + 1 for v in values] for values in (amounts, base, quote))
+        dtype = np.int64
+    result = batch(np.array(amounts, dtype=dtype), np.array(base, dtype=dtype), np.array(quote, dtype=dtype))
+    for i, (a, b, q) in enumerate(zip(amounts, base, quote)):
+        assert int(result.amount_out[i]) == scalar(a, b, q)
+
+@pytest.mark.parametrize("batch, scalar", [(sol_for_tokens_batch, sol_for_tokens), (tokens_for_sol_batch, tokens_for_sol)])
+def test_matches_scalar_at_edges(batch, scalar):
+    cases = [(a, b, q) for a in [0, *EDGES] for b in EDGES for q in EDGES]
+    amounts, base, quote = (np.array(values, dtype=object) for values in zip(*cases))
+    result = batch(amounts, base, quote)
+    assert [int(v) for v in result.amount_out] == [scalar(a, b, q) for a, b, q in cases]
+
+def test_fast_path_near_limit():
+    # Every product needs more than 64 bits, but every input is below the limit.
+    rng = np.random.default_rng(0)
+    amounts = rng.integers(FAST_PATH_LIMIT // 4, FAST_PATH_LIMIT // 2, 10_000)
+    base = rng.integers(FAST_PATH_LIMIT // 4, FAST_PATH_LIMIT // 2, 10_000)
+    quote = rng.integers(FAST_PATH_LIMIT // 4, FAST_PATH_LIMIT // 2, 10_000)
+    buys = sol_for_tokens_batch(amounts, base, quote)
+    sells = tokens_for_sol_batch(amounts, base, quote)
+    assert buys.amount_out.dtype == np.int64 and sells.amount_out.dtype == np.int64
+    for a, b, q, out_buy, out_sell in zip(amounts.tolist(), base.tolist(), quote.tolist(), buys.amount_out.tolist(), sells.amount_out.tolist()):
+        assert out_buy == sol_for_tokens(a, b, q)
+        assert out_sell == tokens_for_sol(a, b, q)
+
+def test_sell_fees():
+    result = tokens_for_sol_batch(10**9, 10**15, 10**11)
+    quote_out = 10**11 - 10**15 * 10**11 // (10**15 + 10**9)
+    assert int(result.fees) == quote_out * LP_FEE_BPS // FEE_DENOMINATOR + quote_out * PROTOCOL_FEE_BPS // FEE_DENOMINATOR
+    assert int(result.amount_out) + int(result.fees) == quote_out
+
+@pytest.mark.parametrize("batch, scalar", [(sol_for_tokens_batch, sol_for_tokens), (tokens_for_sol_batch, tokens_for_sol)])
+@pytest.mark.filterwarnings("error")
+def test_empty_pool_raises(batch, scalar):
+    with pytest.raises(ZeroDivisionError):
+        scalar(0, 0, 0)
+    with pytest.raises(ZeroDivisionError):
+        batch(np.array([1, 0]), np.array([10, 0]), np.array([10, 0]))
+    with pytest.raises(ZeroDivisionError):
+        batch(np.array([1, 0], dtype=object), np.array([2**64 - 1, 0], dtype=object), np.array([10, 0], dtype=object))
+
+def test_rejects_float_amounts():
+    with pytest.raises(TypeError):
+        sol_for_tokens_batch(np.array([0.5]), 10, 10)
+
+def test_quote_grid():
+    amounts = [10**6, 10**7, 10**8]
+    base = np.array([10**15, 5 * 10**14])
+    quote = np.array([10**11, 3 * 10**10])
+    for side, scalar in (("buy", sol_for_tokens), ("sell", tokens_for_sol)):
+        grid = quote_grid(amounts, base, quote, side)
+        assert grid.amount_out.shape == (2, 3)
+        for i in range(2):
+            for j in range(3):
+                assert int(grid.amount_out[i, j]) == scalar(amounts[j], int(base[i]), int(quote[i]))
+    with pytest.raises(ValueError):
+        quote_grid(amounts, base, quote, "swap")
@@ -0,0 +1,110 @@
+import struct
+
+from solana.rpc.types import TxOpts
+
+from solders.hash import Hash  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.system_program import ID as SYSTEM_PROGRAM_ID  # type: ignore
+
+import config
+from batch_swap import PACKET_DATA_SIZE, SwapIntent, _compile, build_swap_transactions, pack_swaps, prepare_swap, transaction_size
+from constants import ACCOUNT_SPACE, BUY_DISCRIMINATOR, PF_AMM, SELL_DISCRIMINATOR, TOKEN_PROGRAM_ID
+from chain_state import chain_state
+from lookup_tables import STATIC_LOOKUP_ADDRESSES, lookup_tables, pool_lookup_addresses
+from swap_template import WSOL_ACCOUNT_INDEX
+
+RENT = 2_039_280
+
+def swap_instructions(message):
+    keys = message.account_keys
+    for instruction in message.instructions:
+        if keys[instruction.program_id_index] == PF_AMM:
+            yield bytes(instruction.data[:8]), keys[instruction.accounts[WSOL_ACCOUNT_INDEX]]
+
+def program_instructions(message, program_id):
+    keys = message.account_keys
+    return [instruction for instruction in message.instructions if keys[instruction.program_id_index] == program_id]
+
+def add_pools(fake, monkeypatch, count: int) -> list:
+    # Without lookup tables a single swap takes most of a transaction.
+    pools = [fake.add_pool() for _ in range(count)]
+    monkeypatch.setattr(lookup_tables, "static_table", fake.add_lookup_table(STATIC_LOOKUP_ADDRESSES))
+    monkeypatch.setattr(lookup_tables, "_pool_tables", {})
+    for pool_keys in pools:
+        lookup_tables.register_pool_table(pool_keys.amm, fake.add_lookup_table(pool_lookup_addresses(pool_keys)))
+    return pools
+
+def test_packs_greedily_under_packet_size(fake, monkeypatch):
+    pools = add_pools(fake, monkeypatch, 12)
+    prepared = [prepare_swap(SwapIntent(str(pool_keys.amm), "buy", 0.01)) for pool_keys in pools]
+    messages = pack_swaps(prepared, Hash.default(), rent=RENT)
+    assert 1 < len(messages) < len(prepared)
+
+    start = 0
+    for i, message in enumerate(messages):
+        count = len(list(swap_instructions(message)))
+        assert transaction_size(message) <= PACKET_DATA_SIZE
+        if i < len(messages) - 1:
+            # The next swap didn't fit in this one.
+            bigger = _compile(prepared[start:start + count + 1], Hash.default(), config.UNIT_BUDGET, config.UNIT_PRICE, RENT)
+            assert transaction_size(bigger) > PACKET_DATA_SIZE
+        start += count
+    assert start == len(prepared)
+
+def test_sells_run_first_through_one_wsol_account(fake, monkeypatch):
+    pools = add_pools(fake, monkeypatch, 3)
+    fake.set_token_balance(config.payer_keypair.pubkey(), pools[2].base_mint, 10**9)
+    intents = [
+        SwapIntent(str(pools[0].amm), "buy", 0.01),
+        SwapIntent(str(pools[1].amm), "buy", 0.02),
+        SwapIntent(str(pools[2].amm), "sell", 50),
+    ]
+    messages = pack_swaps([prepare_swap(intent) for intent in intents], Hash.default(), rent=RENT)
+    assert len(messages) == 1
+    swaps = list(swap_instructions(messages[0]))
+    assert [discriminator for discriminator, _ in swaps] == [SELL_DISCRIMINATOR, BUY_DISCRIMINATOR, BUY_DISCRIMINATOR]
+    assert len({wsol_account for _, wsol_account in swaps}) == 1
+    # Created once, funded with every buy's max quote in, and closed once.
+    assert len(program_instructions(messages[0], SYSTEM_PROGRAM_ID)) == 1
+    closes = [instruction for instruction in program_instructions(messages[0], TOKEN_PROGRAM_ID) if instruction.data[0] == 9]
+    assert len(closes) == 1
+
+def test_payer_is_used_throughout(fake):
+    payer = Keypair()
+    fake.airdrop(payer.pubkey(), 10**10)
+    pool_keys = fake.add_pool()
+    token_account = fake.set_token_balance(payer.pubkey(), pool_keys.base_mint, 1000)
+
+    swap = prepare_swap(SwapIntent(str(pool_keys.amm), "sell", 50), payer.pubkey())
+    # The balance is the given payer's, not the configured one's (which has none).
+    assert swap.amounts[0] == 500
+    assert swap.payer == payer.pubkey()
+
+    transactions = build_swap_transactions([SwapIntent(str(pool_keys.amm), "sell", 50)], payer)
+    assert len(transactions) == 1
+    message = transactions[0].message
+    assert message.account_keys[0] == payer.pubkey()
+    assert config.payer_keypair.pubkey() not in message.account_keys
+    config.client.send_transaction(transactions[0], opts=TxOpts(skip_preflight=True))
+    assert fake.token_balance(token_account) == 500
+
+def test_payers_are_not_mixed(fake):
+    other = Keypair()
+    pool_keys = fake.add_pool()
+    prepared = [
+        prepare_swap(SwapIntent(str(pool_keys.amm), "buy", 0.01)),
+        prepare_swap(SwapIntent(str(pool_keys.amm), "buy", 0.01), other.pubkey()),
+    ]
+    messages = pack_swaps(prepared, Hash.default(), rent=RENT)
+    assert [message.account_keys[0] for message in messages] == [config.payer_keypair.pubkey(), other.pubkey()]
+
+def test_rent_defaults_to_the_rent_exempt_minimum(fake):
+    pool_keys = fake.add_pool()
+    prepared = [prepare_swap(SwapIntent(str(pool_keys.amm), "buy", 0.01))]
+    [message] = pack_swaps(prepared, Hash.default())
+    assert fake.calls["getMinimumBalanceForRentExemption"] == 1
+    # create_account_with_seed data ends with lamports, space and owner.
+    [create] = program_instructions(message, SYSTEM_PROGRAM_ID)
+    lamports, space = struct.unpack("<QQ", bytes(create.data)[-48:-32])
+    assert space == ACCOUNT_SPACE
+    assert lamports == chain_state.get_rent_exempt_minimum() + prepared[0].quote_lamports
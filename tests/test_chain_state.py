@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from chain_state import ChainState
+from constants import ACCOUNT_SPACE
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_blockhash_is_reused_while_fresh(fake):
+    clock = FakeClock()
+    state = ChainState(max_age=30, clock=clock)
+    first = state.get_blockhash()
+    clock.now = 29
+    assert state.get_blockhash() is first
+    assert fake.calls["getLatestBlockhash"] == 1
+    assert first.last_valid_block_height > fake.block_height
+
+def test_blockhash_is_refetched_when_stale(fake):
+    clock = FakeClock()
+    state = ChainState(max_age=30, clock=clock)
+    first = state.get_blockhash()
+    clock.now = 30
+    second = state.get_blockhash()
+    assert second is not first
+    assert second.fetched_at == 30
+    assert fake.calls["getLatestBlockhash"] == 2
+
+def test_invalidate_drops_blockhash_and_rent(fake):
+    state = ChainState()
+    state.get_blockhash()
+    assert state.get_rent_exempt_minimum() == fake.rent_exempt_minimum(ACCOUNT_SPACE)
+    state.get_rent_exempt_minimum()
+    assert fake.calls["getMinimumBalanceForRentExemption"] == 1
+    state.invalidate()
+    state.get_blockhash()
+    state.get_rent_exempt_minimum()
+    assert fake.calls["getLatestBlockhash"] == 2
+    assert fake.calls["getMinimumBalanceForRentExemption"] == 2
+
+def test_async_shares_the_cache(fake):
+    clock = FakeClock()
+    state = ChainState(max_age=30, clock=clock)
+
+    async def run():
+        first = await state.get_blockhash_async()
+        assert state.get_blockhash() is first
+        assert await state.get_rent_exempt_minimum_async() == fake.rent_exempt_minimum(ACCOUNT_SPACE)
+        clock.now = 31
+        assert await state.get_blockhash_async() is not first
+
+    asyncio.run(run())
+    assert fake.calls["getLatestBlockhash"] == 2
+
+def test_background_refresh(fake):
+    state = ChainState(refresh_interval=0.02)
+    state.start()
+    try:
+        deadline = time.monotonic() + 5
+        while fake.calls["getLatestBlockhash"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert fake.calls["getLatestBlockhash"] >= 3
+        # The refresher keeps it fresh, so trades don't fetch it.
+        fake.reset_calls()
+        state.get_blockhash()
+        state.get_rent_exempt_minimum()
+        assert fake.calls["getMinimumBalanceForRentExemption"] == 0
+    finally:
+        state.stop()
+    assert state._thread is None
+
+def test_background_refresh_survives_errors(fake, capsys):
+    state = ChainState(refresh_interval=0.02)
+    fake.stop()
+    state.start()
+    time.sleep(0.1)
+    state.stop()
+    assert "Error refreshing blockhash" in capsys.readouterr().out
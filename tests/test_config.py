@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from solders.keypair import Keypair  # type: ignore
+
+import config
+import pda
+
+LIBRARY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "pump_swap_py")
+
+@pytest.fixture
+def fresh_config(monkeypatch):
+    # Puts config back to its unbuilt state, and restores it afterwards.
+    for name in ("PRIV_KEY", "RPC", "RPC_ENDPOINTS", "WS_RPC"):
+        monkeypatch.setattr(config, name, getattr(config, name))
+    for name in config.LAZY_ATTRIBUTES:
+        if name in vars(config):
+            monkeypatch.delattr(config, name)
+    built = []
+    build = config._build
+
+    def counting_build(name):
+        built.append(name)
+        return build(name)
+
+    monkeypatch.setattr(config, "_build", counting_build)
+    return built
+
+def test_import_builds_nothing():
+    # In a fresh interpreter with the placeholder key, which would fail to
+    # parse if anything read it.
+    code = (
+        "import config, pump_swap, pump_swap_async\n"
+        "assert config.PRIV_KEY == 'base58_priv_str_here'\n"
+        "assert not set(config.LAZY_ATTRIBUTES) & set(vars(config))\n"
+        "try:\n"
+        "    config.payer_keypair\n"
+        "except ValueError:\n"
+        "    print('ok')\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=LIBRARY, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "ok"
+
+def test_first_access_builds_once(fake, fresh_config):
+    key = Keypair()
+    config.PRIV_KEY = str(key)
+    config.RPC_ENDPOINTS = [fake.url]
+
+    client = config.client
+    assert config.client is client
+    assert config.payer_keypair.pubkey() == key.pubkey()
+    assert config.payer_keypair is config.payer_keypair
+    assert fresh_config == ["client", "payer_keypair"]
+    assert client.get_slot().value >= 0
+    with pytest.raises(AttributeError):
+        config.missing
+
+def test_init_overrides(fake, fresh_config):
+    old_client = config.client
+    key = Keypair()
+    pda.clear_pda_cache()
+    config.init(str(key), [fake.url, fake.url], "ws://example")
+
+    assert fresh_config == ["client", "client", "async_client", "payer_keypair"]
+    assert config.client is not old_client
+    assert [endpoint.url for endpoint in config.client._provider.endpoints] == [fake.url, fake.url]
+    assert (config.RPC, config.WS_RPC) == (fake.url, "ws://example")
+    assert config.payer_keypair.pubkey() == key.pubkey()
+    # The payer's PDAs are derived up front.
+    assert pda.find_program_address.cache_info().currsize == 1
+    pda.get_user_volume_accumulator(key.pubkey())
+    assert pda.find_program_address.cache_info().hits == 1
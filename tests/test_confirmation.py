@@ -0,0 +1,136 @@
+import asyncio
+import time
+
+import pytest
+
+from solders.signature import Signature  # type: ignore
+
+import config
+from common_utils import confirm_txn, confirm_txn_async
+from confirmation import ConfirmationWatcher, confirmation_watcher
+from helpers import eventually, send_transaction
+
+FAR_FUTURE = 2**62
+
+def test_confirm_txn_confirms(fake):
+    signature, last_valid_block_height = send_transaction(fake, config.payer_keypair)
+    assert confirm_txn(signature, last_valid_block_height=last_valid_block_height)
+
+def test_confirm_txn_reports_failed_transaction(fake):
+    signature, last_valid_block_height = send_transaction(fake, config.payer_keypair, fail=True)
+    assert not confirm_txn(signature, last_valid_block_height=last_valid_block_height)
+
+def test_confirm_txn_gives_up_on_expired_blockhash(fake):
+    assert not confirm_txn(Signature.new_unique(), last_valid_block_height=fake.block_height - 1)
+    assert fake.calls["getSignatureStatuses"] == 1
+
+def test_confirm_txn_gives_up_without_last_valid_block_height(fake):
+    assert not confirm_txn(Signature.new_unique(), max_retries=3, retry_interval=0.01)
+    assert fake.calls["getSignatureStatuses"] == 2
+
+def test_confirm_txn_gives_up_when_rpc_is_unreachable(fake):
+    fake.stop()
+    start = time.monotonic()
+    assert not confirm_txn(Signature.new_unique(), retry_interval=0.01, last_valid_block_height=FAR_FUTURE, max_errors=3)
+    assert time.monotonic() - start < 5
+
+def test_confirm_txn_times_out(fake):
+    start = time.monotonic()
+    assert not confirm_txn(Signature.new_unique(), retry_interval=0.05, last_valid_block_height=FAR_FUTURE, timeout=0.3)
+    assert 0.3 <= time.monotonic() - start < 2
+
+def test_confirm_txn_async_times_out(fake, monkeypatch):
+    monkeypatch.setattr(confirmation_watcher, "websocket", False)
+
+    async def run():
+        try:
+            start = time.monotonic()
+            assert not await confirm_txn_async(Signature.new_unique(), FAR_FUTURE, timeout=0.2)
+            assert time.monotonic() - start < 2
+        finally:
+            await confirmation_watcher.stop()
+
+    asyncio.run(run())
+
+def test_watcher_confirms_over_websocket(fake):
+    async def run():
+        # Polling is slowed down so only the subscription can resolve it in time.
+        watcher = ConfirmationWatcher(ws_url=fake.ws_url, min_poll_interval=30, max_poll_interval=30)
+        try:
+            watcher.start()
+            await asyncio.sleep(0.1)
+            signature, last_valid_block_height = send_transaction(fake, config.payer_keypair)
+            assert await watcher.wait(signature, last_valid_block_height, timeout=5)
+            assert fake.calls["signatureSubscribe"] == 1
+            assert len(watcher) == 0
+        finally:
+            await watcher.stop()
+
+    asyncio.run(run())
+
+def test_watcher_polls_failures_and_expiry(fake):
+    async def run():
+        watcher = ConfirmationWatcher(websocket=False, min_poll_interval=0.02, max_poll_interval=0.05)
+        try:
+            failed = send_transaction(fake, config.payer_keypair, fail=True)
+            landed = send_transaction(fake, config.payer_keypair)
+            results = await asyncio.gather(
+                watcher.wait(*failed, timeout=5),
+                watcher.wait(*landed, timeout=5),
+                watcher.wait(Signature.new_unique(), fake.block_height + 2, timeout=5),
+            )
+            assert results == [False, True, False]
+        finally:
+            await watcher.stop()
+
+    asyncio.run(run())
+
+def test_watcher_batches_status_requests(fake):
+    async def run():
+        watcher = ConfirmationWatcher(websocket=False, min_poll_interval=0.02, max_poll_interval=0.05)
+        try:
+            transactions = [send_transaction(fake, config.payer_keypair) for _ in range(300)]
+            fake.reset_calls()
+            callbacks = []
+            futures = [watcher.watch(signature, height, lambda s, ok: callbacks.append(ok)) for signature, height in transactions]
+            assert all(await asyncio.wait_for(asyncio.gather(*futures), 5))
+            await asyncio.sleep(0)
+            assert callbacks == [True] * 300
+            # 256 signatures per request, instead of one request per signature.
+            assert fake.calls["getSignatureStatuses"] <= 2 * 3
+        finally:
+            await watcher.stop()
+
+    asyncio.run(run())
+
+def test_watcher_reads_the_endpoint_at_start(fake, monkeypatch):
+    async def run():
+        watcher = ConfirmationWatcher(min_poll_interval=30, max_poll_interval=30)
+        monkeypatch.setattr(config, "WS_RPC", "ws_url_here")
+        with pytest.raises(ValueError):
+            watcher.start()
+        monkeypatch.setattr(config, "WS_RPC", fake.ws_url)
+        try:
+            signature, last_valid_block_height = send_transaction(fake, config.payer_keypair)
+            assert await watcher.wait(signature, last_valid_block_height, timeout=5)
+            assert fake.calls["signatureSubscribe"] == 1
+        finally:
+            await watcher.stop()
+
+    asyncio.run(run())
+
+def test_watcher_keeps_subscribe_tasks(fake):
+    async def run():
+        watcher = ConfirmationWatcher(ws_url=fake.ws_url, min_poll_interval=30, max_poll_interval=30)
+        try:
+            watcher.start()
+            await eventually(lambda: watcher._ws is not None)
+            transactions = [send_transaction(fake, config.payer_keypair) for _ in range(3)]
+            futures = [watcher.watch(signature, height) for signature, height in transactions]
+            assert len(watcher._subscribing) == 3
+            assert all(await asyncio.wait_for(asyncio.gather(*futures), 5))
+            assert not watcher._subscribing
+        finally:
+            await watcher.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+from solders.hash import Hash  # type: ignore
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+from solders.keypair import Keypair  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+import config
+from config import MAX_UNIT_PRICE, UNIT_BUDGET, UNIT_PRICE
+from constants import SIGNATURE_FEE
+from fake_rpc import FakeRpc
+from fee_engine import FeeEngine, fee_engine, get_recent_prioritization_fees, get_recent_prioritization_fees_async
+from rpc_pool import pooled_async_client, pooled_client
+from trader import Trader
+
+SLOW = {"getRecentPrioritizationFees": 2.0}
+
+def instructions() -> list[Instruction]:
+    return [Instruction(Pubkey.new_unique(), b"", [AccountMeta(Pubkey.new_unique(), False, True)])]
+
+def fake_blockhash(fake) -> Hash:
+    return Hash.from_string(fake.blockhash()[0])
+
+def test_fees_are_hedged_to_another_endpoint():
+    with FakeRpc(latency=SLOW, prioritization_fees=[1]) as slow, FakeRpc(prioritization_fees=[7]) as fast:
+        client = pooled_client([slow.url, fast.url], hedge_delay=0.05)
+        start = time.monotonic()
+        assert get_recent_prioritization_fees(client, [Pubkey.new_unique()]) == [7]
+        assert time.monotonic() - start < 1
+        assert client._provider.hedges == 1
+
+def test_fees_are_hedged_to_another_endpoint_async():
+    async def run():
+        with FakeRpc(latency=SLOW, prioritization_fees=[1]) as slow, FakeRpc(prioritization_fees=[7]) as fast:
+            client = pooled_async_client([slow.url, fast.url], hedge_delay=0.05)
+            start = time.monotonic()
+            assert await get_recent_prioritization_fees_async(client, [Pubkey.new_unique()]) == [7]
+            assert time.monotonic() - start < 1
+            await client.close()
+
+    asyncio.run(run())
+
+def test_fees_fail_over_from_a_dead_endpoint():
+    with FakeRpc(prioritization_fees=[1]) as dead, FakeRpc(prioritization_fees=[7]) as live:
+        dead.stop()
+        client = pooled_client([dead.url, live.url], hedge_delay=5)
+        assert get_recent_prioritization_fees(client, [Pubkey.new_unique()]) == [7]
+
+def test_unit_price_percentile_cap_and_cache(fake):
+    fake.prioritization_fees = [0, 1_000, 5_000, 10_000, 50_000, 100_000]
+    engine = FeeEngine(enabled=True, percentile=50, max_unit_price=1_000_000)
+    ixs = instructions()
+    assert engine.compute_unit_price(ixs) == 10_000
+    assert engine.compute_unit_price(ixs) == 10_000
+    assert fake.calls["getRecentPrioritizationFees"] == 1
+    assert FeeEngine(enabled=True, percentile=90, max_unit_price=20_000).compute_unit_price(ixs) == 20_000
+
+def test_unit_price_falls_back_without_fees(fake):
+    fake.prioritization_fees = []
+    assert FeeEngine(enabled=True).compute_unit_price(instructions()) == UNIT_PRICE
+    fake.stop()
+    assert FeeEngine(enabled=True).compute_unit_price(instructions()) == UNIT_PRICE
+
+def test_unit_limit_from_simulation(fake):
+    engine = FeeEngine(enabled=True, margin=0.1)
+    ixs = instructions()
+    payer = config.payer_keypair.pubkey()
+    # The fake charges 3,000 units per instruction, compute budget included.
+    assert engine.compute_unit_limit(payer, ixs, [], fake_blockhash(fake)) == int(9_000 * 1.1) + 300
+    engine.compute_unit_limit(payer, ixs, [], fake_blockhash(fake))
+    assert fake.calls["simulateTransaction"] == 1
+
+def test_trader_reserves_the_capped_fee(fake, monkeypatch):
+    trader = Trader(Keypair())
+    assert trader.fee_lamports == SIGNATURE_FEE + UNIT_BUDGET * UNIT_PRICE // 1_000_000
+
+    monkeypatch.setattr(fee_engine, "enabled", True)
+    fake.prioritization_fees = [10**12]
+    price = fee_engine.compute_unit_price(instructions())
+    assert price == MAX_UNIT_PRICE
+    assert trader.fee_lamports == SIGNATURE_FEE + UNIT_BUDGET * price // 1_000_000
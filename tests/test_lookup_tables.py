@@ -0,0 +1,105 @@
+import pytest
+
+from solders.address_lookup_table_account import ID as ADDRESS_LOOKUP_TABLE_PROGRAM, derive_lookup_table_address  # type: ignore
+from solders.hash import Hash  # type: ignore
+from solders.message import MessageV0  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from batch_swap import PACKET_DATA_SIZE, SwapIntent, build_swap_transactions, transaction_size
+from constants import SYSTEM_PROGRAM
+from lookup_tables import (
+    CREATE_LOOKUP_TABLE,
+    EXTEND_LOOKUP_TABLE,
+    MAX_ADDRESSES_PER_EXTEND,
+    LookupTableCache,
+    create_lookup_table,
+    create_lookup_table_instruction,
+    extend_lookup_table_instructions,
+    lookup_tables,
+    pool_lookup_addresses,
+)
+
+def test_create_instruction_layout():
+    authority, payer = Pubkey.new_unique(), Pubkey.new_unique()
+    table, instruction = create_lookup_table_instruction(authority, payer, 1234)
+    expected, bump = derive_lookup_table_address(authority, 1234)
+    assert table == expected
+    assert instruction.program_id == ADDRESS_LOOKUP_TABLE_PROGRAM
+    assert CREATE_LOOKUP_TABLE.unpack(bytes(instruction.data)) == (0, 1234, bump)
+    assert [(meta.pubkey, meta.is_signer, meta.is_writable) for meta in instruction.accounts] == [
+        (table, False, True),
+        (authority, True, False),
+        (payer, True, True),
+        (SYSTEM_PROGRAM, False, False),
+    ]
+
+def test_extend_instructions_are_chunked():
+    table, authority = Pubkey.new_unique(), Pubkey.new_unique()
+    addresses = [Pubkey.new_unique() for _ in range(2 * MAX_ADDRESSES_PER_EXTEND + 4)]
+    instructions = extend_lookup_table_instructions(table, authority, authority, addresses)
+    assert len(instructions) == 3
+
+    extended = []
+    for instruction in instructions:
+        data = bytes(instruction.data)
+        discriminator, count = EXTEND_LOOKUP_TABLE.unpack_from(data)
+        assert discriminator == 2
+        body = data[EXTEND_LOOKUP_TABLE.size:]
+        assert len(body) == 32 * count
+        extended += [Pubkey.from_bytes(body[i:i + 32]) for i in range(0, len(body), 32)]
+        assert instruction.accounts[0].pubkey == table
+    assert [len(bytes(ix.data)) for ix in instructions] == [EXTEND_LOOKUP_TABLE.size + 32 * n for n in (28, 28, 4)]
+    assert extended == addresses
+
+    with pytest.raises(ValueError):
+        extend_lookup_table_instructions(table, authority, authority, [Pubkey.new_unique() for _ in range(257)])
+
+def test_create_and_first_extend_fit_one_transaction():
+    authority = Pubkey.new_unique()
+    table, create_instruction = create_lookup_table_instruction(authority, authority, 2**63)
+    extend = extend_lookup_table_instructions(table, authority, authority, [Pubkey.new_unique() for _ in range(MAX_ADDRESSES_PER_EXTEND)])
+    message = MessageV0.try_compile(authority, [create_instruction, extend[0]], [], Hash.default())
+    assert transaction_size(message) <= PACKET_DATA_SIZE
+
+def test_create_lookup_table_sends_create_then_extends(fake):
+    addresses = [Pubkey.new_unique() for _ in range(MAX_ADDRESSES_PER_EXTEND + 1)]
+    table = create_lookup_table(addresses)
+    assert table is not None
+    # The create with the first extend, then the remaining extend.
+    assert fake.calls["sendTransaction"] == 2
+
+def test_cache_fetches_each_table_once(fake):
+    static = fake.add_lookup_table([Pubkey.new_unique()])
+    pool_keys = fake.add_pool()
+    pool_table = fake.add_lookup_table(pool_lookup_addresses(pool_keys))
+    cache = LookupTableCache(static_table=static)
+    cache.register_pool_table(pool_keys.amm, pool_table)
+
+    tables = cache.tables_for(pool_keys, pool_keys)
+    assert [table.key for table in tables] == [static, pool_table]
+    assert tables[1].addresses == pool_lookup_addresses(pool_keys)
+    cache.tables_for(pool_keys)
+    assert fake.calls["getAccountInfo"] == 2
+
+    cache.invalidate(pool_table)
+    cache.tables_for(pool_keys)
+    assert fake.calls["getAccountInfo"] == 3
+
+def test_missing_table_is_skipped(fake, capsys):
+    cache = LookupTableCache(static_table=Pubkey.new_unique())
+    assert cache.tables_for() == []
+    assert "not found" in capsys.readouterr().out
+
+def test_swap_compiles_against_tables(fake, monkeypatch):
+    pool_keys = fake.add_pool()
+    monkeypatch.setattr(lookup_tables, "_pool_tables", {})
+    intent = SwapIntent(str(pool_keys.amm), "buy", 0.01)
+    [without] = build_swap_transactions([intent])
+
+    lookup_tables.register_pool_table(pool_keys.amm, fake.add_lookup_table(pool_lookup_addresses(pool_keys)))
+    [txn] = build_swap_transactions([intent])
+    assert len(txn.message.address_table_lookups) == 1
+    assert len(bytes(txn)) < len(bytes(without)) - 5 * 30
+    # The fake resolves the looked up accounts, so the swap executes.
+    fake.send_transaction(txn)
+    assert len(fake.landed) == 1
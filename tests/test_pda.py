@@ -0,0 +1,37 @@
+from solders.pubkey import Pubkey  # type: ignore
+
+import pda
+from constants import ASSOCIATED_TOKEN_PROGRAM, PF_AMM, TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID
+from token_accounts import get_associated_token_address
+
+def test_wrappers_match_find_program_address():
+    pda.clear_pda_cache()
+    for _ in range(20):
+        key, mint = Pubkey.new_unique(), Pubkey.new_unique()
+        assert pda.get_creator_vault_authority(key) == Pubkey.find_program_address([b"creator_vault", bytes(key)], PF_AMM)[0]
+        assert pda.get_user_volume_accumulator(key) == Pubkey.find_program_address([b"user_volume_accumulator", bytes(key)], PF_AMM)[0]
+        for token_program in (TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID):
+            expected = Pubkey.find_program_address([bytes(key), bytes(token_program), bytes(mint)], ASSOCIATED_TOKEN_PROGRAM)[0]
+            assert get_associated_token_address(key, mint, token_program) == expected
+    # The bump is kept too.
+    assert pda.find_program_address((b"creator_vault", bytes(key))) == Pubkey.find_program_address([b"creator_vault", bytes(key)], PF_AMM)
+
+def test_batch_derivation_matches_one_by_one():
+    creators = [Pubkey.new_unique() for _ in range(40)]
+    expected = {creator: Pubkey.find_program_address([b"creator_vault", bytes(creator)], PF_AMM)[0] for creator in creators}
+    for max_workers, chunk_size in ((None, 256), (4, 8)):
+        pda.clear_pda_cache()
+        # Duplicates are derived once.
+        assert pda.derive_creator_vault_authorities(creators + creators[:5], max_workers, chunk_size) == expected
+        assert pda.find_program_address.cache_info().currsize == len(creators)
+
+def test_clear_pda_cache():
+    pda.clear_pda_cache()
+    creator = Pubkey.new_unique()
+    pda.get_creator_vault_authority(creator)
+    pda.get_creator_vault_authority(creator)
+    assert pda.find_program_address.cache_info().hits == 1
+    pda.clear_pda_cache()
+    assert pda.find_program_address.cache_info().currsize == 0
+    pda.get_creator_vault_authority(creator)
+    assert pda.find_program_address.cache_info().misses == 1
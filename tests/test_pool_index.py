@@ -0,0 +1,38 @@
+import asyncio
+
+from helpers import eventually
+from pool_index import PoolIndex
+
+def test_load_and_best_pair(fake):
+    small = fake.add_pool(base_reserve=10**15, quote_reserve=10**10)
+    large = fake.add_pool(base_reserve=10**15, quote_reserve=10**11, base_mint=small.base_mint)
+    index = PoolIndex()
+    assert index.load_from_rpc() == 2
+    assert index.get(large.amm).quote_reserve == 10**11
+    assert index.best_pair(small.base_mint) == str(large.amm)
+
+def test_snapshot_round_trip(fake, tmp_path):
+    pool_keys = fake.add_pool()
+    index = PoolIndex()
+    index.load_from_rpc()
+    index.save(str(tmp_path / "pools.bin"))
+    loaded = PoolIndex.load(str(tmp_path / "pools.bin"))
+    assert loaded.get(pool_keys.amm).liquidity == index.get(pool_keys.amm).liquidity
+    assert loaded.get(pool_keys.amm).to_pool_keys() == pool_keys
+
+def test_stream_funds_new_pools(fake):
+    index = PoolIndex()
+
+    async def run():
+        task = asyncio.create_task(index.stream(fake.ws_url))
+        try:
+            await eventually(lambda: any(kind == "program" for kind, *_ in list(fake._ws_subscriptions.values())))
+            pool_keys = fake.add_pool(base_reserve=10**15, quote_reserve=10**11)
+            # Picked for its mint without any manual refresh_liquidity().
+            await eventually(lambda: index.best_pair(pool_keys.base_mint) == str(pool_keys.amm))
+            assert index.get(pool_keys.amm).base_reserve == 10**15
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
@@ -0,0 +1,179 @@
+import json
+import os
+import struct
+import time
+
+import pytest
+
+from solders.pubkey import Pubkey  # type: ignore
+
+import pool_utils
+from constants import POOL_DISCRIMINATOR, TOKEN_PROGRAM_ID
+from pool_utils import (
+    POOL_STRUCT,
+    LRUCache,
+    MintInfo,
+    PoolAccount,
+    PoolKeys,
+    clear_pool_cache,
+    creator_vault_cache,
+    decode_pool,
+    decode_pools,
+    fetch_pool_keys,
+    load_pool_cache,
+    mint_info_cache,
+    parse_pool_keys,
+    pool_keys_cache,
+    save_pool_cache,
+)
+
+# Pool accounts are larger than the fields decode_pool reads.
+POOL_ACCOUNT_SIZE = 301
+
+@pytest.fixture
+def caches():
+    clear_pool_cache()
+    yield
+    clear_pool_cache()
+
+def new_pool_keys() -> PoolKeys:
+    return PoolKeys(*(Pubkey.new_unique() for _ in range(6)))
+
+def fill_caches() -> tuple:
+    pool_keys = new_pool_keys()
+    mint_info = MintInfo(TOKEN_PROGRAM_ID, 6)
+    vault = (Pubkey.new_unique(), Pubkey.new_unique())
+    pool_keys_cache.set(str(pool_keys.amm), pool_keys)
+    mint_info_cache.set(str(pool_keys.base_mint), mint_info)
+    creator_vault_cache.set(str(pool_keys.creator), vault)
+    return pool_keys, mint_info, vault
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(maxsize=3)
+    for key in "abc":
+        cache.set(key, key.upper())
+    assert cache.get("a") == "A"  # now the most recent
+    cache.set("d", "D")
+    assert cache.get("b") is None
+    assert [key for key in "acd" if key in cache] == ["a", "c", "d"]
+    cache.set("c", "C2")  # overwriting refreshes too
+    cache.set("e", "E")
+    assert "a" not in cache
+    assert cache.get("c") == "C2"
+    assert len(cache) == 3
+
+def test_lru_expires_entries():
+    cache = LRUCache(ttl=60)
+    cache.set("fresh", 1)
+    cache.set("stale", 2, stored_at=time.time() - 61)
+    assert cache.get("fresh") == 1
+    assert cache.get("stale") is None
+    assert len(cache) == 1
+    assert LRUCache().get("missing") is None
+
+def test_snapshot_round_trip(caches, tmp_path):
+    path = str(tmp_path / "pool_cache.json")
+    pool_keys, mint_info, vault = fill_caches()
+    assert save_pool_cache(path)
+    assert not (tmp_path / "pool_cache.json.tmp").exists()
+
+    clear_pool_cache()
+    assert load_pool_cache(path)
+    assert pool_keys_cache.get(str(pool_keys.amm)) == pool_keys
+    assert mint_info_cache.get(str(pool_keys.base_mint)) == mint_info
+    assert creator_vault_cache.get(str(pool_keys.creator)) == vault
+
+def test_snapshot_skips_stale_entries(caches, tmp_path, monkeypatch):
+    path = str(tmp_path / "pool_cache.json")
+    stale, _, _ = fill_caches()
+    assert save_pool_cache(path)
+    snapshot = json.loads((tmp_path / "pool_cache.json").read_text())
+    snapshot["pool_keys"][str(stale.amm)][1] -= 3600
+    fresh = new_pool_keys()
+    snapshot["pool_keys"][str(fresh.amm)] = [pool_utils._encode_pool_keys(fresh), time.time()]
+    (tmp_path / "pool_cache.json").write_text(json.dumps(snapshot))
+
+    clear_pool_cache()
+    monkeypatch.setattr(pool_keys_cache, "ttl", 60)
+    assert load_pool_cache(path)
+    assert pool_keys_cache.get(str(stale.amm)) is None
+    assert pool_keys_cache.get(str(fresh.amm)) == fresh
+
+def test_corrupt_snapshot_is_ignored(caches, tmp_path, capsys):
+    path = tmp_path / "pool_cache.json"
+    path.write_text('{"pool_keys": {"x": [')
+    assert not load_pool_cache(str(path))
+    assert "Error loading pool cache" in capsys.readouterr().out
+    assert len(pool_keys_cache) == 0
+
+    path.write_text(json.dumps({"pool_keys": {"x": [{"amm": "not a pubkey"}, time.time()]}}))
+    assert not load_pool_cache(str(path))
+    assert len(pool_keys_cache) == 0
+
+def test_missing_snapshot(caches, tmp_path):
+    assert not load_pool_cache(str(tmp_path / "missing.json"))
+    assert not load_pool_cache(None)
+    assert not save_pool_cache(None)
+
+def test_pool_keys_are_fetched_once(fake):
+    pool_keys = fake.add_pool()
+    assert fetch_pool_keys(str(pool_keys.amm)) == pool_keys
+    assert fetch_pool_keys(str(pool_keys.amm)) == pool_keys
+    assert fake.calls["getAccountInfo"] == 1
+
+def pool_data(size: int = POOL_ACCOUNT_SIZE) -> bytes:
+    return POOL_DISCRIMINATOR + os.urandom(size - len(POOL_DISCRIMINATOR))
+
+def fields(pool) -> dict:
+    return {name: getattr(pool, name) for name in PoolAccount.__slots__}
+
+def test_decode_pool_matches_construct_layout():
+    construct = pytest.importorskip("construct")
+    # The construct layout decode_pool replaced.
+    layout = construct.Struct(
+        construct.Padding(8),
+        "pool_bump" / construct.Int8ul,
+        "index" / construct.Int16ul,
+        "creator" / construct.Bytes(32),
+        "base_mint" / construct.Bytes(32),
+        "quote_mint" / construct.Bytes(32),
+        "lp_mint" / construct.Bytes(32),
+        "pool_base_token_account" / construct.Bytes(32),
+        "pool_quote_token_account" / construct.Bytes(32),
+        "lp_supply" / construct.Int64ul,
+        "coin_creator" / construct.Bytes(32),
+    )
+    assert layout.sizeof() == POOL_STRUCT.size
+    for _ in range(50):
+        data = pool_data()
+        parsed = layout.parse(data)
+        assert fields(decode_pool(data)) == {name: parsed[name] for name in PoolAccount.__slots__}
+
+def test_decode_pools_accepts_lists_buffers_and_arrays():
+    np = pytest.importorskip("numpy")
+    accounts = [pool_data() for _ in range(10)]
+    expected = [fields(decode_pool(data)) for data in accounts]
+    buffer = b"".join(accounts)
+
+    assert [fields(pool) for pool in decode_pools(accounts)] == expected
+    assert [fields(pool) for pool in decode_pools(tuple(accounts))] == expected
+    assert [fields(pool) for pool in decode_pools(buffer, POOL_ACCOUNT_SIZE)] == expected
+    assert [fields(pool) for pool in decode_pools(bytearray(buffer), POOL_ACCOUNT_SIZE)] == expected
+    array = np.frombuffer(buffer, dtype=np.uint8).reshape(len(accounts), POOL_ACCOUNT_SIZE)
+    assert [fields(pool) for pool in decode_pools(array)] == expected
+    # Accounts exactly the size of the struct need no stride.
+    exact = [data[:POOL_STRUCT.size] for data in accounts]
+    assert [fields(pool) for pool in decode_pools(b"".join(exact))] == expected
+    assert decode_pools([]) == [] and decode_pools(b"") == []
+
+def test_truncated_pools_raise():
+    data = pool_data()
+    with pytest.raises(struct.error):
+        decode_pool(data[:POOL_STRUCT.size - 1])
+    with pytest.raises(struct.error):
+        decode_pools([data, data[:100]])
+    with pytest.raises(struct.error):
+        decode_pools(data + data[:-1], POOL_ACCOUNT_SIZE)
+    with pytest.raises(struct.error):
+        decode_pools(data[:POOL_STRUCT.size] + data[:100])
+    assert parse_pool_keys(Pubkey.new_unique(), data).base_mint == Pubkey.from_bytes(decode_pool(data).base_mint)
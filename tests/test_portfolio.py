@@ -0,0 +1,38 @@
+import asyncio
+
+from solders.signature import Signature  # type: ignore
+
+import config
+import pump_swap
+from helpers import eventually
+from portfolio import Portfolio
+
+def bought(fake):
+    # A loaded portfolio and the signature of a buy it hasn't seen.
+    pool_keys = fake.add_pool()
+    mint = pool_keys.base_mint
+    token_account = fake.set_token_balance(config.payer_keypair.pubkey(), mint, 100)
+    portfolio = Portfolio()
+    assert portfolio.load()
+    assert pump_swap.buy(str(pool_keys.amm), 0.01)
+    return portfolio, mint, token_account, Signature.from_string(fake.landed[-1][0])
+
+def test_apply_transaction_reads_post_balances(fake):
+    portfolio, mint, token_account, signature = bought(fake)
+    # The default commitment is processed, which getTransaction rejects.
+    assert portfolio.apply_transaction(signature)
+    assert portfolio.balances[mint] == fake.token_balance(token_account) > 100
+
+def test_unknown_balance_is_applied_in_the_background(fake):
+    portfolio, mint, token_account, signature = bought(fake)
+
+    async def run():
+        portfolio.invalidate(mint)
+        portfolio.record_trade(mint, token_account, True, 5, signature=signature)
+        assert mint not in portfolio.balances
+        # Held until done, so it can't be collected mid-flight.
+        assert len(portfolio._tasks) == 1
+        await eventually(lambda: portfolio.balances.get(mint) == fake.token_balance(token_account))
+        await eventually(lambda: not portfolio._tasks)
+
+    asyncio.run(run())
@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from solders.system_program import ID as SYSTEM_PROGRAM_ID  # type: ignore
+
+import config
+import pump_swap_async
+import wsol
+from confirmation import confirmation_watcher
+from constants import ASSOCIATED_TOKEN_PROGRAM, BUY_DISCRIMINATOR, PF_AMM, SELL_DISCRIMINATOR, TOKEN_PROGRAM_ID
+from pool_utils import sol_for_tokens, tokens_for_sol
+from swap_template import SWAP_DATA
+from token_accounts import get_associated_token_address
+from wsol import WsolAccount
+
+COMPUTE_BUDGET_PROGRAM = "ComputeBudget111111111111111111111111111111"
+
+@pytest.fixture
+def sent(fake, monkeypatch):
+    # Every transaction the fake receives, in order.
+    transactions = []
+    send_transaction = fake.send_transaction
+
+    def record(txn, preflight=True):
+        transactions.append(txn)
+        return send_transaction(txn, preflight)
+
+    monkeypatch.setattr(fake, "send_transaction", record)
+    monkeypatch.setattr(config, "PERSISTENT_WSOL", False)
+    monkeypatch.setattr(wsol, "wsol_account", WsolAccount(), raising=False)
+    return transactions
+
+def run_trades(*coroutine_functions) -> list[bool]:
+    # One loop for all of them: the async client is bound to the first one.
+    async def run():
+        try:
+            return [await coroutine_function() for coroutine_function in coroutine_functions]
+        finally:
+            await confirmation_watcher.stop()
+
+    return asyncio.run(run())
+
+def programs(message) -> list:
+    keys = message.account_keys
+    return [str(keys[instruction.program_id_index]) for instruction in message.instructions]
+
+def swap_data(message) -> tuple:
+    keys = message.account_keys
+    [data] = [bytes(instruction.data) for instruction in message.instructions if keys[instruction.program_id_index] == PF_AMM]
+    return SWAP_DATA.unpack(data)
+
+def reserves(fake, pool_keys) -> tuple[int, int]:
+    return fake.token_balance(pool_keys.pool_base_token_account), fake.token_balance(pool_keys.pool_quote_token_account)
+
+def test_buy_then_sell(fake, sent):
+    pool_keys = fake.add_pool()
+    payer = config.payer_keypair.pubkey()
+    token_account = get_associated_token_address(payer, pool_keys.base_mint)
+
+    before = {}
+
+    async def buy():
+        before["buy"] = reserves(fake, pool_keys)
+        return await pump_swap_async.buy(str(pool_keys.amm), 0.01, slippage=5)
+
+    async def sell():
+        before["sell"] = reserves(fake, pool_keys)
+        return await pump_swap_async.sell(str(pool_keys.amm), 100, slippage=5)
+
+    assert run_trades(buy, sell) == [True, True]
+    [buy_txn, sell_txn] = sent
+    assert buy_txn.message.account_keys[0] == payer
+    # Budget, then a seeded WSOL account created, initialized and closed
+    # around the swap, with the token account created on the way.
+    assert programs(buy_txn.message) == [
+        COMPUTE_BUDGET_PROGRAM,
+        COMPUTE_BUDGET_PROGRAM,
+        str(SYSTEM_PROGRAM_ID),
+        str(TOKEN_PROGRAM_ID),
+        str(ASSOCIATED_TOKEN_PROGRAM),
+        str(PF_AMM),
+        str(TOKEN_PROGRAM_ID),
+    ]
+    base_amount_out = sol_for_tokens(10**7, *before["buy"])
+    assert swap_data(buy_txn.message) == (BUY_DISCRIMINATOR, base_amount_out, int(0.01 * 1.05 * 1e9))
+
+    # The sold-out token account is closed after the WSOL account.
+    assert programs(sell_txn.message) == [
+        COMPUTE_BUDGET_PROGRAM,
+        COMPUTE_BUDGET_PROGRAM,
+        str(SYSTEM_PROGRAM_ID),
+        str(TOKEN_PROGRAM_ID),
+        str(PF_AMM),
+        str(TOKEN_PROGRAM_ID),
+        str(TOKEN_PROGRAM_ID),
+    ]
+    min_quote_amount_out = int(tokens_for_sol(base_amount_out, *before["sell"]) * 0.95)
+    assert swap_data(sell_txn.message) == (SELL_DISCRIMINATOR, base_amount_out, min_quote_amount_out)
+    assert token_account not in fake.accounts
+
+def test_failed_prefetch_aborts_the_trade(fake, sent, monkeypatch, capsys):
+    pool_keys = fake.add_pool()
+
+    async def unreachable(*args, **kwargs):
+        raise ConnectionError("mint lookup failed")
+
+    monkeypatch.setattr(pump_swap_async, "get_mint_info_async", unreachable)
+    assert run_trades(lambda: pump_swap_async.buy(str(pool_keys.amm), 0.01)) == [False]
+    assert "mint lookup failed" in capsys.readouterr().out
+    assert sent == []
+    assert fake.calls["sendTransaction"] == 0
+
+def test_sell_without_tokens_sends_nothing(fake, sent):
+    pool_keys = fake.add_pool()
+    assert run_trades(lambda: pump_swap_async.sell(str(pool_keys.amm), 100)) == [False]
+    assert sent == []
@@ -0,0 +1,118 @@
+import asyncio
+
+from solders.pubkey import Pubkey  # type: ignore
+
+from fake_rpc import token_account_data
+from helpers import eventually
+from reserve_tracker import ReserveTracker
+
+def vault_subscriptions(fake, pool_keys) -> int:
+    vaults = {pool_keys.pool_base_token_account, pool_keys.pool_quote_token_account}
+    return sum(1 for kind, key, _, _ in list(fake._ws_subscriptions.values()) if kind == "account" and key in vaults)
+
+def test_seeds_and_streams_reserves(fake):
+    pool_keys = fake.add_pool(base_reserve=10**15, quote_reserve=10**11)
+
+    async def run():
+        tracker = ReserveTracker(ws_url=fake.ws_url)
+        tracker.track([pool_keys])
+        tracker.start()
+        try:
+            await eventually(lambda: tracker.get_reserves(pool_keys) == (10**15, 10**11))
+            await eventually(lambda: vault_subscriptions(fake, pool_keys) == 2)
+            fake.set_reserves(pool_keys, 9 * 10**14, 2 * 10**11)
+            await eventually(lambda: tracker.get_reserves(pool_keys) == (9 * 10**14, 2 * 10**11))
+            assert tracker.last_update(pool_keys) is not None
+        finally:
+            await tracker.stop()
+
+    asyncio.run(run())
+
+def test_refcounted_tracking(fake):
+    pool_keys = fake.add_pool()
+
+    async def run():
+        tracker = ReserveTracker(ws_url=fake.ws_url)
+        tracker.start()
+        try:
+            await asyncio.wait_for(tracker.connected.wait(), 5)
+            tracker.track([pool_keys])
+            tracker.track([pool_keys])
+            await eventually(lambda: None not in tracker.get_reserves(pool_keys))
+            await eventually(lambda: vault_subscriptions(fake, pool_keys) == 2)
+
+            # Still tracked for the second user.
+            tracker.untrack([pool_keys])
+            fake.set_reserves(pool_keys, 123, 456)
+            await eventually(lambda: tracker.get_reserves(pool_keys) == (123, 456))
+            assert vault_subscriptions(fake, pool_keys) == 2
+
+            tracker.untrack([pool_keys])
+            assert tracker.get_reserves(pool_keys) == (None, None)
+            await eventually(lambda: vault_subscriptions(fake, pool_keys) == 0)
+            fake.set_reserves(pool_keys, 789, 1011)
+            await asyncio.sleep(0.1)
+            assert tracker.get_reserves(pool_keys) == (None, None)
+        finally:
+            await tracker.stop()
+
+    asyncio.run(run())
+
+def test_reconnects_and_resubscribes(fake):
+    pool_keys = fake.add_pool(base_reserve=10**15, quote_reserve=10**11)
+
+    async def run():
+        tracker = ReserveTracker(ws_url=fake.ws_url, reconnect_delay=0.05)
+        tracker.track([pool_keys])
+        tracker.start()
+        try:
+            await eventually(lambda: vault_subscriptions(fake, pool_keys) == 2)
+            fake.disconnect_websockets()
+            await eventually(lambda: tracker.reconnects == 1)
+            # Changed while disconnected: picked up by the refresh after
+            # reconnecting, and streamed again afterwards.
+            fake.set_reserves(pool_keys, 5 * 10**14, 3 * 10**11)
+            await eventually(lambda: tracker.get_reserves(pool_keys) == (5 * 10**14, 3 * 10**11))
+            await eventually(lambda: vault_subscriptions(fake, pool_keys) == 2)
+            assert tracker.connected.is_set()
+            fake.set_reserves(pool_keys, 4 * 10**14, 4 * 10**11)
+            await eventually(lambda: tracker.get_reserves(pool_keys) == (4 * 10**14, 4 * 10**11))
+        finally:
+            await tracker.stop()
+
+    asyncio.run(run())
+
+def test_ignores_older_slots_and_untracked_accounts():
+    tracker = ReserveTracker(ws_url=None, client=object())
+    vault, other = Pubkey.new_unique(), Pubkey.new_unique()
+    tracker.track_accounts([vault])
+    tracker.apply_account_data(vault, token_account_data(Pubkey.new_unique(), Pubkey.new_unique(), 10), slot=5)
+    tracker.apply_account_data(vault, token_account_data(Pubkey.new_unique(), Pubkey.new_unique(), 20), slot=4)
+    tracker.apply_account_data(other, token_account_data(Pubkey.new_unique(), Pubkey.new_unique(), 30), slot=6)
+    assert tracker.get_amount(vault) == 10
+    assert tracker.get_amount(other) is None
+    # A closed account is reported with no data.
+    tracker.apply_account_data(vault, b"", slot=6)
+    assert tracker.get_amount(vault) == 0
+
+def test_background_tasks_are_kept_until_done(fake):
+    pools = [fake.add_pool() for _ in range(3)]
+
+    async def run():
+        tracker = ReserveTracker(ws_url=fake.ws_url)
+        tracker.start()
+        try:
+            await asyncio.wait_for(tracker.connected.wait(), 5)
+            tracker.track(pools)
+            # A subscribe per vault and one refresh.
+            assert len(tracker._tasks) == 7
+            await eventually(lambda: all(None not in tracker.get_reserves(pool_keys) for pool_keys in pools))
+            await eventually(lambda: not tracker._tasks and len(tracker._subscribed) == 6)
+            tracker.untrack(pools)
+            assert len(tracker._tasks) == 6
+        finally:
+            await tracker.stop()
+        await asyncio.sleep(0)
+        assert not tracker._tasks
+
+    asyncio.run(run())
@@ -0,0 +1,151 @@
+import itertools
+import random
+
+import pytest
+
+from solders.pubkey import Pubkey  # type: ignore
+
+import config
+from batch_swap import prepare_swap
+from constants import FEE_DENOMINATOR
+from pool_utils import PoolKeys, sol_for_tokens, tokens_for_sol
+from router import TOTAL_FEE_BPS, amount_out, execute_route, find_route, plan_route, route_intents, split_order
+from token_accounts import get_associated_token_address
+
+def random_reserves(rng: random.Random, count: int) -> list[tuple[int, int]]:
+    # Prices within a few percent of each other, so splitting pays off.
+    reserves = []
+    for _ in range(count):
+        base = rng.randrange(10**14, 10**15)
+        reserves.append((base, int(base * rng.uniform(0.95, 1.05) / 10**4)))
+    return reserves
+
+def total_out(side: str, amounts: list[int], reserves: list[tuple[int, int]]) -> int:
+    return sum(amount_out(side, amount, base, quote) for amount, (base, quote) in zip(amounts, reserves))
+
+def brute_force(side: str, amount_in: int, reserves: list[tuple[int, int]], steps: int) -> int:
+    # Best output over every split of amount_in in 1/steps increments.
+    best = 0
+    for cuts in itertools.product(range(steps + 1), repeat=len(reserves) - 1):
+        if sum(cuts) > steps:
+            continue
+        amounts = [amount_in * cut // steps for cut in cuts]
+        amounts.append(amount_in - sum(amounts))
+        best = max(best, total_out(side, amounts, reserves))
+    return best
+
+def pool_keys() -> PoolKeys:
+    return PoolKeys(*(Pubkey.new_unique() for _ in range(6)))
+
+@pytest.mark.parametrize("side", ["buy", "sell"])
+@pytest.mark.parametrize("count", [2, 3])
+def test_split_matches_brute_force(side, count):
+    rng = random.Random(count)
+    for _ in range(5):
+        reserves = random_reserves(rng, count)
+        amount_in = rng.choice([10**9, 10**10, 5 * 10**10]) if side == "buy" else rng.choice([10**12, 10**13, 5 * 10**13])
+        amounts = split_order(amount_in, reserves, side)
+        assert sum(amounts) == amount_in and min(amounts) >= 0
+        split = total_out(side, amounts, reserves)
+        brute = brute_force(side, amount_in, reserves, 200 if count == 2 else 60)
+        # Never worse than the grid, and close to it.
+        assert split >= brute
+        assert split <= brute * 1.001
+        # No single move of 0.1% between two pools improves on it.
+        step = amount_in // 1000
+        for i, j in itertools.permutations(range(count), 2):
+            if amounts[i] >= step:
+                moved = amounts[:]
+                moved[i] -= step
+                moved[j] += step
+                assert total_out(side, moved, reserves) <= split + count
+
+def test_single_pool_and_zero_amount():
+    reserves = [(10**15, 10**11)]
+    assert split_order(10**9, reserves, "buy") == [10**9]
+    assert split_order(10**12, reserves, "sell") == [10**12]
+    assert split_order(0, reserves + reserves, "buy") == [0, 0]
+    assert split_order(10**9, [(0, 10**11), (10**15, 10**11)], "buy") == [0, 10**9]
+    assert split_order(10**9, [], "buy") == []
+    with pytest.raises(ValueError):
+        split_order(10**9, reserves, "swap")
+
+    keys = pool_keys()
+    route = plan_route([(keys, *reserves[0])], 10**9)
+    assert [(leg.pool_keys, leg.amount_in) for leg in route.legs] == [(keys, 10**9)]
+    assert route.amount_out == route.single_pool_out and route.improvement == 0
+
+    empty = plan_route([(keys, *reserves[0]), (pool_keys(), *reserves[0])], 0)
+    assert empty.legs == [] and empty.amount_out == 0
+    assert route_intents(empty) == [] and execute_route(empty) == []
+    assert plan_route([(keys, None, None)], 10**9).legs == []
+
+@pytest.mark.parametrize("side", ["buy", "sell"])
+def test_legs_requote_to_the_plan(side):
+    rng = random.Random(21)
+    reserves = random_reserves(rng, 4)
+    pools = [(pool_keys(), base, quote) for base, quote in reserves]
+    amount_in = 5 * 10**10 if side == "buy" else 5 * 10**13
+    route = plan_route(pools, amount_in, side)
+    assert len(route.legs) > 1
+    assert sum(leg.amount_in for leg in route.legs) == amount_in
+    assert route.amount_out == sum(leg.amount_out for leg in route.legs) > route.single_pool_out
+
+    reserves_by_pool = {keys.amm: (base, quote) for keys, base, quote in pools}
+    for leg in route.legs:
+        base, quote = reserves_by_pool[leg.pool_keys.amm]
+        if side == "buy":
+            assert leg.amount_out == sol_for_tokens(leg.amount_in * FEE_DENOMINATOR // (FEE_DENOMINATOR + TOTAL_FEE_BPS), base, quote)
+        else:
+            assert leg.amount_out == tokens_for_sol(leg.amount_in, base, quote)
+
+def test_small_legs_are_dropped_and_merged():
+    # Three equal pools, and one priced 1.3% worse that only gets a sliver
+    # once the others' marginal price has caught up with it.
+    pools = [(pool_keys(), 10**15, 10**11) for _ in range(3)] + [(pool_keys(), 10**15, int(10**11 * 1.013))]
+    amount_in = 2 * 10**9
+
+    every_leg = plan_route(pools, amount_in, min_leg_fraction=0)
+    assert len(every_leg.legs) == 4
+    assert 0 < every_leg.legs[3].amount_in < amount_in * 0.01
+
+    route = plan_route(pools, amount_in)
+    assert [leg.pool_keys for leg in route.legs] == [keys for keys, _, _ in pools[:3]]
+    # The dropped amount is split again among the rest, not lost.
+    assert sum(leg.amount_in for leg in route.legs) == amount_in
+    assert [leg.amount_in for leg in route.legs] == split_order(amount_in, [(10**15, 10**11)] * 3)
+    assert max(leg.amount_in for leg in route.legs) - min(leg.amount_in for leg in route.legs) <= 2
+    assert route.amount_out <= every_leg.amount_out
+
+def test_route_intents_prepare_to_the_plan(fake):
+    mint = Pubkey.new_unique()
+    for base, quote in [(10**15, 100 * 10**9), (5 * 10**14, 51 * 10**9), (2 * 10**14, 21 * 10**9)]:
+        fake.add_pool(base_reserve=base, quote_reserve=quote, base_mint=mint)
+    route = find_route(str(mint), 20, "buy")
+    assert len(route.legs) == 3
+
+    intents = route_intents(route, slippage=0)
+    assert [intent.pair_address for intent in intents] == [str(leg.pool_keys.amm) for leg in route.legs]
+    for leg, intent in zip(route.legs, intents):
+        prepared = prepare_swap(intent)
+        assert prepared.amounts[0] == leg.amount_out
+        # What the pool takes, fees included, stays within the leg.
+        assert prepared.amounts[1] <= leg.amount_in
+
+    fake.set_token_balance(config.payer_keypair.pubkey(), mint, route.amount_out)
+    sell = find_route(str(mint), route.amount_out, "sell")
+    for leg, intent in zip(sell.legs, route_intents(sell, slippage=0)):
+        assert intent.base_amount == leg.amount_in
+        assert prepare_swap(intent).amounts == (leg.amount_in, leg.amount_out)
+
+def test_execute_route(fake):
+    mint = Pubkey.new_unique()
+    for base, quote in [(10**15, 100 * 10**9), (5 * 10**14, 51 * 10**9)]:
+        fake.add_pool(base_reserve=base, quote_reserve=quote, base_mint=mint)
+    route = find_route(str(mint), 10, "buy")
+    assert len(route.legs) == 2
+    signatures = execute_route(route, slippage=1)
+    assert signatures and None not in signatures
+    token_account = get_associated_token_address(config.payer_keypair.pubkey(), mint)
+    # The fake executes transactions as they are sent.
+    assert fake.token_balance(token_account) == route.amount_out
@@ -0,0 +1,95 @@
+import asyncio
+import time
+
+import httpx
+from solana.rpc.types import TxOpts
+
+from solders.keypair import Keypair  # type: ignore
+
+from fake_rpc import FakeRpc
+from helpers import transaction
+from rpc_pool import DEFAULT_HEDGE_DELAY, MIN_LATENCY_SAMPLES, Endpoint, pooled_async_client, pooled_client
+
+def test_hedge_delay_is_p95_once_sampled():
+    endpoint = Endpoint("http://localhost")
+    for i in range(1, MIN_LATENCY_SAMPLES):
+        endpoint.record(i / 1000)
+    assert endpoint.hedge_delay() == DEFAULT_HEDGE_DELAY
+    for i in range(MIN_LATENCY_SAMPLES, 101):
+        endpoint.record(i / 1000)
+    assert endpoint.hedge_delay() == 0.096
+
+def test_slow_read_is_hedged_at_p95():
+    with FakeRpc() as a, FakeRpc() as b:
+        client = pooled_client([a.url, b.url])
+        for _ in range(2 * MIN_LATENCY_SAMPLES):
+            client.get_slot()
+        provider = client._provider
+        hedges = provider.hedges
+        first = provider.ranked()[0]
+        # The endpoint it prefers stalls; the next one is asked after its
+        # p95 latency (milliseconds here), not the default delay.
+        (a if first.url == a.url else b).latency = 2.0
+        start = time.monotonic()
+        client.get_slot()
+        assert time.monotonic() - start < DEFAULT_HEDGE_DELAY
+        assert provider.hedges == hedges + 1
+
+def test_hedged_read_prefers_the_faster_endpoint():
+    with FakeRpc(latency=0.05) as slow, FakeRpc() as fast:
+        client = pooled_client([slow.url, fast.url], hedge_delay=0.01)
+        for _ in range(MIN_LATENCY_SAMPLES):
+            client.get_slot()
+        assert client._provider.ranked()[0].url == fast.url
+        fast.reset_calls()
+        slow.reset_calls()
+        for _ in range(10):
+            client.get_slot()
+        assert fast.calls["getSlot"] == 10
+        # Only hedged to when the fast one answers slower than its p95.
+        assert slow.calls["getSlot"] < 5
+
+def test_send_fans_out_to_every_endpoint():
+    payer = Keypair()
+    with FakeRpc(latency={"sendTransaction": 1.0}) as slow, FakeRpc() as fast:
+        client = pooled_client([slow.url, fast.url], hedge_delay=5)
+        txn = transaction(payer, fast.blockhash()[0])
+        start = time.monotonic()
+        # Only the fast endpoint knows the blockhash; the slow one's
+        # rejection doesn't mask its answer.
+        assert client.send_transaction(txn).value == txn.signatures[0]
+        assert time.monotonic() - start < 0.5
+        deadline = time.monotonic() + 5
+        while slow.calls["sendTransaction"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert fast.calls["sendTransaction"] == slow.calls["sendTransaction"] == 1
+
+def test_send_fans_out_to_every_endpoint_async():
+    payer = Keypair()
+
+    async def run():
+        with FakeRpc(latency={"sendTransaction": 0.3}) as slow, FakeRpc() as fast:
+            client = pooled_async_client([slow.url, fast.url])
+            txn = transaction(payer, fast.blockhash()[0])
+            start = time.monotonic()
+            assert (await client.send_transaction(txn, opts=TxOpts(skip_preflight=True))).value == txn.signatures[0]
+            assert time.monotonic() - start < 0.25
+            # The slower send keeps going in the background.
+            await asyncio.sleep(0.5)
+            assert slow.calls["sendTransaction"] == 1
+            await client.close()
+
+    asyncio.run(run())
+
+def test_async_client_creates_one_session(monkeypatch):
+    created = []
+
+    class CountingAsyncClient(httpx.AsyncClient):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(httpx, "AsyncClient", CountingAsyncClient)
+    client = pooled_async_client(["http://localhost:1", "http://localhost:2"])
+    assert created == [client._provider.session]
+    asyncio.run(client.close())
@@ -0,0 +1,90 @@
+import struct
+
+import pytest
+
+from solders.instruction import AccountMeta, Instruction  # type: ignore
+from solders.pubkey import Pubkey  # type: ignore
+
+from constants import *
+from pool_utils import PoolKeys
+from swap_template import SwapTemplate, get_swap_template, swap_template_cache
+
+@pytest.fixture
+def accounts():
+    swap_template_cache.clear()
+    yield {
+        "pool_keys": PoolKeys(*(Pubkey.new_unique() for _ in range(6))),
+        "payer": Pubkey.new_unique(),
+        "token_account": Pubkey.new_unique(),
+        "base_token_program": Pubkey.new_unique(),
+        "creator_vault_authority": Pubkey.new_unique(),
+        "creator_vault_ata": Pubkey.new_unique(),
+        "user_volume_accumulator": Pubkey.new_unique(),
+    }
+    swap_template_cache.clear()
+
+def rebuild(side, accounts, wsol_token_account, amount, limit) -> Instruction:
+    # The per-call construction buy() and sell() used before templates.
+    pool_keys = accounts["pool_keys"]
+    keys = [
+        AccountMeta(pubkey=pool_keys.amm, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=accounts["payer"], is_signer=True, is_writable=True),
+        AccountMeta(pubkey=GLOBAL_CONFIG, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=pool_keys.base_mint, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=pool_keys.quote_mint, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=accounts["token_account"], is_signer=False, is_writable=True),
+        AccountMeta(pubkey=wsol_token_account, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=pool_keys.pool_base_token_account, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=pool_keys.pool_quote_token_account, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=PROTOCOL_FEE_RECIPIENT_TOKEN_ACCOUNT, is_signer=False, is_writable=True),
+        AccountMeta(pubkey=accounts["base_token_program"], is_signer=False, is_writable=False),
+        AccountMeta(pubkey=TOKEN_PROGRAM_ID, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=SYSTEM_PROGRAM, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=ASSOCIATED_TOKEN_PROGRAM, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=EVENT_AUTH, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=PF_AMM, is_signer=False, is_writable=False),
+        AccountMeta(pubkey=accounts["creator_vault_ata"], is_signer=False, is_writable=True),
+        AccountMeta(pubkey=accounts["creator_vault_authority"], is_signer=False, is_writable=False),
+    ]
+    if side == "buy":
+        keys += [
+            AccountMeta(pubkey=GLOBAL_VOLUME_ACCUMULATOR, is_signer=False, is_writable=True),
+            AccountMeta(pubkey=accounts["user_volume_accumulator"], is_signer=False, is_writable=True),
+        ]
+    data = bytearray()
+    data.extend(bytes.fromhex("66063d1201daebea" if side == "buy" else "33e685a4017f83ad"))
+    data.extend(struct.pack('<Q', amount))
+    data.extend(struct.pack('<Q', limit))
+    return Instruction(PF_AMM, bytes(data), keys)
+
+def test_template_matches_rebuilt_instructions(accounts):
+    template = get_swap_template(**accounts)
+    for _ in range(3):
+        wsol_token_account = Pubkey.new_unique()
+        assert template.buy(1_000_000, 2_000_000, wsol_token_account) == rebuild("buy", accounts, wsol_token_account, 1_000_000, 2_000_000)
+        assert template.sell(3_000_000, 4_000_000, wsol_token_account) == rebuild("sell", accounts, wsol_token_account, 3_000_000, 4_000_000)
+    assert template.buy(2**64 - 1, 0, wsol_token_account) == rebuild("buy", accounts, wsol_token_account, 2**64 - 1, 0)
+    # Patching the WSOL account leaves the template itself untouched.
+    assert template.sell_keys[6] is None and template.buy_keys[6] is None
+
+def test_templates_are_cached_per_pool_payer_and_token_account(accounts):
+    template = get_swap_template(**accounts)
+    assert get_swap_template(**accounts) is template
+    assert len(swap_template_cache) == 1
+    # The other accounts follow from the key, so they don't take part in it.
+    assert get_swap_template(**{**accounts, "creator_vault_ata": Pubkey.new_unique()}) is template
+
+    others = [
+        {**accounts, "pool_keys": PoolKeys(*(Pubkey.new_unique() for _ in range(6)))},
+        {**accounts, "payer": Pubkey.new_unique()},
+        {**accounts, "token_account": Pubkey.new_unique()},
+    ]
+    templates = [get_swap_template(**other) for other in others]
+    assert len({id(other) for other in templates + [template]}) == 4
+    assert len(swap_template_cache) == 4
+    assert swap_template_cache.get((accounts["pool_keys"].amm, accounts["payer"], accounts["token_account"])) is template
+
+def test_uncached_template_matches(accounts):
+    wsol_token_account = Pubkey.new_unique()
+    assert SwapTemplate(**accounts).sell(5, 6, wsol_token_account) == rebuild("sell", accounts, wsol_token_account, 5, 6)
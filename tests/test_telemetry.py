@@ -0,0 +1,182 @@
+import asyncio
+import logging
+
+import pytest
+
+from telemetry import NOOP_SPAN, CallbackExporter, Histogram, LogExporter, Telemetry
+
+class Recorder:
+    def __init__(self):
+        self.started, self.ended = [], []
+
+    def on_start(self, span):
+        self.started.append(span)
+
+    def on_end(self, span):
+        self.ended.append(span)
+
+def test_spans_nest_through_the_context():
+    telemetry = Telemetry(enabled=True)
+    recorder = Recorder()
+    telemetry.add_exporter(recorder)
+
+    with telemetry.span("buy", pair="x") as buy:
+        with telemetry.span("pool_keys") as pool_keys:
+            pass
+        with telemetry.span("send") as send:
+            send.set("signature", "sig")
+    with telemetry.span("sell") as sell:
+        pass
+
+    assert [span.name for span in recorder.started] == ["buy", "pool_keys", "send", "sell"]
+    assert [span.name for span in recorder.ended] == ["pool_keys", "send", "buy", "sell"]
+    assert buy.parent_id is None and buy.trace_id == buy.span_id
+    assert pool_keys.parent_id == send.parent_id == buy.span_id
+    assert pool_keys.trace_id == send.trace_id == buy.trace_id
+    assert sell.parent_id is None and sell.trace_id != buy.trace_id
+    assert send.attributes == {"signature": "sig"} and buy.attributes == {"pair": "x"}
+    assert buy.duration >= pool_keys.duration + send.duration
+    assert telemetry.histogram("span_seconds", span="send").count == 1
+
+def test_spans_follow_asyncio_tasks():
+    telemetry = Telemetry(enabled=True)
+    recorder = Recorder()
+    telemetry.add_exporter(recorder)
+
+    async def leg(name):
+        await asyncio.sleep(0.01)
+        with telemetry.span(f"{name}.inner"):
+            await asyncio.sleep(0)
+
+    async def run():
+        with telemetry.span("buy") as buy:
+            await asyncio.gather(telemetry.wrap("mint", leg("mint")), telemetry.wrap("reserves", leg("reserves")))
+        return buy
+
+    buy = asyncio.run(run())
+    spans = {span.name: span for span in recorder.ended}
+    assert spans["mint"].parent_id == spans["reserves"].parent_id == buy.span_id
+    assert spans["mint.inner"].parent_id == spans["mint"].span_id
+    assert spans["reserves.inner"].parent_id == spans["reserves"].span_id
+
+def test_errors_are_recorded():
+    telemetry = Telemetry(enabled=True)
+    with pytest.raises(ValueError):
+        with telemetry.span("send") as span:
+            raise ValueError("boom")
+    assert span.error == "ValueError"
+    assert span.to_dict()["status"] == {"code": "ERROR", "message": "ValueError"}
+    assert telemetry.counter("span_errors_total", span="send") == 1
+
+    with pytest.raises(ValueError):
+        with telemetry.timer("rpc", method="getSlot"):
+            raise ValueError("boom")
+    with pytest.raises(asyncio.CancelledError):
+        with telemetry.timer("rpc", method="getSlot"):
+            raise asyncio.CancelledError()
+    assert telemetry.counter("rpcs_total", method="getSlot") == 2
+    assert telemetry.counter("rpc_errors_total", method="getSlot") == 1
+
+def test_disabled_records_nothing():
+    telemetry = Telemetry(enabled=False)
+    recorder = Recorder()
+    telemetry.add_exporter(recorder)
+
+    async def value():
+        return 7
+
+    assert telemetry.span("buy") is NOOP_SPAN
+    assert telemetry.timer("rpc", method="getSlot") is NOOP_SPAN
+    with telemetry.span("buy") as span:
+        span.set("pair", "x")
+        with telemetry.timer("rpc", method="getSlot"):
+            pass
+    awaitable = value()
+    assert telemetry.wrap("leg", awaitable) is awaitable
+    assert asyncio.run(awaitable) == 7
+    telemetry.count("requests_total", method="getSlot")
+    telemetry.observe("latency_seconds", 0.1)
+
+    assert recorder.started == recorder.ended == []
+    assert telemetry.counters == {} and telemetry.histograms == {}
+    assert telemetry.prometheus_text() == "\n"
+
+def test_histogram_buckets():
+    histogram = Histogram((0.01, 0.1, 1.0))
+    for value in (0.005, 0.01, 0.05, 0.1, 0.5, 2.0, 3.0):
+        histogram.observe(value)
+    # A bucket holds values up to and including its bound.
+    assert histogram.counts == [2, 2, 1, 2]
+    assert histogram.count == 7
+    assert histogram.sum == pytest.approx(5.665)
+    assert histogram.mean == pytest.approx(5.665 / 7)
+    assert histogram.percentile(25) == 0.01
+    assert histogram.percentile(50) == 0.1
+    assert histogram.percentile(70) == 1.0
+    assert histogram.percentile(99) == float("inf")
+    assert Histogram().percentile(50) is None and Histogram().mean is None
+
+def test_prometheus_text():
+    telemetry = Telemetry(enabled=True, buckets=(0.1, 1.0))
+    telemetry.count("requests_total", method="getSlot")
+    telemetry.count("requests_total", 2, method="getSlot")
+    telemetry.count("requests_total", method="getBalance")
+    telemetry.observe("latency_seconds", 0.05, method="getSlot")
+    telemetry.observe("latency_seconds", 0.5, method="getSlot")
+    telemetry.observe("latency_seconds", 5, method="getSlot")
+
+    assert telemetry.prometheus_text(prefix="test").splitlines() == [
+        "# TYPE test_requests_total counter",
+        'test_requests_total{method="getBalance"} 1',
+        'test_requests_total{method="getSlot"} 3',
+        "# TYPE test_latency_seconds histogram",
+        'test_latency_seconds_bucket{method="getSlot",le="0.1"} 1',
+        'test_latency_seconds_bucket{method="getSlot",le="1"} 2',
+        'test_latency_seconds_bucket{method="getSlot",le="+Inf"} 3',
+        'test_latency_seconds_sum{method="getSlot"} 5.55',
+        'test_latency_seconds_count{method="getSlot"} 3',
+    ]
+    telemetry.reset()
+    assert telemetry.prometheus_text() == "\n"
+
+def test_log_exporter(caplog):
+    telemetry = Telemetry(enabled=True)
+    telemetry.add_exporter(LogExporter(logging.getLogger("test_telemetry")))
+    with caplog.at_level(logging.INFO, logger="test_telemetry"):
+        with telemetry.span("buy", pair="x"):
+            with telemetry.span("send"):
+                pass
+            with pytest.raises(KeyError):
+                with telemetry.span("confirm"):
+                    raise KeyError()
+    lines = [record.getMessage() for record in caplog.records]
+    assert len(lines) == 3
+    assert lines[0].startswith("buy > send ") and lines[0].endswith(" ms")
+    assert lines[1].startswith("buy > confirm ") and lines[1].endswith(" ms error=KeyError")
+    assert lines[2].startswith("buy ") and lines[2].endswith(" ms pair=x")
+
+def test_callback_exporter():
+    started, ended = [], []
+    telemetry = Telemetry(enabled=True)
+    telemetry.add_exporter(CallbackExporter(ended.append, started.append))
+    with telemetry.span("buy", sol_in=0.1):
+        with telemetry.span("send"):
+            pass
+
+    assert [span["name"] for span in started] == ["buy", "send"]
+    assert [span["name"] for span in ended] == ["send", "buy"]
+    send, buy = ended
+    assert send["parent_span_id"] == buy["span_id"] and buy["parent_span_id"] is None
+    assert send["trace_id"] == buy["trace_id"] and len(buy["trace_id"]) == 32
+    assert buy["attributes"] == {"sol_in": 0.1} and buy["status"] == {"code": "OK"}
+    assert buy["start_time_unix_nano"] <= send["start_time_unix_nano"] <= send["end_time_unix_nano"] <= buy["end_time_unix_nano"]
+
+def test_failing_exporter_does_not_break_the_span(capsys):
+    telemetry = Telemetry(enabled=True)
+    telemetry.add_exporter(CallbackExporter(lambda span: 1 / 0))
+    recorder = Recorder()
+    telemetry.add_exporter(recorder)
+    with telemetry.span("buy"):
+        pass
+    assert "Error exporting span buy" in capsys.readouterr().out
+    assert [span.name for span in recorder.ended] == ["buy"]
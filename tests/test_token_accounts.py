@@ -0,0 +1,143 @@
+import base64
+import os
+import random
+import struct
+
+import pytest
+
+from solders.pubkey import Pubkey  # type: ignore
+
+import fake_rpc
+from constants import TOKEN_2022_PROGRAM_ID, TOKEN_PROGRAM_ID
+from pool_utils import get_mint_info, get_pool_reserves
+from token_accounts import (
+    ACCOUNT_TYPE_ACCOUNT,
+    ACCOUNT_TYPE_MINT,
+    MINT_SIZE,
+    TOKEN_ACCOUNT_SIZE,
+    decode_mint,
+    decode_mint_decimals,
+    decode_token_account,
+    decode_token_amount,
+    decode_token_mint,
+    token_2022_account_type,
+)
+
+def spl_token_account(rng: random.Random) -> tuple[dict, bytes]:
+    layouts = pytest.importorskip("spl.token._layouts")
+    fields = {
+        "mint": os.urandom(32),
+        "owner": os.urandom(32),
+        "amount": rng.randrange(2**64),
+        "delegate_option": rng.randrange(2),
+        "delegate": os.urandom(32),
+        "state": rng.randrange(3),
+        "is_native_option": rng.randrange(2),
+        "is_native": rng.randrange(2**64),
+        "delegated_amount": rng.randrange(2**64),
+        "close_authority_option": rng.randrange(2),
+        "close_authority": os.urandom(32),
+    }
+    return fields, layouts.ACCOUNT_LAYOUT.build(fields)
+
+def spl_mint(rng: random.Random) -> tuple[dict, bytes]:
+    layouts = pytest.importorskip("spl.token._layouts")
+    fields = {
+        "mint_authority_option": rng.randrange(2),
+        "mint_authority": os.urandom(32),
+        "supply": rng.randrange(2**64),
+        "decimals": rng.randrange(256),
+        "is_initialized": rng.randrange(2),
+        "freeze_authority_option": rng.randrange(2),
+        "freeze_authority": os.urandom(32),
+    }
+    return fields, layouts.MINT_LAYOUT.build(fields)
+
+def with_extensions(data: bytes, account_type: int) -> bytes:
+    # Token-2022: base layout padded to 165 bytes, the account type, then
+    # TLV extensions (u16 type, u16 length, value).
+    extension = os.urandom(40)
+    return data.ljust(TOKEN_ACCOUNT_SIZE, b"\x00") + bytes([account_type]) + struct.pack("<HH", 3, len(extension)) + extension
+
+def assert_token_account(data: bytes, fields: dict) -> None:
+    account = decode_token_account(data)
+    assert (account.mint, account.owner, account.amount) == (fields["mint"], fields["owner"], fields["amount"])
+    assert (account.state, account.frozen) == (fields["state"], fields["state"] == 2)
+    assert account.is_native == bool(fields["is_native_option"])
+    assert account.delegated_amount == fields["delegated_amount"]
+    assert decode_token_amount(data) == fields["amount"]
+    assert decode_token_amount(data[64:72]) == fields["amount"]
+    assert decode_token_mint(data) == Pubkey.from_bytes(fields["mint"])
+
+def assert_mint(data: bytes, fields: dict) -> None:
+    mint = decode_mint(data)
+    assert (mint.supply, mint.decimals, mint.is_initialized) == (fields["supply"], fields["decimals"], bool(fields["is_initialized"]))
+    assert decode_mint_decimals(data) == fields["decimals"]
+
+def test_matches_spl_token_layouts():
+    rng = random.Random(16)
+    for _ in range(100):
+        fields, data = spl_token_account(rng)
+        assert len(data) == TOKEN_ACCOUNT_SIZE
+        assert_token_account(data, fields)
+        assert token_2022_account_type(data) is None
+
+        fields, data = spl_mint(rng)
+        assert len(data) == MINT_SIZE
+        assert_mint(data, fields)
+        assert token_2022_account_type(data) is None
+
+def test_token_2022_extensions_are_ignored():
+    rng = random.Random(2022)
+    for _ in range(20):
+        fields, data = spl_token_account(rng)
+        data = with_extensions(data, ACCOUNT_TYPE_ACCOUNT)
+        assert token_2022_account_type(data) == ACCOUNT_TYPE_ACCOUNT
+        assert_token_account(data, fields)
+
+        fields, data = spl_mint(rng)
+        data = with_extensions(data, ACCOUNT_TYPE_MINT)
+        assert token_2022_account_type(data) == ACCOUNT_TYPE_MINT
+        assert_mint(data, fields)
+
+def test_short_data_raises():
+    _, data = spl_token_account(random.Random(1))
+    # Shaped like RPC data: decoded from base64, then cut short.
+    short = base64.b64decode(base64.b64encode(data)[:40])
+    with pytest.raises(struct.error):
+        decode_token_account(short)
+    with pytest.raises(struct.error):
+        decode_token_amount(short)
+    with pytest.raises(struct.error):
+        decode_mint(data[:40])
+    with pytest.raises(IndexError):
+        decode_mint_decimals(data[:40])
+
+def test_malformed_accounts_fail_lookups_cleanly(fake, monkeypatch):
+    pool_keys = fake.add_pool(token_program=TOKEN_2022_PROGRAM_ID)
+    mint = pool_keys.base_mint
+    fake.set_account(mint, TOKEN_2022_PROGRAM_ID, with_extensions(fake_rpc.mint_data(6), ACCOUNT_TYPE_MINT))
+    assert get_mint_info(mint).decimals == 6
+    assert get_mint_info(mint).token_program == TOKEN_2022_PROGRAM_ID
+
+    short_mint = Pubkey.new_unique()
+    fake.set_account(short_mint, TOKEN_2022_PROGRAM_ID, fake_rpc.mint_data(6)[:40])
+    assert get_mint_info(short_mint) is None
+
+    # A vault too short to hold an amount.
+    fake.set_account(pool_keys.pool_quote_token_account, TOKEN_PROGRAM_ID, bytes(66))
+    assert get_pool_reserves(pool_keys) == (None, None)
+
+    # Data the client can't decode as base64.
+    bad_mint = Pubkey.new_unique()
+    fake.set_account(bad_mint, TOKEN_2022_PROGRAM_ID, fake_rpc.mint_data(6))
+    encode = fake_rpc.FakeAccount.encode
+
+    def malformed(account, data_slice=None):
+        encoded = encode(account, data_slice)
+        if account is fake.accounts[bad_mint]:
+            encoded["data"] = ["not base64!", "base64"]
+        return encoded
+
+    monkeypatch.setattr(fake_rpc.FakeAccount, "encode", malformed)
+    assert get_mint_info(bad_mint) is None
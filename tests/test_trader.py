@@ -0,0 +1,54 @@
+import asyncio
+
+from solders.keypair import Keypair  # type: ignore
+
+from confirmation import confirmation_watcher
+from trader import Trader
+
+def run_trades(*coroutines) -> list[bool]:
+    async def run():
+        try:
+            return await asyncio.gather(*coroutines)
+        finally:
+            await confirmation_watcher.stop()
+
+    return asyncio.run(run())
+
+def test_concurrent_sells_do_not_oversell(fake):
+    pool_keys = fake.add_pool()
+    keypair = Keypair()
+    fake.airdrop(keypair.pubkey(), 10**10)
+    token_account = fake.set_token_balance(keypair.pubkey(), pool_keys.base_mint, 1_000)
+    # Both sells are waiting on the balance when the second one reserves.
+    fake.latency = {"getBalance": 0.2}
+    trader = Trader(keypair)
+
+    results = run_trades(trader.sell(str(pool_keys.amm), 100), trader.sell(str(pool_keys.amm), 100))
+    assert sorted(results) == [False, True]
+    assert fake.calls["sendTransaction"] == 1
+    assert fake.token_balance(token_account) is None  # sold in full and closed once
+    assert trader.reserved_tokens == {}
+    assert trader.reserved == 0
+
+def test_partial_sells_split_the_balance(fake):
+    pool_keys = fake.add_pool()
+    keypair = Keypair()
+    fake.airdrop(keypair.pubkey(), 10**10)
+    token_account = fake.set_token_balance(keypair.pubkey(), pool_keys.base_mint, 1_000)
+    fake.latency = {"getBalance": 0.2}
+    trader = Trader(keypair)
+
+    results = run_trades(trader.sell(str(pool_keys.amm), 50), trader.sell(str(pool_keys.amm), 50))
+    assert results == [True, True]
+    # Half, then half of what the first didn't already promise.
+    assert fake.token_balance(token_account) == 250
+
+def test_tokens_are_released_without_sol_for_fees(fake):
+    pool_keys = fake.add_pool()
+    keypair = Keypair()
+    fake.set_token_balance(keypair.pubkey(), pool_keys.base_mint, 1_000)
+    trader = Trader(keypair)
+
+    assert run_trades(trader.sell(str(pool_keys.amm), 100)) == [False]
+    assert trader.reserved_tokens == {}
+    assert fake.calls["sendTransaction"] == 0
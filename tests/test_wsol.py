@@ -0,0 +1,55 @@
+import pytest
+
+import config
+import pump_swap
+import wsol
+from trader import Trader
+from wsol import WsolAccount
+
+@pytest.fixture
+def sent(fake, monkeypatch):
+    # (compute units, size) of every transaction the fake receives, in order.
+    transactions = []
+    send_transaction = fake.send_transaction
+
+    def record(txn, preflight=True):
+        transactions.append((fake.simulate_transaction(txn)["unitsConsumed"], len(bytes(txn))))
+        return send_transaction(txn, preflight)
+
+    monkeypatch.setattr(fake, "send_transaction", record)
+    monkeypatch.setattr(wsol, "wsol_account", WsolAccount(), raising=False)
+    return transactions
+
+def trade(fake, pool_keys, sent):
+    # One buy then a full sell, returning (compute units, size) of each.
+    assert pump_swap.buy(str(pool_keys.amm), 0.01)
+    assert pump_swap.sell(str(pool_keys.amm), 100)
+    return sent[-2:]
+
+def test_flag_is_read_at_call_time(fake, sent, monkeypatch):
+    monkeypatch.setattr(config, "PERSISTENT_WSOL", False)
+    assert pump_swap.wsol_instructions_for(10)[0] != wsol.wsol_account.address
+    monkeypatch.setattr(config, "PERSISTENT_WSOL", True)
+    assert pump_swap.wsol_instructions_for(10)[0] == wsol.wsol_account.address
+
+def test_persistent_wsol_saves_units_and_bytes(fake, sent, monkeypatch):
+    pool_keys = fake.add_pool()
+    monkeypatch.setattr(config, "PERSISTENT_WSOL", False)
+    (buy_units, buy_size), (sell_units, sell_size) = trade(fake, pool_keys, sent)
+
+    monkeypatch.setattr(config, "PERSISTENT_WSOL", True)
+    trade(fake, pool_keys, sent)  # creates the account
+    assert wsol.wsol_account.exists
+    (persistent_buy_units, persistent_buy_size), (persistent_sell_units, persistent_sell_size) = trade(fake, pool_keys, sent)
+
+    # A buy tops the account up (transfer + sync) instead of creating,
+    # initializing and closing a seeded account; a sell needs neither.
+    assert persistent_buy_units < buy_units
+    assert persistent_buy_size < buy_size
+    assert persistent_sell_units < sell_units - 2 * 3_000
+    assert persistent_sell_size < sell_size - 100
+
+def test_trader_reads_flag_at_construction(fake, monkeypatch):
+    monkeypatch.setattr(config, "PERSISTENT_WSOL", True)
+    assert Trader(config.payer_keypair).wsol is not None
+    assert Trader(config.payer_keypair, persistent_wsol=False).wsol is None